@@ -8,10 +8,15 @@ from pydantic import BaseModel, Field
 from dapr_agents import tool, Agent
 from dapr_agents.llm.dapr import DaprChatClient
 import os
+import sys
 
-from dapr_agents.memory import ConversationDaprStateMemory
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.compacting_memory import conversation_memory_from_env
+from common.llm_cache import cache_chat_client, llm_cache_from_env
+from common.prompt_layout import PromptLayout, use_prompt_layout
+
 os.environ.setdefault("DAPR_LLM_COMPONENT_DEFAULT", "openai")
 
 # Define tool output model
@@ -35,6 +40,11 @@ def search_flights(destination: str) -> List[FlightOption]:
     ]
 
 async def main():
+    # Response cache for repeated prompts, persisted next to the conversation memory
+    llm_cache = llm_cache_from_env(default_store="memory-state")
+    if llm_cache:
+        llm_cache.load()
+
     travel_planner = Agent(
         name="TravelBuddy-non-durable-agent",
         role="Travel Assistant",
@@ -43,13 +53,17 @@ async def main():
         tools=[search_flights],
 
         # Dapr conversation api for LLM interactions
-        llm = DaprChatClient(),
+        llm = cache_chat_client(DaprChatClient(), llm_cache),
 
-        # Long-term memory (preferences, past trips, context continuity)
-        memory=ConversationDaprStateMemory(
+        # Long-term memory (preferences, past trips, context continuity), kept within
+        # MEMORY_TOKEN_BUDGET by summarizing older turns with openai-mini
+        memory=conversation_memory_from_env(
             store_name="memory-state", session_id=f"session-non-durable-agent-{uuid.uuid4().hex[:8]}"
         ),
     )
+    # Fixed, date-free prompt prefix ahead of the memory, so the provider caches it across turns
+    prompt_layout = PromptLayout.for_agent(travel_planner)
+    use_prompt_layout(travel_planner, prompt_layout, history=True)
     try:
         response1 = await travel_planner.run("I love London")
         print(response1)
@@ -57,6 +71,11 @@ async def main():
         print(response2)
     except Exception as e:
         print(f"Error: {e}")
+    finally:
+        print(f"Prompt cache: {prompt_layout.metrics()}")
+        if llm_cache:
+            print(f"LLM response cache: {llm_cache.metrics()}")
+            llm_cache.close()
 
 if __name__ == "__main__":
     load_dotenv()
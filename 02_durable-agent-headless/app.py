@@ -5,17 +5,31 @@ import logging
 import time
 import uuid
 import random
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 from pydantic import BaseModel, Field
 from dapr_agents import tool, DurableAgent, OpenAIChatClient
 from dapr_agents.llm.dapr import DaprChatClient
 import os
+import sys
 
-from dapr_agents.memory import ConversationDaprStateMemory
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.compacting_memory import conversation_memory_from_env
+from common.llm_cache import cache_chat_client, llm_cache_from_env
+
 os.environ.setdefault("DAPR_LLM_COMPONENT_DEFAULT", "openai")
 
+# Simulated upstream flight API: share of slow calls and their latency distribution
+FLIGHT_SEARCH_SLOW_PROBABILITY = float(os.getenv("FLIGHT_SEARCH_SLOW_PROBABILITY", "0.5"))
+FLIGHT_SEARCH_LATENCY = os.getenv("FLIGHT_SEARCH_LATENCY", "fixed")  # fixed, uniform or exponential
+FLIGHT_SEARCH_LATENCY_SECONDS = float(os.getenv("FLIGHT_SEARCH_LATENCY_SECONDS", "20"))
+# Blocking upstream calls run on this bounded pool, so at most FLIGHT_SEARCH_WORKERS
+# searches hit the flight API at once however many tasks are triggered
+FLIGHT_SEARCH_WORKERS = int(os.getenv("FLIGHT_SEARCH_WORKERS", "16"))
+flight_search_executor = ThreadPoolExecutor(max_workers=FLIGHT_SEARCH_WORKERS, thread_name_prefix="flight-search")
+
 # Define tool output model
 class FlightOption(BaseModel):
     airline: str = Field(description="Airline name")
@@ -25,21 +39,37 @@ class FlightOption(BaseModel):
 class DestinationSchema(BaseModel):
     destination: str = Field(description="Destination city name")
 
-# Define flight search tool
-@tool(args_model=DestinationSchema)
-def search_flights(destination: str) -> List[FlightOption]:
-    """Search for flights to the specified destination."""
-    # Mock flight data (would be an external API call in a real app)
-
-    # Dynamic delay: 50% no delay, 50% 10-second delay
-    if random.random() < 0.5:
-        time.sleep(20)
-
+def upstream_latency() -> float:
+    """Seconds the simulated flight API takes to answer"""
+    if random.random() >= FLIGHT_SEARCH_SLOW_PROBABILITY:
+        return 0.0
+    if FLIGHT_SEARCH_LATENCY == "uniform":
+        return random.uniform(0, 2 * FLIGHT_SEARCH_LATENCY_SECONDS)
+    if FLIGHT_SEARCH_LATENCY == "exponential":
+        return random.expovariate(1 / FLIGHT_SEARCH_LATENCY_SECONDS)
+    return FLIGHT_SEARCH_LATENCY_SECONDS
+
+def query_flight_api(destination: str) -> List[FlightOption]:
+    """Simulated blocking upstream call (would be an HTTP client call in a real app)"""
+    latency = upstream_latency()
+    if latency:
+        time.sleep(latency)
+    logging.info(f"search_flights({destination}) answered after {latency:.1f}s")
+
+    # Mock flight data
     return [
         FlightOption(airline="SkyHighAir", price=450.00),
         FlightOption(airline="GlobalWings", price=375.50),
     ]
 
+# Define flight search tool
+@tool(args_model=DestinationSchema)
+async def search_flights(destination: str) -> List[FlightOption]:
+    """Search for flights to the specified destination."""
+    # The blocking client runs on the bounded executor. The tool call is a workflow
+    # activity, so it still holds a workflow worker thread until the search returns
+    return await asyncio.get_running_loop().run_in_executor(flight_search_executor, query_flight_api, destination)
+
 async def main():
 
     travel_planner = DurableAgent(
@@ -59,8 +89,9 @@ async def main():
         state_store_name="statestore",
         state_key="execution-headless",
 
-        # Long-term memory (preferences, past trips, context continuity)
-        memory=ConversationDaprStateMemory(
+        # Long-term memory (preferences, past trips, context continuity), kept within
+        # MEMORY_TOKEN_BUDGET by summarizing older turns with openai-mini
+        memory=conversation_memory_from_env(
             session_id=f"session-headless-{uuid.uuid4().hex[:8]}"
         ),
 
@@ -71,6 +102,12 @@ async def main():
         agents_registry_store_name="registry-state",
     )
 
+    # Response cache for repeated prompts, persisted next to the conversation memory
+    llm_cache = llm_cache_from_env(default_store="memory-state")
+    if llm_cache:
+        llm_cache.load()
+        cache_chat_client(travel_planner.llm, llm_cache)
+
     try:
         # start REST endpoint
         travel_planner.as_service(port=8001)
@@ -1,7 +1,16 @@
 #!/usr/bin/env python3
+import argparse
+import itertools
 import json
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dapr.clients import DaprClient
+from dapr.proto.runtime.v1 import dapr_pb2 as api_v1
+import grpc
+
+TRIGGER_METADATA = {"cloudevent.type": "TriggerAction"}
 
 def trigger_agent(agent_topic: str, task: str, pubsub_name: str = "message-pubsub"):
     """Trigger a DurableAgent with a specific task"""
@@ -13,9 +22,7 @@ def trigger_agent(agent_topic: str, task: str, pubsub_name: str = "message-pubsu
                 topic_name=agent_topic,
                 data=json.dumps({"task": task}),
                 data_content_type="application/json",
-                publish_metadata={
-                    "cloudevent.type": "TriggerAction",
-                }
+                publish_metadata=TRIGGER_METADATA
             )
         print(f"✅ Successfully triggered agent '{agent_topic}' with task: {task}")
         return True
@@ -24,7 +31,184 @@ def trigger_agent(agent_topic: str, task: str, pubsub_name: str = "message-pubsu
         print(f"❌ Failed to trigger agent: {e}")
         return False
 
+# === Load generator ===
+def read_tasks(path: str):
+    """Yield tasks from a file or stdin ("-"): one per line, plain text or {"task": ...} JSON"""
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                yield json.loads(line)["task"]
+            else:
+                yield line
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+class RateLimiter:
+    """Spaces publishes evenly at `rate` messages per second across all threads (0 = unlimited)"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def acquire(self, messages: int = 1):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.perf_counter()
+            start = max(self._next, now)
+            self._next = start + messages * self.interval
+        if start > now:
+            time.sleep(start - now)
+
+class LoadGenerator:
+    """Publishes tasks over one shared DaprClient from a bounded pool of threads"""
+
+    def __init__(self, client: DaprClient, agent_topic: str, pubsub_name: str = "message-pubsub",
+                 batch_size: int = 100, rate: float = 0.0, bulk: bool = True):
+        self.client = client
+        self.agent_topic = agent_topic
+        self.pubsub_name = pubsub_name
+        self.batch_size = batch_size
+        self.limiter = RateLimiter(rate)
+        self.bulk = bulk and batch_size > 1
+        self.latencies = []
+        self.published = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def publish(self, tasks):
+        """Publish one batch, returning (published, failed)"""
+        self.limiter.acquire(len(tasks))
+        if self.bulk:
+            start = time.perf_counter()
+            try:
+                failed = self._bulk_publish(tasks)
+                # Every message of a bulk request shares the request's latency
+                self._record([time.perf_counter() - start] * len(tasks), len(tasks) - failed, failed)
+                return len(tasks) - failed, failed
+            except grpc.RpcError as e:
+                if e.code() != grpc.StatusCode.UNIMPLEMENTED:
+                    raise
+                # Bulk publish is an alpha API; fall back to single publishes on sidecars without it
+                with self._lock:
+                    if self.bulk:
+                        print("⚠️  Bulk publish not available, publishing messages one by one")
+                        self.bulk = False
+
+        latencies = []
+        failed = 0
+        for task in tasks:
+            start = time.perf_counter()
+            try:
+                self._publish_one(task)
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                failed += 1
+                print(f"❌ Failed to publish task: {e}")
+        self._record(latencies, len(tasks) - failed, failed)
+        return len(tasks) - failed, failed
+
+    def _record(self, latencies, published: int, failed: int):
+        with self._lock:
+            self.latencies.extend(latencies)
+            self.published += published
+            self.failed += failed
+
+    def _publish_one(self, task: str):
+        self.client.publish_event(
+            pubsub_name=self.pubsub_name,
+            topic_name=self.agent_topic,
+            data=json.dumps({"task": task}),
+            data_content_type="application/json",
+            publish_metadata=TRIGGER_METADATA
+        )
+
+    def _bulk_publish(self, tasks) -> int:
+        # The SDK has no wrapper for BulkPublishEventAlpha1, so the request goes through its gRPC stub
+        request = api_v1.BulkPublishRequest(
+            pubsub_name=self.pubsub_name,
+            topic=self.agent_topic,
+            entries=[
+                api_v1.BulkPublishRequestEntry(
+                    entry_id=str(index),
+                    event=json.dumps({"task": task}).encode("utf-8"),
+                    content_type="application/json",
+                    metadata=TRIGGER_METADATA
+                )
+                for index, task in enumerate(tasks)
+            ],
+            metadata=TRIGGER_METADATA
+        )
+        response = self.client._stub.BulkPublishEventAlpha1(request)
+        for entry in response.failedEntries:
+            print(f"❌ Failed to publish task: {tasks[int(entry.entry_id)]} ({entry.error})")
+        return len(response.failedEntries)
+
+    def run(self, tasks, concurrency: int = 8):
+        """Publish every task with at most `concurrency` requests in flight"""
+        batches = iter(lambda: list(itertools.islice(tasks, self.batch_size)), [])
+        batches_lock = threading.Lock()
+
+        def worker():
+            while True:
+                with batches_lock:
+                    batch = next(batches, None)
+                if batch is None:
+                    return
+                try:
+                    self.publish(batch)
+                except Exception as e:
+                    print(f"❌ Failed to publish {len(batch)} task(s): {e}")
+                    with self._lock:
+                        self.failed += len(batch)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="publisher") as pool:
+            for _ in range(concurrency):
+                pool.submit(worker)
+        return time.perf_counter() - start
+
+    def report(self, elapsed: float):
+        latencies = sorted(self.latencies)
+        pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000 if latencies else 0.0
+        print(f"Published {self.published} task(s), {self.failed} failed, in {elapsed:.2f}s "
+              f"({self.published / elapsed if elapsed else 0:.0f} msg/s, {'bulk' if self.bulk else 'single'} publish)")
+        print(f"Per-message publish latency: p50={pick(0.5):.1f} ms  p95={pick(0.95):.1f} ms  p99={pick(0.99):.1f} ms")
+
 # Usage
 if __name__ == "__main__":
-    for dest in ["Paris", "London", "Tokyo", "New York"]:
-        trigger_agent("TravelBuddy-Headless", f"Find flights to {dest}")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Trigger TravelBuddy-Headless with one flight search per destination")
+    parser.add_argument("destinations", nargs="*", default=["Paris", "London", "Tokyo", "New York"])
+    parser.add_argument("--repeat", type=int, default=1, help="Trigger each destination this many times")
+    parser.add_argument("--tasks", help="Load-generator mode: read tasks from this file, or - for stdin")
+    parser.add_argument("--topic", default="TravelBuddy-Headless", help="Agent topic to publish to")
+    parser.add_argument("--pubsub", default="message-pubsub", help="Pub/sub component name")
+    parser.add_argument("--concurrency", type=int, default=8, help="Publish requests in flight at once")
+    parser.add_argument("--rate", type=float, default=0.0, help="Maximum messages per second (0 = unlimited)")
+    parser.add_argument("--batch-size", type=int, default=100, help="Messages per bulk publish request")
+    parser.add_argument("--no-bulk", action="store_true", help="Publish one message per request")
+    args = parser.parse_args()
+
+    if args.tasks:
+        with DaprClient() as client:
+            generator = LoadGenerator(
+                client, args.topic, args.pubsub,
+                batch_size=args.batch_size, rate=args.rate, bulk=not args.no_bulk
+            )
+            elapsed = generator.run(read_tasks(args.tasks), concurrency=args.concurrency)
+            generator.report(elapsed)
+        sys.exit(1 if generator.failed else 0)
+
+    # All tasks are published up front; with a non-blocking search_flights the agent works on
+    # them concurrently, so the last one finishes after about max(latency) rather than sum(latency)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for dest in args.destinations:
+            trigger_agent(args.topic, f"Find flights to {dest}", args.pubsub)
+    print(f"Published {len(args.destinations) * args.repeat} task(s) in {time.perf_counter() - start:.2f}s")
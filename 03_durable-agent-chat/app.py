@@ -1,23 +1,41 @@
 #!/usr/bin/env python3
 
+import asyncio
 import chainlit as cl
 import logging
-import json
-import uuid
 from typing import List
 from pydantic import BaseModel, Field
 from dapr_agents import tool, DurableAgent, OpenAIChatClient
-from dapr_agents.memory import ConversationDaprStateMemory
 from dotenv import load_dotenv
 
 from dapr_agents.llm.dapr import DaprChatClient
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.compacting_memory import conversation_memory_from_env
+from common.llm_cache import cache_chat_client, llm_cache_from_env
+from session_runtime import ChatRuntime, SessionDurableAgent, SessionMemory
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 
 os.environ.setdefault("DAPR_LLM_COMPONENT_DEFAULT", "openai")
 
+# Sessions without a message for this long have their memory dropped from the process
+CHAT_SESSION_IDLE_SECONDS = float(os.getenv("CHAT_SESSION_IDLE_SECONDS", "1800"))
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "10000"))
+
+# "dapr": the Conversation API (answers arrive whole), "openai": OpenAI directly, streaming tokens
+CHAT_LLM = os.getenv("CHAT_LLM", "dapr").lower()
+if CHAT_LLM != "openai":
+    logging.warning(f"CHAT_LLM={CHAT_LLM}: replies arrive whole, not token by token; set CHAT_LLM=openai to stream tokens")
+
+# Response cache shared by every chat session, persisted next to the conversation memory
+llm_cache = llm_cache_from_env(default_store="memory-state")
+if llm_cache:
+    llm_cache.load()
+
 # Define tool output model
 class FlightOption(BaseModel):
     airline: str = Field(description="Airline name")
@@ -37,15 +55,14 @@ def search_flights(destination: str) -> List[FlightOption]:
         FlightOption(airline="GlobalWings", price=375.50),
     ]
 
-@cl.on_chat_start
-async def start():
-    """Initialize the chat session with a unique session ID."""
-    
-    # Generate a unique session ID for this chat session
-    session_id = f"session-{uuid.uuid4().hex[:8]}"
-    
-    # Create the DurableAgent instance with the session-specific memory
-    travel_planner = DurableAgent(
+def build_chat_client():
+    if CHAT_LLM == "openai":
+        return OpenAIChatClient(model="gpt-4o")
+    return DaprChatClient()
+
+def build_travel_planner(memory: SessionMemory) -> SessionDurableAgent:
+    """The agent shared by every chat session; each turn's messages go to its session's memory"""
+    return SessionDurableAgent(
         name="TravelAssistant-Chat",
         role="Travel Assistant",
         goal="Help users find flights and remember preferences",
@@ -55,19 +72,33 @@ async def start():
             "Provide clear flight information with airline names and prices.",
         ],
         tools=[search_flights],
-        llm = DaprChatClient(),
+        llm = cache_chat_client(build_chat_client(), llm_cache),
         message_bus_name="message-pubsub",
         state_store_name="statestore",
         state_key="execution-chat",
 
         agents_registry_store_name="registry-state",
-        memory=ConversationDaprStateMemory(
-            store_name="memory-state", session_id=session_id
-        ),
+        memory=memory,
     )
+
+# One agent for the whole process; a chat session is just a memory session ID.
+# Memories kept within MEMORY_TOKEN_BUDGET by summarizing older turns with openai-mini
+chat_runtime = ChatRuntime(
+    build_agent=build_travel_planner,
+    memory=SessionMemory(
+        factory=lambda session_id: conversation_memory_from_env(store_name="memory-state", session_id=session_id),
+        idle_seconds=CHAT_SESSION_IDLE_SECONDS,
+        max_sessions=CHAT_MAX_SESSIONS,
+    ),
+)
+
+@cl.on_chat_start
+async def start():
+    """Initialize the chat session with a unique session ID."""
     
-    # Store the agent in the user session
-    cl.user_session.set("travel_planner", travel_planner)
+    # The first session of the process builds the shared agent
+    session_id = await asyncio.to_thread(chat_runtime.start_session)
+    cl.user_session.set("session_id", session_id)
     
     await cl.Message(
         content="✈️ **Flight Search Assistant**\n\n"
@@ -76,34 +107,45 @@ async def start():
                 f"💡 *Session ID: {session_id}*"
     ).send()
 
+@cl.on_chat_end
+async def end():
+    """Release the session's memory; the conversation stays in the state store."""
+    session_id = cl.user_session.get("session_id")
+    if session_id:
+        chat_runtime.end_session(session_id)
+        logging.info(f"Chat runtime: {chat_runtime.metrics()}")
+
 @cl.on_message
 async def main(message: cl.Message):
     """Handle user messages and interact with the DurableAgent."""
     try:
-        # Get the session-specific travel_planner
-        travel_planner = cl.user_session.get("travel_planner")
+        session_id = cl.user_session.get("session_id")
         
-        if not travel_planner:
+        if not session_id:
             await cl.Message(
                 content="❌ Session error. Please refresh the page to start a new session."
             ).send()
             return
             
-        response: str = await travel_planner.run(message.content)
-
-        # Parse the response to extract just the content
-        try:
-            response_data = json.loads(response)
-            if isinstance(response_data, dict) and 'content' in response_data:
-                content = response_data['content']
-            else:
-                content = response
-        except (json.JSONDecodeError, TypeError):
-            # If it's not JSON, use the response as-is
-            content = response
-
-        # Send the agent's response back to ChainLit
-        await cl.Message(content=content).send()
+        # Tokens go out as they arrive; tool calls show up as steps while they run
+        reply = cl.Message(content="")
+        steps = {}
+        async for event in chat_runtime.stream(session_id, message.content):
+            if event["type"] == "token":
+                await reply.stream_token(event["text"])
+            elif event["type"] == "tool_call":
+                step = cl.Step(name=event["name"], type="tool")
+                step.input = event["arguments"]
+                steps[event["id"]] = step
+                await step.send()
+            elif event["type"] == "tool_result" and event["id"] in steps:
+                step = steps.pop(event["id"])
+                step.output = event["content"]
+                await step.update()
+            elif event["type"] == "answer" and not reply.content:
+                reply.content = event["content"]
+
+        await reply.send()
         
         logging.info("Message processed successfully")
 
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+One DurableAgent for every chat session of the Chainlit app
+Building a DurableAgent per browser session starts a workflow runtime per session
+(worker threads plus a gRPC work-item stream), loads the agent's execution state and
+re-registers it in the agent registry, so startup time and memory grow with every
+open tab. Worse, every one of those runtimes registers the same workflow and pulls
+work from the same engine, so a session's turn may run on another session's agent.
+
+ChatRuntime builds the agent once per process. A session is only its memory
+session ID: each turn runs as a workflow instance bound to the session, and
+SessionMemory routes the agent's memory writes to that session's memory. Memories
+of sessions that went idle are dropped from the process; the conversation itself
+stays in the state store and is reloaded if the session comes back.
+
+A turn can also be streamed: stream_session() yields the LLM's tokens and the
+tool calls and results as the workflow's activities produce them, instead of
+waiting for the workflow to finish.
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+
+from dapr_agents import DurableAgent
+from dapr_agents.memory import MemoryBase
+from dapr_agents.types import AssistantMessage, BaseMessage
+from pydantic import Field, PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+# Workflow instance whose activity is running in the current context
+current_instance: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_instance", default=None)
+
+
+class SessionMemory(MemoryBase):
+    """Memory facade that forwards to the memory of the session the current workflow instance runs for"""
+
+    factory: Callable[[str], MemoryBase] = Field(..., description="Builds the memory of a session ID")
+    idle_seconds: float = Field(default=1800.0, description="Drop a session's memory after this long without use")
+    max_sessions: int = Field(default=10000, description="Most session memories held at once (least recently used go first)")
+    fallback_session: str = Field(default="session-shared", description="Session for messages outside a session's turn")
+
+    _sessions: "OrderedDict[str, list]" = PrivateAttr(default_factory=OrderedDict)  # session -> [memory, last used]
+    _instances: Dict[str, str] = PrivateAttr(default_factory=dict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _stats: Dict[str, int] = PrivateAttr(default_factory=lambda: {"opened": 0, "closed": 0, "evicted": 0, "reloaded": 0})
+
+    # === Sessions ===
+    def open(self, session_id: str) -> MemoryBase:
+        """Memory of a session, built on first use; also evicts idle sessions"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                entry[1] = now
+                self._sessions.move_to_end(session_id)
+                return entry[0]
+        memory = self.factory(session_id)
+        with self._lock:
+            entry = self._sessions.setdefault(session_id, [memory, now])
+            self._stats["opened"] += 1
+            return entry[0]
+
+    def close(self, session_id: str):
+        """Forget a session's memory object (its messages stay in the state store)"""
+        with self._lock:
+            if self._sessions.pop(session_id, None) is not None:
+                self._stats["closed"] += 1
+
+    def _evict(self, now: float):
+        # Busy sessions (with a turn in flight) are kept
+        busy = set(self._instances.values())
+        for session_id, (_, last_used) in list(self._sessions.items()):
+            over_capacity = len(self._sessions) > self.max_sessions
+            if not over_capacity and now - last_used < self.idle_seconds:
+                break
+            if session_id not in busy:
+                del self._sessions[session_id]
+                self._stats["evicted"] += 1
+
+    def bind(self, instance_id: str, session_id: str):
+        with self._lock:
+            self._instances[instance_id] = session_id
+
+    def unbind(self, instance_id: str):
+        with self._lock:
+            self._instances.pop(instance_id, None)
+
+    def _current(self) -> MemoryBase:
+        instance_id = current_instance.get()
+        with self._lock:
+            session_id = self._instances.get(instance_id, self.fallback_session) if instance_id else self.fallback_session
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                entry[1] = time.monotonic()
+                return entry[0]
+            if session_id != self.fallback_session:
+                self._stats["reloaded"] += 1
+        return self.open(session_id)
+
+    # === MemoryBase ===
+    def add_message(self, message: Union[Dict[str, Any], BaseMessage]):
+        self._current().add_message(message)
+
+    def add_messages(self, messages: List[Union[Dict[str, Any], BaseMessage]]):
+        self._current().add_messages(messages)
+
+    def add_interaction(self, user_message: BaseMessage, assistant_message: BaseMessage):
+        self._current().add_interaction(user_message, assistant_message)
+
+    def get_messages(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        return self._current().get_messages(*args, **kwargs)
+
+    def reset_memory(self):
+        self._current().reset_memory()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "sessions": len(self._sessions), "turns_in_flight": len(self._instances)}
+
+
+class SessionDurableAgent(DurableAgent):
+    """DurableAgent whose memory writes go to the session of the workflow instance that makes them"""
+
+    stream_llm: bool = Field(default=True, description="Stream LLM tokens of turns that have a listener")
+
+    # Turns being streamed: instance ID -> (event loop of the listener, its queue)
+    _listeners: Dict[str, tuple] = PrivateAttr(default_factory=dict)
+    # Whether the LLM client accepts stream=True (None until the first streamed call)
+    _llm_streams: Optional[bool] = PrivateAttr(default=None)
+    # LLM responses of streamed turns, by how they reached the listener
+    _stream_stats: Dict[str, int] = PrivateAttr(default_factory=lambda: {"streamed": 0, "whole": 0})
+    # Activity threads and run_session's cleanup all change the shared self.state["instances"];
+    # save_state serializes it under the same lock so it never reads a dict mid-change
+    _state_lock: Any = PrivateAttr(default_factory=threading.RLock)
+
+    def _emit(self, instance_id: Optional[str], event: Dict[str, Any]):
+        listener = self._listeners.get(instance_id) if instance_id else None
+        if listener is None:
+            return
+        loop, queue = listener
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+        except RuntimeError:
+            # The listener's event loop is gone (the chat session closed mid-turn)
+            self._listeners.pop(instance_id, None)
+
+    def _construct_messages_with_instance_history(self, instance_id, task):
+        # call_llm's first step; lets _call_llm know which turn it generates for
+        current_instance.set(instance_id)
+        return super()._construct_messages_with_instance_history(instance_id, task)
+
+    def _call_llm(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        instance_id = current_instance.get()
+        if instance_id not in self._listeners:
+            return super()._call_llm(messages)
+        if self.stream_llm and self._llm_streams is not False:
+            try:
+                chunks = self.llm.generate(
+                    messages=messages,
+                    tools=self.get_llm_tools(),
+                    stream=True,
+                    **({"tool_choice": self.tool_choice} if self.tool_choice is not None else {}),
+                )
+            except ValueError:
+                # DaprChatClient: the Conversation API answers in one piece
+                logger.warning(
+                    f"{type(self.llm).__name__} does not stream; turns get whole LLM responses "
+                    f"(set CHAT_LLM=openai for token streaming)"
+                )
+                self._llm_streams = False
+            else:
+                self._llm_streams = True
+                self._stream_stats["streamed"] += 1
+                return self._collect_stream(instance_id, chunks)
+        self._stream_stats["whole"] += 1
+        assistant_message = super()._call_llm(messages)
+        if assistant_message.get("content"):
+            self._emit(instance_id, {"type": "token", "text": assistant_message["content"]})
+        self._emit_tool_calls(instance_id, assistant_message)
+        return assistant_message
+
+    def _collect_stream(self, instance_id: str, chunks) -> Dict[str, Any]:
+        """Forward streamed tokens to the turn's listener and assemble the assistant message"""
+        content: List[str] = []
+        tool_calls: Dict[int, Dict[str, Any]] = {}
+        for chunk in chunks:
+            candidate = getattr(chunk, "result", None)
+            if candidate is None:
+                continue
+            if candidate.content:
+                content.append(candidate.content)
+                self._emit(instance_id, {"type": "token", "text": candidate.content})
+            for part in candidate.tool_calls or []:
+                call = tool_calls.setdefault(
+                    part.index, {"id": None, "type": "function", "function": {"name": "", "arguments": ""}}
+                )
+                call["id"] = part.id or call["id"]
+                call["function"]["name"] = part.function.name or call["function"]["name"]
+                call["function"]["arguments"] += part.function.arguments or ""
+        assistant_message = AssistantMessage(
+            content="".join(content) or None,
+            tool_calls=[tool_calls[index] for index in sorted(tool_calls)] or None,
+        ).model_dump()
+        self._emit_tool_calls(instance_id, assistant_message)
+        return assistant_message
+
+    def _emit_tool_calls(self, instance_id: str, assistant_message: Dict[str, Any]):
+        for call in assistant_message.get("tool_calls") or []:
+            self._emit(instance_id, {
+                "type": "tool_call",
+                "id": call["id"],
+                "name": call["function"]["name"],
+                "arguments": call["function"]["arguments"],
+            })
+
+    def save_state(self, state=None, force_reload: bool = False) -> None:
+        with self._state_lock:
+            super().save_state(state, force_reload)
+
+    def _ensure_instance_exists(self, *args, **kwargs) -> None:
+        with self._state_lock:
+            super()._ensure_instance_exists(*args, **kwargs)
+
+    def _process_user_message(self, instance_id, task, user_message_copy):
+        token = current_instance.set(instance_id)
+        try:
+            with self._state_lock:
+                super()._process_user_message(instance_id, task, user_message_copy)
+        finally:
+            current_instance.reset(token)
+
+    def _save_assistant_message(self, instance_id, assistant_message):
+        token = current_instance.set(instance_id)
+        try:
+            with self._state_lock:
+                super()._save_assistant_message(instance_id, assistant_message)
+        finally:
+            current_instance.reset(token)
+        if not assistant_message.get("tool_calls"):
+            # The turn's final answer (or the workflow's error message)
+            self._emit(instance_id, {"type": "answer", "content": assistant_message.get("content") or ""})
+
+    def _append_tool_message_to_instance(self, instance_id, agent_msg, tool_history_entry):
+        # run_tool calls _update_agent_memory_and_history right after this, without the instance ID
+        current_instance.set(instance_id)
+        with self._state_lock:
+            super()._append_tool_message_to_instance(instance_id, agent_msg, tool_history_entry)
+        self._emit(instance_id, {
+            "type": "tool_result",
+            "id": tool_history_entry.tool_call_id,
+            "name": tool_history_entry.tool_name,
+            "content": tool_history_entry.execution_result,
+        })
+
+    def _update_agent_memory_and_history(self, tool_message, tool_history_entry):
+        try:
+            super()._update_agent_memory_and_history(tool_message, tool_history_entry)
+        finally:
+            current_instance.set(None)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            # None until a streamed turn called the LLM; False: the client answers whole, tokens don't stream
+            "llm_streaming": self._llm_streams,
+            "llm_responses_streamed": self._stream_stats["streamed"],
+            "llm_responses_whole": self._stream_stats["whole"],
+        }
+
+    async def run_session(
+        self, session_id: str, input_data: Union[str, Dict[str, Any]], instance_id: Optional[str] = None
+    ) -> Any:
+        """DurableAgent.run() for one session's turn: the workflow instance is bound to the session first"""
+        instance_id = instance_id or uuid.uuid4().hex
+        self.memory.bind(instance_id, session_id)
+        try:
+            await asyncio.to_thread(
+                self.wf_client.schedule_new_workflow,
+                workflow=self.resolve_workflow(self._workflow_name),
+                input=input_data if isinstance(input_data, dict) else {"task": input_data},
+                instance_id=instance_id,
+            )
+            state = await self.monitor_workflow_state(instance_id)
+            if not state:
+                raise RuntimeError(f"Workflow '{instance_id}' not found.")
+            if state.runtime_status.name != "COMPLETED":
+                logger.error(f"Workflow '{instance_id}' ended with status '{state.runtime_status.name}'.")
+            return state.serialized_output
+        finally:
+            self.memory.unbind(instance_id)
+            # Finished turns live on in the session's memory; the shared execution state only needs running ones
+            await asyncio.to_thread(self._forget_instance, instance_id)
+
+    def _forget_instance(self, instance_id: str):
+        with self._state_lock:
+            if self.state.get("instances", {}).pop(instance_id, None) is not None:
+                self.save_state()
+
+    async def stream_session(
+        self, session_id: str, input_data: Union[str, Dict[str, Any]]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Run one session's turn, yielding its events as they happen:
+
+        {"type": "token", "text"}                      a piece of LLM output
+        {"type": "tool_call", "id", "name", "arguments"}
+        {"type": "tool_result", "id", "name", "content"}
+        {"type": "answer", "content"}                  the final answer, whole
+        """
+        instance_id = uuid.uuid4().hex
+        queue: asyncio.Queue = asyncio.Queue()
+        self._listeners[instance_id] = (asyncio.get_running_loop(), queue)
+        turn = asyncio.ensure_future(self.run_session(session_id, input_data, instance_id=instance_id))
+        # Queued behind every event the turn's activities emitted before the workflow completed
+        turn.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while (event := await queue.get()) is not None:
+                yield event
+            await turn
+        finally:
+            # A listener that went away leaves the turn running: its memory writes still need the session binding
+            self._listeners.pop(instance_id, None)
+
+
+class ChatRuntime:
+    """Builds the shared agent on first use and tracks chat sessions"""
+
+    def __init__(self, build_agent: Callable[[SessionMemory], SessionDurableAgent], memory: SessionMemory):
+        self.build_agent = build_agent
+        self.memory = memory
+        self._agent: Optional[SessionDurableAgent] = None
+        self._lock = threading.Lock()
+
+    @property
+    def agent(self) -> SessionDurableAgent:
+        if self._agent is None:
+            with self._lock:
+                if self._agent is None:
+                    started = time.perf_counter()
+                    self._agent = self.build_agent(self.memory)
+                    logger.info(f"Shared chat agent built in {time.perf_counter() - started:.2f}s")
+        return self._agent
+
+    def start_session(self, session_id: Optional[str] = None) -> str:
+        """Register a new chat session; only the first one in the process builds the agent"""
+        session_id = session_id or f"session-{uuid.uuid4().hex[:8]}"
+        self.agent
+        self.memory.open(session_id)
+        return session_id
+
+    async def stream(self, session_id: str, text: str) -> AsyncIterator[Dict[str, Any]]:
+        """Events of the session's turn for `text` (see SessionDurableAgent.stream_session)"""
+        self.memory.open(session_id)
+        async for event in self.agent.stream_session(session_id, text):
+            yield event
+
+    def end_session(self, session_id: str):
+        self.memory.close(session_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Session memory counters, plus the shared agent's streaming counters once it is built"""
+        metrics = self.memory.metrics()
+        if self._agent is not None:
+            metrics.update(self._agent.metrics())
+        return metrics
+
+    def shutdown(self):
+        if self._agent is not None:
+            self._agent.stop_runtime()
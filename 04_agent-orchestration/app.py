@@ -2,17 +2,32 @@ import dapr.ext.workflow as wf
 from dotenv import load_dotenv
 from time import sleep
 import asyncio
+import threading
 from dapr_agents import tool, Agent
 import os
-from dapr_agents.memory import ConversationDaprStateMemory
 from dapr.clients import DaprClient
 from dapr.clients.grpc.conversation import ConversationInputAlpha2, ConversationMessage, ConversationMessageContent, ConversationMessageOfUser
 from dapr_agents.llm.dapr import DaprChatClient
 import logging
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.compacting_memory import conversation_memory_from_env
+from common.llm_cache import cache_chat_client, cached_converse_alpha2, llm_cache_from_env
+from common.llm_gateway import gateway_chat_client, gateway_dapr_client, llm_gateway_from_env
+from common.model_router import RoutePolicy, model_router_from_env, route_chat_client
+from common.prompt_layout import PromptLayout, use_prompt_layout
 
 load_dotenv()
 os.environ.setdefault("DAPR_LLM_COMPONENT_DEFAULT", "openai")
 
+# Response cache for the agent and the Conversation API call, persisted next to the conversation memory
+llm_cache = llm_cache_from_env(default_store="memory-state")
+# The character agent's validation call and one-line answer run on openai-mini, escalating to openai if needed
+model_router = model_router_from_env({"character": RoutePolicy(task="lookup")})
+# Paces both LLM calls against the provider's quota and retries them when throttled
+llm_gateway = llm_gateway_from_env()
+
 # Initialize Workflow Instance
 wfr = wf.WorkflowRuntime()
 
@@ -33,14 +48,28 @@ agent = Agent(
     tools=[validate_character],
 
     # Use Dapr conversation api
-    llm=DaprChatClient(),
+    llm=route_chat_client(cache_chat_client(gateway_chat_client(DaprChatClient(), llm_gateway, "normal"), llm_cache), model_router, "character"),
 
-    # Long-term memory (preferences, past trips, context continuity)
-    memory=ConversationDaprStateMemory(
+    # Long-term memory (preferences, past trips, context continuity), kept within
+    # MEMORY_TOKEN_BUDGET by summarizing older turns with openai-mini
+    memory=conversation_memory_from_env(
         store_name="memory-state", session_id="session-agent-orchestration"
     ),
 )
 
+# Fixed, date-free prompt prefix ahead of the memory, so the provider caches it across runs
+prompt_layout = PromptLayout.for_agent(agent)
+use_prompt_layout(agent, prompt_layout, history=True)
+
+# Long-lived event loop that activities submit agent runs to, instead of
+# building and tearing down a new loop with asyncio.run() on every activity
+agent_loop = asyncio.new_event_loop()
+threading.Thread(target=agent_loop.run_forever, name="agent-loop", daemon=True).start()
+
+def run_agent(coro):
+    """Run an agent coroutine on the shared loop and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(coro, agent_loop).result()
+
 # Define Workflow logic
 @wfr.workflow(name="task_chain_workflow")
 def task_chain_workflow(ctx: wf.DaprWorkflowContext):
@@ -67,7 +96,8 @@ def get_character(ctx):
             )
         ]
 
-        response = daprClient.converse_alpha2(name='openai-mini', temperature=1.0, inputs=inputs)
+        # temperature=1.0 asks for a random pick, so the cache passes this call straight through
+        response = cached_converse_alpha2(llm_cache, gateway_dapr_client(daprClient, llm_gateway, "normal"), name='openai-mini', temperature=1.0, inputs=inputs)
         character = response.outputs[0].choices[0].message.content
 
     print(f"Character: {character}")
@@ -76,12 +106,14 @@ def get_character(ctx):
 # Activity 2
 @wfr.activity(name="get_line_agent")
 def get_line(ctx, character: str):
-    response = asyncio.run(agent.run(f"What is a famous line by {character}"))
+    response = run_agent(agent.run(f"What is a famous line by {character}"))
 
     print(f"Line: {response.content}")
     return response.content
 
 if __name__ == "__main__":
+    if llm_cache:
+        llm_cache.load()
     wfr.start()
     sleep(5)  # wait for workflow runtime to start
 
@@ -92,3 +124,12 @@ if __name__ == "__main__":
     print(f"Workflow completed with result: {state.serialized_output}")
 
     wfr.shutdown()
+    agent_loop.call_soon_threadsafe(agent_loop.stop)
+    if model_router:
+        print(f"LLM routing: {model_router.metrics()}")
+    print(f"Prompt cache: {prompt_layout.metrics()}")
+    if llm_gateway:
+        print(f"LLM gateway: {llm_gateway.metrics()}")
+    if llm_cache:
+        print(f"LLM response cache: {llm_cache.metrics()}")
+        llm_cache.close()
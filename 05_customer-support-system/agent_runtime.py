@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Per-ticket agent runs from workflow activities
+Workflow activities are plain functions executed on the workflow worker's thread
+pool. Each one runs its agent with asyncio.run() on a copy of the module-level
+agent made for the ticket: the copy shares the configured LLM client, tools and
+prompt, but has its own memory and tool history, so concurrent tickets never see
+each other's messages. It also has its own shutdown event. In dapr-agents 0.9,
+Agent.run() races the conversation against that asyncio.Event, which binds to the
+first loop that awaits it, so a shared agent's runs on any later loop were
+cancelled and returned None.
+
+Synchronous tools block the loop they run on, so when the LLM asks for several
+tools in one turn dapr-agents would execute them one after another. Tools wrapped
+with offload_tools() run on a bounded thread pool instead, and the agent's
+asyncio.gather() over a turn's tool calls then runs them concurrently. The
+executor hop carries the caller's context variables along (such as the current
+trace span), which run_in_executor() doesn't do by default.
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+from concurrent.futures import Executor
+from typing import Any, List
+
+from dapr_agents.tool.base import AgentTool
+
+
+def ticket_agent(agent):
+    """A copy of `agent` for one ticket: same LLM client, tools and prompt; own memory, tool history and shutdown event"""
+    copy = agent.model_copy(update={"memory": type(agent.memory)(), "tool_history": []})
+    copy._shutdown_event = asyncio.Event()
+    return copy
+
+
+def run_ticket_agent(agent, input_data: Any) -> Any:
+    """Run `input_data` on a ticket copy of `agent` in a new event loop and return its final message
+
+    Raises RuntimeError when the run was cancelled instead of returning None.
+    """
+    result = asyncio.run(ticket_agent(agent).run(input_data))
+    if result is None:
+        raise RuntimeError(f"{agent.name} run was cancelled before it produced an answer")
+    return result
+
+
+def offload_tools(tools: List[AgentTool], executor: Executor) -> List[AgentTool]:
+    """Return async copies of synchronous tools that execute on `executor`
+
+    The originals are left untouched so they can still be called directly from
+    activities and workflow code.
+    """
+    offloaded = []
+    for agent_tool in tools:
+        if inspect.iscoroutinefunction(agent_tool.func):
+            offloaded.append(agent_tool)
+            continue
+
+        def bind(func):
+            @functools.wraps(func)
+            async def run_in_executor(**kwargs):
+                loop = asyncio.get_running_loop()
+                context = contextvars.copy_context()
+                return await loop.run_in_executor(executor, functools.partial(context.run, func, **kwargs))
+            return run_in_executor
+
+        offloaded.append(
+            AgentTool(
+                description=agent_tool.description,
+                args_model=agent_tool.args_model,
+                func=bind(agent_tool.func),
+            )
+        )
+    return offloaded
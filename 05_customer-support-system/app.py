@@ -1,22 +1,39 @@
 #!/usr/bin/env python3
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Query
+from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel, Field
 from contextlib import asynccontextmanager
 from dapr.ext.workflow.workflow_runtime import WorkflowRuntime
 from dapr.ext.workflow import DaprWorkflowClient
-from datetime import timedelta
+from datetime import datetime, timedelta
 import dapr.ext.workflow as wf
-from dapr.clients import DaprClient
 from dapr.clients.grpc.conversation import ConversationInputAlpha2, ConversationMessage, ConversationMessageContent, ConversationMessageOfUser
 from dapr_agents import tool, Agent, OpenAIChatClient
+from dapr_client_pool import DaprClientPool, is_already_exists
+from agent_runtime import offload_tools, run_ticket_agent
+from concurrent.futures import ThreadPoolExecutor
+from state_cache import StateCache, INVALIDATION_TOPIC
+from state_listing import DATA_STORES, DirectoryRecorder, fetch_page, encode_cursor, decode_cursor
+from knowledge_base import KnowledgeBase
+from tracing import Tracer, workflow_span_id
+from metrics import SupportMetrics
+from ticket_events import TicketEventHub, PendingApprovals, EVENTS_TOPIC
+from ticket_index import TicketIndex, TerminalStatusCache
+from claim_check import CLAIM_KEY, claim_check_from_env
 
-import os, json, time, asyncio
+import os, sys, json, time, threading, asyncio, uuid
 from dataclasses import dataclass
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import logging
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.llm_cache import cache_chat_client, cached_converse_alpha2, estimate_tokens, llm_cache_from_env
+from common.llm_gateway import gateway_chat_client, gateway_dapr_client, llm_gateway_from_env
+from common.model_router import RoutePolicy, model_router_from_env, route_chat_client
+from common.prompt_layout import PromptLayout, use_prompt_layout
+
 # Load environment variables
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
@@ -24,6 +41,119 @@ logging.basicConfig(level=logging.INFO)
 # Initialize Workflow Runtime
 wfr = WorkflowRuntime()
 
+# Per-ticket spans for the workflow, activities, tools, LLM and Dapr calls (GET /support/trace/{ticket_id})
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+# Prometheus metrics (GET /metrics), derived from the same spans; works with tracing disabled
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+TRACE_EXPORTERS = {name.strip() for name in os.getenv("TRACE_EXPORTERS", "").split(",") if name.strip()}
+tracer = Tracer(
+    enabled=TRACING_ENABLED or METRICS_ENABLED,
+    store=TRACING_ENABLED,
+    max_tickets=int(os.getenv("TRACE_MAX_TICKETS", "1000")),
+    file_path=os.getenv("TRACE_FILE", "traces.jsonl") if "file" in TRACE_EXPORTERS else None,
+    console="console" in TRACE_EXPORTERS,
+)
+support_metrics = SupportMetrics(tracer, approvals_pending=lambda: pending_approvals.count()) if METRICS_ENABLED else None
+if support_metrics is not None:
+    tracer.add_listener(support_metrics.on_span, kinds=support_metrics.kinds)
+
+# Shared Dapr clients, opened and closed with the FastAPI lifespan
+dapr_pool = DaprClientPool(
+    size=int(os.getenv("DAPR_CLIENT_POOL_SIZE", "4")),
+    acquire_timeout=float(os.getenv("DAPR_CLIENT_POOL_TIMEOUT", "10")),
+    tracer=tracer,
+)
+# Read-through cache for customer and system records (rarely change, read on every ticket)
+state_cache = StateCache(
+    dapr_pool,
+    max_entries=int(os.getenv("STATE_CACHE_MAX_ENTRIES", "1024")),
+    ttl=float(os.getenv("STATE_CACHE_TTL_SECONDS", "60")),
+)
+CACHED_STORES = ("customer-state", "system-state")
+
+# Bounded pool that agent tools run on, so independent tool calls from one LLM turn run concurrently
+tool_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("AGENT_TOOL_WORKERS", "16")), thread_name_prefix="agent-tool"
+)
+# Fetch customer and system records as parallel workflow activities before triage
+PARALLEL_TRIAGE_LOOKUPS = os.getenv("PARALLEL_TRIAGE_LOOKUPS", "false").lower() == "true"
+# Agent prompts as a fixed prefix (instructions, task steps) followed by the ticket's fields,
+# so the provider's prompt cache serves the prefix across tickets
+STABLE_PROMPT_PREFIX = os.getenv("STABLE_PROMPT_PREFIX", "true").lower() == "true"
+# Approval wait: the customer hears "still under review" after the SLA, support staff get
+# reminders before that, each waiting BACKOFF times longer than the last (up to MAX)
+APPROVAL_SLA_SECONDS = float(os.getenv("APPROVAL_SLA_SECONDS", "86400"))
+APPROVAL_REMINDER_SECONDS = float(os.getenv("APPROVAL_REMINDER_SECONDS", "3600"))
+APPROVAL_REMINDER_BACKOFF = float(os.getenv("APPROVAL_REMINDER_BACKOFF", "2"))
+APPROVAL_REMINDER_MAX_SECONDS = float(os.getenv("APPROVAL_REMINDER_MAX_SECONDS", "28800"))
+# Reminders after which a waiting workflow continues as new, so its history (and replay) stays short; 0 = never
+APPROVAL_CONTINUE_AS_NEW_REMINDERS = int(os.getenv("APPROVAL_CONTINUE_AS_NEW_REMINDERS", "4"))
+# Tickets parked in the approval wait (the approvals-pending gauge), tracked from the stage events the
+# activities publish. A ticket silent for longer than the longest reminder gap (terminated or purged) drops out
+pending_approvals = PendingApprovals(max_silence=min(
+    max(APPROVAL_REMINDER_SECONDS, APPROVAL_REMINDER_MAX_SECONDS) if APPROVAL_REMINDER_SECONDS > 0 else APPROVAL_SLA_SECONDS,
+    APPROVAL_SLA_SECONDS,
+) + 300)
+# Workflow scheduling calls in flight at once for POST /support/tickets:batch
+TICKET_BATCH_CONCURRENCY = int(os.getenv("TICKET_BATCH_CONCURRENCY", "32"))
+ticket_scheduler = ThreadPoolExecutor(max_workers=TICKET_BATCH_CONCURRENCY, thread_name_prefix="ticket-scheduler")
+# Local retrieval index behind query_knowledge_base, built once at startup
+knowledge_base = KnowledgeBase(
+    os.getenv("KNOWLEDGE_BASE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge")),
+    use_embeddings=os.getenv("KNOWLEDGE_BASE_EMBEDDINGS", "false").lower() == "true",
+    embedding_dim=int(os.getenv("KNOWLEDGE_BASE_EMBEDDING_DIM", "128")),
+)
+KNOWLEDGE_BASE_TOP_K = int(os.getenv("KNOWLEDGE_BASE_TOP_K", "5"))
+# Store for the app's own records (claim-check payloads, ticket index, LLM cache), kept apart from
+# analysis-state so GET /data lists only analyses
+INTERNAL_STATE_STORE = "internal-state"
+# Response cache in front of the agents' chat clients and the notification Conversation API call
+llm_cache = llm_cache_from_env(default_store=INTERNAL_STATE_STORE)
+# Every LLM call of the process waits here for the provider's rate limits and an adaptive
+# concurrency limit, and is retried on throttling; customer notifications are admitted first
+llm_gateway = llm_gateway_from_env()
+# Page sizes for GET /data
+DATA_PAGE_DEFAULT_LIMIT = int(os.getenv("DATA_PAGE_DEFAULT_LIMIT", "100"))
+DATA_PAGE_MAX_LIMIT = int(os.getenv("DATA_PAGE_MAX_LIMIT", "1000"))
+# Saved analysis keys, added to the analysis-state key directory write-behind (GET /data without query support)
+directory_recorder = DirectoryRecorder(dapr_pool)
+# Stage events behind GET /support/stream/{ticket_id} and long-poll GET /support/status/{ticket_id}
+ticket_events = TicketEventHub(max_tickets=int(os.getenv("TICKET_EVENTS_MAX_TICKETS", "10000")))
+STREAM_KEEPALIVE_SECONDS = float(os.getenv("STREAM_KEEPALIVE_SECONDS", "15"))
+STATUS_LONG_POLL_MAX_SECONDS = float(os.getenv("STATUS_LONG_POLL_MAX_SECONDS", "60"))
+# Workflow runtime statuses that can still produce stage events
+ACTIVE_WORKFLOW_STATUSES = ("RUNNING", "PENDING", "SUSPENDED")
+# Index of scheduled tickets by creation time behind GET /support/tickets (no execution-state scans)
+ticket_index = TicketIndex(
+    dapr_pool,
+    store_name=os.getenv("TICKET_INDEX_STORE", INTERNAL_STATE_STORE),
+    bucket_seconds=int(os.getenv("TICKET_INDEX_BUCKET_SECONDS", "300")),
+    lookback_seconds=float(os.getenv("TICKET_INDEX_LOOKBACK_HOURS", "168")) * 3600,
+)
+# Large activity results (LLM texts) go to a state store; workflow history keeps only references.
+# Stored payloads expire a week after the longest approval wait, once no workflow or status read needs them
+claim_check = claim_check_from_env(dapr_pool, default_store=INTERNAL_STATE_STORE,
+                                   default_ttl_seconds=int(APPROVAL_SLA_SECONDS) + 7 * 86400)
+TICKET_LIST_DEFAULT_LIMIT = int(os.getenv("TICKET_LIST_DEFAULT_LIMIT", "50"))
+TICKET_LIST_MAX_LIMIT = int(os.getenv("TICKET_LIST_MAX_LIMIT", "500"))
+TICKET_LIST_MAX_SCAN = int(os.getenv("TICKET_LIST_MAX_SCAN", "2000"))
+# Workflow state lookups in flight at once for POST /support/status:batch and status-filtered listings
+STATUS_LOOKUP_CONCURRENCY = int(os.getenv("STATUS_LOOKUP_CONCURRENCY", "32"))
+STATUS_BATCH_MAX_TICKETS = int(os.getenv("STATUS_BATCH_MAX_TICKETS", "1000"))
+status_executor = ThreadPoolExecutor(max_workers=STATUS_LOOKUP_CONCURRENCY, thread_name_prefix="status-lookup")
+# Finished workflows never change status, so listings and batches don't look them up again
+terminal_statuses = TerminalStatusCache()
+workflow_client: Optional[DaprWorkflowClient] = None
+_workflow_client_lock = threading.Lock()
+
+def get_workflow_client() -> DaprWorkflowClient:
+    """Return the process-wide workflow client, creating it on first use"""
+    global workflow_client
+    with _workflow_client_lock:
+        if workflow_client is None:
+            workflow_client = DaprWorkflowClient()
+        return workflow_client
+
 # === Data Models ===
 @dataclass
 class SupportTicket:
@@ -56,13 +186,15 @@ class TriageResult:
     user_reported_issue: str
     has_entitlement: bool
     additional_info: str
+    customer_found: bool = True
     
     def to_dict(self):
         return {
             "customer_info": self.customer_info.to_dict(),
             "user_reported_issue": self.user_reported_issue,
             "has_entitlement": self.has_entitlement,
-            "additional_info": self.additional_info
+            "additional_info": self.additional_info,
+            "customer_found": self.customer_found
         }
 
 @dataclass
@@ -88,116 +220,116 @@ class SolutionUpdate:
     def from_dict(data):
         return SolutionUpdate(**data)
 
+# === Structured Output Models ===
+# JSON schema the triage agent answers with (mirrors TriageResult; strict-mode compatible)
+class SystemSummaryOutput(BaseModel):
+    environment: str = Field(description="Deployment environment, e.g. Production")
+    dapr_version: str = Field(description="Dapr runtime version")
+    kubernetes_version: str = Field(description="Kubernetes version")
+    cloud_provider: str = Field(description="Cloud provider")
+    region: str = Field(description="Cloud region")
+
+class CustomerInfoOutput(BaseModel):
+    customer_id: str = Field(description="Customer identifier")
+    name: str = Field(description="Customer name, empty if the customer was not found")
+    support_entitlement: bool = Field(description="support_entitlement value from the customer record")
+    system_info: SystemSummaryOutput
+
+class TriageOutput(BaseModel):
+    customer_info: CustomerInfoOutput
+    user_reported_issue: str = Field(description="The issue as reported by the user")
+    has_entitlement: bool = Field(description="True only if the customer record has support_entitlement set to true")
+    customer_found: bool = Field(description="False if the customer lookup returned an error")
+    additional_info: str = Field(description="Triage summary: system details, relevant context and recommended focus")
+    
+    def to_triage_result(self) -> TriageResult:
+        info = self.customer_info
+        return TriageResult(
+            customer_info=CustomerInfo(
+                customer_id=info.customer_id,
+                name=info.name,
+                support_entitlement=info.support_entitlement,
+                system_info=info.system_info.model_dump()
+            ),
+            user_reported_issue=self.user_reported_issue,
+            has_entitlement=self.has_entitlement,
+            additional_info=self.additional_info,
+            customer_found=self.customer_found
+        )
+
+def strip_json_fences(content: str) -> str:
+    text = (content or "").strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    return text
+
+def is_valid_triage_output(content: str) -> bool:
+    """Whether the triage agent's answer matches TriageOutput (a smaller model's answer is retried on a larger one if not)"""
+    try:
+        TriageOutput.model_validate_json(strip_json_fences(content))
+        return True
+    except ValueError:
+        return False
+
 # === Agent Tools ===
 @tool
+@tracer.traced("tool")
 def lookup_customer(customer_id: str) -> Dict[str, Any]:
     """Look up customer information by customer ID using Dapr state store"""
     try:
-        with DaprClient() as client:
-            result = client.get_state("customer-state", customer_id)
-            if result.data:
-                customer_data = json.loads(result.data)
-                logging.info(f"Found customer: {customer_id}")
-                return customer_data
-            else:
-                logging.warning(f"Customer not found: {customer_id}")
-                return {"error": f"Customer {customer_id} not found"}
+        customer_data = state_cache.get_json("customer-state", customer_id)
+        if customer_data:
+            logging.info(f"Found customer: {customer_id}")
+            return customer_data
+        else:
+            logging.warning(f"Customer not found: {customer_id}")
+            return {"error": f"Customer {customer_id} not found"}
     except Exception as e:
         logging.error(f"Error looking up customer {customer_id}: {e}")
         return {"error": f"Failed to lookup customer: {str(e)}"}
 
 @tool
+@tracer.traced("tool")
 def lookup_system_info(customer_id: str) -> Dict[str, Any]:
     """Look up customer's system information using Dapr state store"""
     try:
-        with DaprClient() as client:
-            result = client.get_state("system-state", customer_id)
-            if result.data:
-                system_data = json.loads(result.data)
-                logging.info(f"Found system info for customer: {customer_id}")
-                return system_data
-            else:
-                logging.warning(f"System info not found for customer: {customer_id}")
-                return {"error": f"System info not found for customer {customer_id}"}
+        system_data = state_cache.get_json("system-state", customer_id)
+        if system_data:
+            logging.info(f"Found system info for customer: {customer_id}")
+            return system_data
+        else:
+            logging.warning(f"System info not found for customer: {customer_id}")
+            return {"error": f"System info not found for customer {customer_id}"}
     except Exception as e:
         logging.error(f"Error looking up system info for {customer_id}: {e}")
         return {"error": f"Failed to lookup system info: {str(e)}"}
 
 @tool
+@tracer.traced("tool")
 def query_knowledge_base(query_focus: str, context_info: str = "") -> Dict[str, Any]:
-    """Query the knowledge base for specific aspects of issues and solutions (MCP call simulation)"""
-    # This simulates an MCP call to a knowledge base
-    # In a real implementation, this would make an actual MCP call
+    """Query the knowledge base for specific aspects of issues and solutions"""
     try:
-        # Simulate different types of knowledge base responses based on query focus
-        knowledge_responses = {
-            "connection": {
-                "similar_issues": [
-                    {
-                        "issue": "Dapr sidecar connection timeout to state store",
-                        "solution": "Increase connection timeout in component configuration, verify network connectivity",
-                        "confidence": 0.90
-                    },
-                    {
-                        "issue": "Redis connection refused errors",
-                        "solution": "Check Redis server status, verify port and host configuration",
-                        "confidence": 0.85
-                    }
-                ],
-                "technical_details": "Connection issues often stem from network configuration, firewall rules, or service discovery problems",
-                "confidence_score": 0.88
-            },
-            "configuration": {
-                "similar_issues": [
-                    {
-                        "issue": "State store component misconfiguration",
-                        "solution": "Verify component YAML syntax, check metadata fields and connection strings",
-                        "confidence": 0.92
-                    },
-                    {
-                        "issue": "Invalid component metadata",
-                        "solution": "Review component specification, ensure required fields are present",
-                        "confidence": 0.80
-                    }
-                ],
-                "technical_details": "Configuration errors are common with component metadata, connection strings, and YAML formatting",
-                "confidence_score": 0.86
-            },
-            "version": {
-                "similar_issues": [
-                    {
-                        "issue": "Dapr version compatibility issues",
-                        "solution": "Check component version compatibility matrix, upgrade to compatible versions",
-                        "confidence": 0.75
-                    },
-                    {
-                        "issue": "Breaking changes between versions",
-                        "solution": "Review migration guide and update configurations accordingly",
-                        "confidence": 0.70
-                    }
-                ],
-                "technical_details": "Version mismatches can cause unexpected behavior and connection failures",
-                "confidence_score": 0.73
-            }
-        }
+        query = f"{query_focus} {context_info}".strip()
+        results = knowledge_base.search(query, k=KNOWLEDGE_BASE_TOP_K)
         
-        # Determine response based on query focus
-        query_lower = query_focus.lower()
-        if "connection" in query_lower or "timeout" in query_lower or "connect" in query_lower:
-            response_type = "connection"
-        elif "config" in query_lower or "component" in query_lower or "yaml" in query_lower:
-            response_type = "configuration"
-        elif "version" in query_lower or "compatibility" in query_lower:
-            response_type = "version"
-        else:
-            # Default comprehensive response
-            response_type = "connection"
-        
-        knowledge_results = knowledge_responses[response_type].copy()
-        knowledge_results["query_focus"] = query_focus
-        knowledge_results["context_considered"] = bool(context_info)
+        knowledge_results = {
+            "similar_issues": [
+                {
+                    "issue": result["issue"],
+                    "solution": result["solution"],
+                    "confidence": result["confidence"],
+                    "score": result["score"],
+                    "source": result["source"]
+                }
+                for result in results
+            ],
+            "technical_details": results[0]["technical_details"] if results else "No matching articles found in the knowledge base",
+            "confidence_score": results[0]["confidence"] if results else 0.0,
+            "query_focus": query_focus,
+            "context_considered": bool(context_info)
+        }
         
-        logging.info(f"Knowledge base query completed - Focus: {query_focus[:50]}...")
+        logging.info(f"Knowledge base query completed - Focus: {query_focus[:50]}... ({len(results)} result(s))")
         return knowledge_results
         
     except Exception as e:
@@ -205,12 +337,14 @@ def query_knowledge_base(query_focus: str, context_info: str = "") -> Dict[str,
         return {"error": f"Knowledge base query failed: {str(e)}"}
 
 @tool
+@tracer.traced("tool")
 def store_analysis_result(ticket_id: str, analysis_result: Dict[str, Any]) -> Dict[str, Any]:
     """Store the expert analysis result using Dapr state store"""
     try:
-        with DaprClient() as client:
+        with dapr_pool.client() as client:
             analysis_key = f"analysis-{ticket_id}"
             client.save_state("analysis-state", analysis_key, json.dumps(analysis_result))
+            directory_recorder.add("analysis-state", [analysis_key])
             logging.info(f"Stored analysis result for ticket: {ticket_id}")
             return {"success": True, "message": f"Analysis stored for ticket {ticket_id}"}
     except Exception as e:
@@ -218,19 +352,22 @@ def store_analysis_result(ticket_id: str, analysis_result: Dict[str, Any]) -> Di
         return {"success": False, "error": f"Failed to store analysis: {str(e)}"}
 
 @tool
+@tracer.traced("tool")
 def publish_solution_notification(ticket_id: str, message: str) -> Dict[str, Any]:
     """Publish a notification that the solution is ready for review"""
     try:
-        with DaprClient() as client:
+        with dapr_pool.client() as client:
             notification_data = {
+                "id": uuid.uuid4().hex,
                 "ticket_id": ticket_id,
                 "message": message,
                 "timestamp": time.time(),
-                "status": "solution_ready"
+                "status": "solution_ready",
+                "stage": "awaiting_approval"
             }
             client.publish_event(
                 pubsub_name="support-pubsub",
-                topic_name="solution-notifications",
+                topic_name=EVENTS_TOPIC,
                 data=json.dumps(notification_data),
                 data_content_type="application/json"
             )
@@ -240,7 +377,29 @@ def publish_solution_notification(ticket_id: str, message: str) -> Dict[str, Any
         logging.error(f"Error publishing notification for ticket {ticket_id}: {e}")
         return {"success": False, "error": f"Failed to publish notification: {str(e)}"}
 
+def publish_ticket_stage(ticket_id: str, stage: str, **details):
+    """Publish a stage transition to the status streams; failures are logged, never raised"""
+    try:
+        with dapr_pool.client() as client:
+            client.publish_event(
+                pubsub_name="support-pubsub",
+                topic_name=EVENTS_TOPIC,
+                data=json.dumps({"id": uuid.uuid4().hex, "ticket_id": ticket_id, "stage": stage,
+                                 "timestamp": time.time(), **details}),
+                data_content_type="application/json"
+            )
+    except Exception as e:
+        logging.warning(f"Failed to publish stage {stage} for ticket {ticket_id}: {e}")
+
 # === Agents ===
+# Model tier per call: the triage lookups and the customer message start on the small
+# model, expert analysis on the large one; invalid answers are retried one tier up
+model_router = model_router_from_env({
+    "triage": RoutePolicy(task="lookup", validator=is_valid_triage_output),
+    "expert": RoutePolicy(task="analysis"),
+    "notification": RoutePolicy(task="draft"),
+})
+
 # Triage Agent
 triage_agent = Agent(
     name="Support Triage Agent",
@@ -248,13 +407,21 @@ triage_agent = Agent(
     goal="Analyze support tickets and validate customer entitlements",
     instructions=[
         "Look up customer information by ID using the lookup_customer tool",
-        "Check if customer has support entitlement",
         "Look up customer's system information using lookup_system_info tool",
+        "The two lookups are independent: request both tools in the same turn",
+        "Check if customer has support entitlement",
         "Provide a comprehensive triage analysis including customer details, entitlement status, and system information",
-        "Format the response clearly with all relevant details"
+        "Take has_entitlement strictly from the customer record's support_entitlement field; never infer it from the plan or environment",
+        "Respond only with a JSON object matching this schema, without Markdown fences: "
+        + json.dumps(TriageOutput.model_json_schema())
     ],
-    tools=[lookup_customer, lookup_system_info],
-    llm=OpenAIChatClient(model="gpt-4o")
+    tools=offload_tools([lookup_customer, lookup_system_info], tool_executor),
+    llm=route_chat_client(
+        tracer.trace_chat_client(cache_chat_client(
+            gateway_chat_client(OpenAIChatClient(model="gpt-4o"), llm_gateway, "normal"), llm_cache
+        )),
+        model_router, "triage"
+    )
 )
 
 # Dapr Expert Agent  
@@ -265,6 +432,7 @@ expert_agent = Agent(
     instructions=[
         "Analyze the provided issue description and system information thoroughly",
         "Query the knowledge base multiple times with different approaches to gather comprehensive information",
+        "Issue independent knowledge base queries together in the same turn rather than one per turn",
         "Look for similar issues, root causes, and proven solutions",
         "Cross-reference different aspects of the problem (configuration, networking, versions, etc.)",
         "Synthesize findings from multiple queries into a detailed technical analysis",
@@ -273,15 +441,45 @@ expert_agent = Agent(
         "Be exhaustive in your research - query as many relevant aspects as needed",
         "Return a comprehensive analysis with clear problem identification and solution recommendations"
     ],
-    tools=[query_knowledge_base],
-    llm=OpenAIChatClient(model="gpt-4o")
+    tools=offload_tools([query_knowledge_base], tool_executor),
+    llm=route_chat_client(
+        tracer.trace_chat_client(cache_chat_client(
+            gateway_chat_client(OpenAIChatClient(model="gpt-4o"), llm_gateway, "low"), llm_cache
+        )),
+        model_router, "expert"
+    )
 )
 
+# Fixed prompt prefixes; the activities send only the ticket's fields after them
+triage_layout = PromptLayout.for_agent(triage_agent, steps=[
+    "Look up the customer information, unless Customer Information is given in the request",
+    "Check their support entitlement",
+    "Look up their system information, unless System Information is given in the request",
+    "Information given in the request was already looked up: do not look it up again",
+    "Provide a comprehensive triage summary",
+])
+expert_layout = PromptLayout.for_agent(expert_agent, steps=[
+    "Deeply analyze the issue using multiple knowledge base queries",
+    "Research similar problems and their solutions",
+    "Consider the customer's specific system configuration",
+    "Query different aspects: configuration issues, network problems, version compatibility, etc.",
+    "Provide a comprehensive technical analysis with specific solutions",
+    "Include step-by-step resolution instructions",
+    "Be thorough - use the knowledge base tool multiple times to gather all relevant information",
+])
+if STABLE_PROMPT_PREFIX:
+    use_prompt_layout(triage_agent, triage_layout)
+    use_prompt_layout(expert_agent, expert_layout)
+
+def response_text(response) -> str:
+    """Text of a Conversation API response's first choice"""
+    return (response.outputs[0].choices[0].message.content or "") if response.outputs else ""
+
 # Notification function using Dapr Conversation API
 def create_customer_notification(ticket_id: str, final_solution: str, support_notes: str) -> str:
     """Create customer notification using Dapr Conversation API"""
     try:
-        with DaprClient() as client:
+        with dapr_pool.client() as client:
             # Prepare the conversation input
             prompt = f"""Create a professional customer update message for:
 - Ticket ID: {ticket_id}
@@ -310,19 +508,43 @@ Format the response as a direct customer message without any additional formatti
                 )
             ]
             
-            metadata = {
-                'model': 'gpt-4o',
-                'temperature': '0.3',
-                'cacheTTL': '5m'
-            }
+            def converse(component: str, model: str):
+                metadata = {
+                    'model': model,
+                    'temperature': '0.3',
+                    'cacheTTL': '5m'
+                }
+                
+                # Make the conversation API call (served from the response cache for repeated prompts)
+                with tracer.span("llm.converse_alpha2", "llm", component=component, model=model) as span:
+                    response = cached_converse_alpha2(
+                        llm_cache,
+                        gateway_dapr_client(client, llm_gateway, "high"),
+                        name=component,
+                        inputs=inputs,
+                        temperature=0.3,
+                        metadata=metadata
+                    )
+                    if span is not None and response.outputs:
+                        # The Conversation API doesn't report usage, so token counts are estimated
+                        span.set(
+                            prompt_tokens=estimate_tokens(prompt),
+                            completion_tokens=estimate_tokens(response_text(response)),
+                            tokens_estimated=True
+                        )
+                return response
             
-            # Make the conversation API call
-            response = client.converse_alpha2(
-                name='openai',
-                inputs=inputs,
-                temperature=0.3,
-                metadata=metadata
-            )
+            if model_router is None:
+                response = converse('openai', 'gpt-4o')
+            else:
+                # A message that doesn't mention the ticket is redrafted by the next larger model
+                response = model_router.run(
+                    "notification", estimate_tokens(prompt),
+                    lambda tier: converse(tier.component, tier.model),
+                    answer=response_text,
+                    usage=lambda response: (estimate_tokens(prompt), estimate_tokens(response_text(response)), False),
+                    validator=lambda text: ticket_id in text
+                )
             
             # Extract the response
             if response.outputs:
@@ -338,15 +560,102 @@ Format the response as a direct customer message without any additional formatti
         # Fallback message
         return f"Dear Customer, your support ticket {ticket_id} has been processed by our team. Thank you for your patience."
 
+def parse_triage_output(content: str) -> TriageOutput:
+    """Validate the triage agent's JSON answer, asking the LLM to restructure it if it doesn't conform"""
+    try:
+        return TriageOutput.model_validate_json(strip_json_fences(content))
+    except ValueError as e:
+        logging.warning(f"Triage output did not match the schema, requesting structured output: {e}")
+        return triage_agent.llm.generate(
+            messages=[
+                {"role": "system", "content": "Convert this support ticket triage into the requested structure. Copy facts exactly."},
+                {"role": "user", "content": content}
+            ],
+            response_format=TriageOutput
+        )
+
 # === Activities ===
+def ticket_id_from_instance(instance_id: str) -> str:
+    """Ticket ID of a workflow instance ID (support-<ticket_id>)"""
+    return instance_id.removeprefix("support-")
+
+def slim_payload(ticket_id: str, name: str, value: Any) -> Any:
+    """A claim-check reference in place of a large activity result value"""
+    return claim_check.put(ticket_id, name, value) if claim_check else value
+
+def slim_triage_result(triage_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Triage result for the workflow history; its analysis text (in it twice) becomes one stored payload"""
+    analysis = slim_payload(triage_result["ticket_id"], "triage_analysis", triage_result["triage_analysis"])
+    triage_result["triage_analysis"] = triage_result["triage"]["additional_info"] = analysis
+    return triage_result
+
+def slim_expert_result(analysis_result: Dict[str, Any], stored: bool) -> Dict[str, Any]:
+    """Expert result for the workflow history; a stored analysis record is referenced rather than copied"""
+    if claim_check:
+        ticket_id, text = analysis_result["ticket_id"], analysis_result["expert_analysis"]
+        analysis_result["expert_analysis"] = (
+            claim_check.reference("analysis-state", f"analysis-{ticket_id}", "expert_analysis", text)
+            if stored else claim_check.put(ticket_id, "expert_analysis", text)
+        )
+    return analysis_result
+
+def resolve_payloads(document: Any) -> Any:
+    """`document` with its claim-check references replaced by the stored values"""
+    return claim_check.resolve(document) if claim_check else document
+
+@tracer.traced_activity(ticket_id_from_instance)
+def lookup_customer_activity(ctx, customer_id: str) -> Dict[str, Any]:
+    """Fan-out activity: customer record lookup ahead of triage"""
+    return lookup_customer(customer_id)
+
+@tracer.traced_activity(ticket_id_from_instance)
+def lookup_system_info_activity(ctx, customer_id: str) -> Dict[str, Any]:
+    """Fan-out activity: system information lookup ahead of triage"""
+    return lookup_system_info(customer_id)
+
+@tracer.traced_activity(ticket_id_from_instance)
 def triage_activity(ctx, ticket_data: Dict[str, Any]) -> Dict[str, Any]:
     """First activity: Triage the support ticket"""
     try:
-        ticket = SupportTicket.from_dict(ticket_data)
+        ticket = SupportTicket.from_dict({
+            "ticket_id": ticket_data["ticket_id"],
+            "customer_id": ticket_data["customer_id"],
+            "description": ticket_data["description"]
+        })
         logging.info(f"Starting triage for ticket: {ticket.ticket_id}")
+        publish_ticket_stage(ticket.ticket_id, "triage_started")
         
         # Run triage agent
-        triage_prompt = f"""
+        prefetched = ticket_data.get("prefetched_lookups")
+        if STABLE_PROMPT_PREFIX:
+            fields = {
+                "Ticket ID": ticket.ticket_id,
+                "Customer ID": ticket.customer_id,
+                "Issue Description": ticket.description,
+            }
+            if prefetched:
+                # The workflow already fetched both records in parallel
+                fields["Customer Information"] = prefetched.get("customer")
+                fields["System Information"] = prefetched.get("system")
+            triage_prompt = triage_layout.user(fields)
+        elif prefetched:
+            # The workflow already fetched both records in parallel
+            triage_prompt = f"""
+        Analyze this support ticket:
+        - Ticket ID: {ticket.ticket_id}
+        - Customer ID: {ticket.customer_id}
+        - Issue Description: {ticket.description}
+        - Customer Information: {json.dumps(prefetched.get("customer"))}
+        - System Information: {json.dumps(prefetched.get("system"))}
+        
+        The customer and system information above was already looked up; do not look it up again.
+        
+        Please:
+        1. Check their support entitlement
+        2. Provide a comprehensive triage summary
+        """
+        else:
+            triage_prompt = f"""
         Analyze this support ticket:
         - Ticket ID: {ticket.ticket_id}
         - Customer ID: {ticket.customer_id}
@@ -359,33 +668,59 @@ def triage_activity(ctx, ticket_data: Dict[str, Any]) -> Dict[str, Any]:
         4. Provide a comprehensive triage summary
         """
         
-        response = asyncio.run(triage_agent.run(triage_prompt))
+        with tracer.span(triage_agent.name, "agent"):
+            response = run_ticket_agent(triage_agent, triage_prompt)
+        content = response.content if hasattr(response, 'content') else str(response)
+        triage = parse_triage_output(content).to_triage_result()
+        
+        if prefetched:
+            # The workflow already holds the customer record, so entitlement comes from it directly
+            customer = prefetched.get("customer") or {}
+            triage.customer_found = not customer.get("error")
+            triage.has_entitlement = bool(customer.get("support_entitlement")) if triage.customer_found else False
         
-        # Parse the response to extract structured data
-        # In a real implementation, you might want to use structured output
         triage_result = {
             "ticket_id": ticket.ticket_id,
             "customer_id": ticket.customer_id,
             "user_reported_issue": ticket.description,
-            "triage_analysis": response.content if hasattr(response, 'content') else str(response),
+            "triage_analysis": triage.additional_info,
+            "triage": triage.to_dict(),
             "timestamp": time.time()
         }
         
         logging.info(f"Triage completed for ticket: {ticket.ticket_id}")
-        return triage_result
+        # Without a customer record or entitlement the workflow ends here
+        publish_ticket_stage(
+            ticket.ticket_id, "triage_completed",
+            customer_found=triage.customer_found, has_entitlement=triage.has_entitlement,
+            final=not (triage.customer_found and triage.has_entitlement)
+        )
+        return slim_triage_result(triage_result)
         
     except Exception as e:
         logging.error(f"Error in triage activity: {e}")
+        publish_ticket_stage(ticket_data.get("ticket_id"), "triage_failed", error=str(e))
         return {"error": f"Triage failed: {str(e)}"}
 
+@tracer.traced_activity(ticket_id_from_instance)
 def expert_analysis_activity(ctx, triage_data: Dict[str, Any]) -> Dict[str, Any]:
     """Second activity: Expert analysis of the issue, followed by storage and notification"""
     try:
+        triage_data = resolve_payloads(triage_data)
         ticket_id = triage_data.get("ticket_id")
         logging.info(f"Starting expert analysis for ticket: {ticket_id}")
+        publish_ticket_stage(ticket_id, "analysis_started")
         
         # Run expert agent for deep analysis
-        expert_prompt = f"""
+        if STABLE_PROMPT_PREFIX:
+            expert_prompt = expert_layout.user({
+                "Ticket ID": ticket_id,
+                "Customer ID": triage_data.get('customer_id'),
+                "Issue": triage_data.get('user_reported_issue'),
+                "Triage Analysis": triage_data.get('triage_analysis'),
+            })
+        else:
+            expert_prompt = f"""
         Perform comprehensive expert analysis on this support case:
         - Ticket ID: {ticket_id}
         - Customer ID: {triage_data.get('customer_id')}
@@ -403,7 +738,8 @@ def expert_analysis_activity(ctx, triage_data: Dict[str, Any]) -> Dict[str, Any]
         Be thorough - use the knowledge base tool multiple times to gather all relevant information.
         """
         
-        response = asyncio.run(expert_agent.run(expert_prompt))
+        with tracer.span(expert_agent.name, "agent"):
+            response = run_ticket_agent(expert_agent, expert_prompt)
         expert_analysis_text = response.content if hasattr(response, 'content') else str(response)
         
         # Prepare the analysis result
@@ -415,11 +751,14 @@ def expert_analysis_activity(ctx, triage_data: Dict[str, Any]) -> Dict[str, Any]
         }
         
         logging.info(f"Expert analysis completed for ticket: {ticket_id}")
+        publish_ticket_stage(ticket_id, "analysis_completed")
         
         # Store the analysis result using Dapr state store
+        stored = False
         try:
             storage_result = store_analysis_result(ticket_id, analysis_result)
-            if not storage_result.get("success", False):
+            stored = storage_result.get("success", False)
+            if not stored:
                 logging.warning(f"Failed to store analysis for ticket {ticket_id}: {storage_result.get('error')}")
             else:
                 logging.info(f"Analysis stored successfully for ticket: {ticket_id}")
@@ -437,17 +776,21 @@ def expert_analysis_activity(ctx, triage_data: Dict[str, Any]) -> Dict[str, Any]
         except Exception as e:
             logging.error(f"Error publishing notification for ticket {ticket_id}: {e}")
         
-        return analysis_result
+        return slim_expert_result(analysis_result, stored)
         
     except Exception as e:
         logging.error(f"Error in expert analysis activity: {e}")
+        publish_ticket_stage(triage_data.get("ticket_id"), "analysis_failed", error=str(e))
         return {"error": f"Expert analysis failed: {str(e)}"}
 
+@tracer.traced_activity(ticket_id_from_instance)
 def customer_notification_activity(ctx, final_data: Dict[str, Any]) -> Dict[str, Any]:
     """Third activity: Send customer notification using Dapr Conversation API"""
     try:
         ticket_id = final_data.get("ticket_id")
         logging.info(f"Creating customer notification for ticket: {ticket_id}")
+        if not final_data.get("approved"):
+            publish_ticket_stage(ticket_id, "approval_timed_out")
         
         # Use Dapr Conversation API to create the notification
         customer_message = create_customer_notification(
@@ -458,90 +801,182 @@ def customer_notification_activity(ctx, final_data: Dict[str, Any]) -> Dict[str,
         
         notification_result = {
             "ticket_id": ticket_id,
-            "customer_message": customer_message,
+            "customer_message": slim_payload(ticket_id, "customer_message", customer_message),
             "timestamp": time.time(),
             "status": "customer_notified"
         }
         
         logging.info(f"Customer notification created for ticket: {ticket_id}")
+        publish_ticket_stage(ticket_id, "notified", approved=bool(final_data.get("approved")))
         return notification_result
         
     except Exception as e:
         logging.error(f"Error in customer notification activity: {e}")
+        publish_ticket_stage(final_data.get("ticket_id"), "notification_failed", error=str(e))
         return {"error": f"Customer notification failed: {str(e)}"}
 
+@tracer.traced_activity(ticket_id_from_instance)
+def approval_reminder_activity(ctx, reminder: Dict[str, Any]) -> Dict[str, Any]:
+    """Remind the support team of a solution still waiting for approval, escalating with each reminder"""
+    ticket_id = reminder.get("ticket_id")
+    level = reminder.get("level", 1)
+    log = logging.warning if level > 1 else logging.info
+    log(f"Ticket {ticket_id} still awaiting approval after {reminder.get('waited_seconds', 0) / 3600:.1f}h "
+        f"(reminder {level}, SLA {reminder.get('sla_seconds', 0) / 3600:.1f}h)")
+    publish_ticket_stage(ticket_id, "approval_reminder", level=level, waited_seconds=reminder.get("waited_seconds"),
+                         sla_seconds=reminder.get("sla_seconds"))
+    return {"ticket_id": ticket_id, "level": level}
+
 # === Main Workflow ===
 def customer_support_workflow(ctx: wf.DaprWorkflowContext, ticket_data: Dict[str, Any]):
-    """Main customer support workflow orchestrating the three agents"""
+    """Main customer support workflow, recorded as the root span of its ticket's trace"""
+    ticket_id = ticket_data.get("ticket_id", "unknown")
+    # Timestamps come from workflow time, so replays reproduce the original start and end.
+    # An execution continued as new carries the original start in its approval state.
+    approval = ticket_data.get("approval")
+    tracer.start_span(
+        ticket_id, "customer_support_workflow", "workflow", span_id=workflow_span_id(ticket_id),
+        start=datetime.fromisoformat(approval["workflow_started_at"]) if approval else ctx.current_utc_datetime,
+        instance_id=ctx.instance_id
+    )
+    result = yield from run_support_workflow(ctx, ticket_data)
+    if result.get("status") == "awaiting_approval":
+        # Continued as new: the next execution finishes the ticket
+        return result
+    if not ctx.is_replaying:
+        tracer.end_span(
+            ticket_id, workflow_span_id(ticket_id), end=ctx.current_utc_datetime,
+            status="error" if "error" in result else "ok", outcome=result.get("status")
+        )
+    return result
+
+# wait_for_approval() result when the workflow should continue as new and keep waiting
+CONTINUE_WAITING = object()
+
+def approval_reminder_offsets() -> List[float]:
+    """Seconds after the wait started at which reminders fire, ending before the SLA"""
+    offsets, offset, interval = [], 0.0, APPROVAL_REMINDER_SECONDS
+    while interval > 0 and offset + interval < APPROVAL_SLA_SECONDS:
+        offset += interval
+        offsets.append(offset)
+        interval = min(interval * APPROVAL_REMINDER_BACKOFF, APPROVAL_REMINDER_MAX_SECONDS)
+    return offsets
+
+def wait_for_approval(ctx: wf.DaprWorkflowContext, ticket_id: str, approval: Dict[str, Any]):
+    """Wait for solution_approved on durable timers; the parked workflow holds no worker or memory
+
+    Returns the approval event, None once the SLA ran out, or CONTINUE_WAITING after
+    APPROVAL_CONTINUE_AS_NEW_REMINDERS reminders. Timers are absolute times from the
+    wait's start, so they line up across continue_as_new.
+    """
+    since = datetime.fromisoformat(approval["since"])
+    deadline = since + timedelta(seconds=APPROVAL_SLA_SECONDS)
+    offsets = approval_reminder_offsets()
+    solution_update_event = ctx.wait_for_external_event("solution_approved")
+    while True:
+        reminders = approval["reminders"]
+        fire_at = since + timedelta(seconds=offsets[reminders]) if reminders < len(offsets) else deadline
+        if not ctx.is_replaying:
+            # Nothing of this ticket stays in memory while it is parked; waking up reopens the root span
+            tracer.release(ticket_id, workflow_span_id(ticket_id))
+        completed_task = yield wf.when_any([solution_update_event, ctx.create_timer(fire_at)])
+        if completed_task == solution_update_event:
+            result = solution_update_event.get_result() or {}
+            break
+        if fire_at >= deadline:
+            result = None
+            break
+        approval["reminders"] = reminders + 1
+        yield ctx.call_activity(approval_reminder_activity, input={
+            "ticket_id": ticket_id,
+            "level": reminders + 1,
+            "waited_seconds": offsets[reminders],
+            "sla_seconds": APPROVAL_SLA_SECONDS,
+        })
+        if APPROVAL_CONTINUE_AS_NEW_REMINDERS and approval["reminders"] % APPROVAL_CONTINUE_AS_NEW_REMINDERS == 0:
+            return CONTINUE_WAITING
+    if not ctx.is_replaying:
+        tracer.record(
+            ticket_id, "wait solution_approved", "wait", start=since, end=ctx.current_utc_datetime,
+            parent_id=workflow_span_id(ticket_id), timed_out=result is None, reminders=approval["reminders"]
+        )
+    return result
+
+def run_support_workflow(ctx: wf.DaprWorkflowContext, ticket_data: Dict[str, Any]):
+    """Workflow body orchestrating the three agents"""
     try:
         ticket_id = ticket_data.get("ticket_id", "unknown")
+        workflow_started_at = ctx.current_utc_datetime.isoformat()
         logging.info(f"Starting customer support workflow for ticket: {ticket_id}")
         
-        # Activity 1: Triage
-        triage_result = yield ctx.call_activity(triage_activity, input=ticket_data)
-        
-        if "error" in triage_result:
-            logging.error(f"Triage failed for ticket {ticket_id}: {triage_result['error']}")
-            return {"status": "failed", "error": triage_result["error"]}
-        
-        # Check if customer has entitlement by looking at the triage analysis
-        # Look for key indicators that suggest the customer has support entitlement
-        triage_analysis = str(triage_result.get("triage_analysis", "")).lower()
-        has_entitlement = (
-            "support_entitlement: true" in triage_analysis or
-            "entitlement: true" in triage_analysis or
-            "enterprise" in triage_analysis or
-            "professional" in triage_analysis or
-            "has support" in triage_analysis or
-            "entitled" in triage_analysis or
-            "active support entitlement" in triage_analysis or
-            "production environment" in triage_analysis
-        )
-        
-        # Additional check: if we can't determine from analysis, check the customer data directly
-        if not has_entitlement:
-            try:
-                customer_lookup = lookup_customer(triage_result.get("customer_id", ""))
-                if not customer_lookup.get("error") and customer_lookup.get("support_entitlement"):
-                    has_entitlement = True
-                    logging.info(f"Direct customer lookup confirmed entitlement for {triage_result.get('customer_id')}")
-                elif customer_lookup.get("error") and "not found" in customer_lookup.get("error", "").lower():
-                    # Customer data is missing - this is a setup issue
-                    logging.error(f"Customer data missing for {triage_result.get('customer_id')}. Please run the sample data setup script first.")
-                    return {
-                        "status": "setup_error",
-                        "error": f"Customer data not found for {triage_result.get('customer_id')}. Please run: dapr run --app-id data-setup --resources-path ./resources -- python setup_sample_data.py",
-                        "ticket_id": ticket_id
-                    }
-            except Exception as e:
-                logging.warning(f"Could not perform direct customer lookup: {e}")
-        
-        if not has_entitlement:
-            logging.info(f"Customer does not have support entitlement for ticket: {ticket_id}")
-            return {
-                "status": "no_entitlement",
-                "message": "Customer does not have support entitlement",
-                "ticket_id": ticket_id
+        approval = ticket_data.get("approval")
+        if approval is None:
+            # Optional fan-out: fetch customer and system records in parallel before triage
+            triage_input = ticket_data
+            if ticket_data.get("parallel_lookups"):
+                customer_id = ticket_data.get("customer_id")
+                customer_info, system_info = yield wf.when_all([
+                    ctx.call_activity(lookup_customer_activity, input=customer_id),
+                    ctx.call_activity(lookup_system_info_activity, input=customer_id)
+                ])
+                triage_input = {**ticket_data, "prefetched_lookups": {"customer": customer_info, "system": system_info}}
+            
+            # Activity 1: Triage
+            triage_result = yield ctx.call_activity(triage_activity, input=triage_input)
+            
+            if "error" in triage_result:
+                logging.error(f"Triage failed for ticket {ticket_id}: {triage_result['error']}")
+                return {"status": "failed", "error": triage_result["error"]}
+            
+            # Branch on the structured triage result
+            triage = triage_result["triage"]
+            if not triage["customer_found"]:
+                # Customer data is missing - this is a setup issue
+                logging.error(f"Customer data missing for {triage_result.get('customer_id')}. Please run the sample data setup script first.")
+                return {
+                    "status": "setup_error",
+                    "error": f"Customer data not found for {triage_result.get('customer_id')}. Please run: dapr run --app-id data-setup --resources-path ./resources -- python setup_sample_data.py",
+                    "ticket_id": ticket_id
+                }
+            
+            has_entitlement = triage["has_entitlement"]
+            if not has_entitlement:
+                logging.info(f"Customer does not have support entitlement for ticket: {ticket_id}")
+                return {
+                    "status": "no_entitlement",
+                    "message": "Customer does not have support entitlement",
+                    "ticket_id": ticket_id
+                }
+            
+            # Activity 2: Expert Analysis
+            expert_result = yield ctx.call_activity(expert_analysis_activity, input=triage_result)
+            
+            if "error" in expert_result:
+                logging.error(f"Expert analysis failed for ticket {ticket_id}: {expert_result['error']}")
+                return {"status": "failed", "error": expert_result["error"]}
+            
+            approval = {
+                "workflow_started_at": workflow_started_at,
+                "since": ctx.current_utc_datetime.isoformat(),
+                "reminders": 0,
+                "triage_result": triage_result,
+                "expert_result": expert_result,
             }
+            logging.info(f"Waiting for support team review for ticket: {ticket_id}")
+        else:
+            # Continued as new while waiting for approval: the analysis is done
+            triage_result, expert_result = approval["triage_result"], approval["expert_result"]
         
-        # Activity 2: Expert Analysis
-        expert_result = yield ctx.call_activity(expert_analysis_activity, input=triage_result)
-        
-        if "error" in expert_result:
-            logging.error(f"Expert analysis failed for ticket {ticket_id}: {expert_result['error']}")
-            return {"status": "failed", "error": expert_result["error"]}
-        
-        # Wait for external event (support team review)
-        logging.info(f"Waiting for support team review for ticket: {ticket_id}")
-        solution_update_event = ctx.wait_for_external_event("solution_approved")
-        timeout_timer = ctx.create_timer(timedelta(seconds=30))  # 30 second timeout
-        
-        completed_task = yield wf.when_any([solution_update_event, timeout_timer])
+        # Wait for external event (support team review), reminding the team until the SLA runs out
+        decision = yield from wait_for_approval(ctx, ticket_id, approval)
+        if decision is CONTINUE_WAITING:
+            ctx.continue_as_new({**ticket_data, "approval": approval}, save_events=True)
+            return {"status": "awaiting_approval", "ticket_id": ticket_id, "reminders": approval["reminders"]}
         
         final_solution_data = {}
-        if completed_task == solution_update_event:
+        if decision is not None:
             # Solution was reviewed and approved
-            event_result = solution_update_event.get_result()
+            event_result = decision
             final_solution_data = {
                 "ticket_id": ticket_id,
                 "final_solution": event_result.get("final_solution", "Solution approved"),
@@ -550,14 +985,14 @@ def customer_support_workflow(ctx: wf.DaprWorkflowContext, ticket_data: Dict[str
             }
             logging.info(f"Solution approved for ticket: {ticket_id}")
         else:
-            # Timeout occurred
+            # The approval SLA ran out
             final_solution_data = {
                 "ticket_id": ticket_id,
                 "final_solution": "Your case is still under review by our support team",
                 "support_notes": "Case requires additional review time",
                 "approved": False
             }
-            logging.warning(f"Timeout waiting for solution approval for ticket: {ticket_id}")
+            logging.warning(f"Approval SLA of {APPROVAL_SLA_SECONDS / 3600:.1f}h ran out for ticket: {ticket_id}")
         
         # Activity 3: Customer Notification
         notification_result = yield ctx.call_activity(customer_notification_activity, input=final_solution_data)
@@ -589,9 +1024,21 @@ async def lifespan(app: FastAPI):
     """FastAPI lifespan manager for workflow runtime"""
     # Register workflow and activities
     wfr.register_workflow(customer_support_workflow)
+    wfr.register_activity(lookup_customer_activity)
+    wfr.register_activity(lookup_system_info_activity)
     wfr.register_activity(triage_activity)
     wfr.register_activity(expert_analysis_activity)
     wfr.register_activity(customer_notification_activity)
+    wfr.register_activity(approval_reminder_activity)
+    
+    # Open shared Dapr clients before any activity or endpoint needs them
+    dapr_pool.start()
+    knowledge_base.load()
+    if llm_cache:
+        llm_cache.load()
+    ticket_index.start()
+    directory_recorder.start()
+    get_workflow_client()
     
     # Start workflow runtime
     wfr.start()
@@ -600,6 +1047,14 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     wfr.shutdown()
+    tool_executor.shutdown(wait=False)
+    ticket_scheduler.shutdown(wait=False)
+    status_executor.shutdown(wait=False)
+    ticket_index.close()
+    directory_recorder.close()
+    if llm_cache:
+        llm_cache.close()
+    dapr_pool.close()
     logging.info("=== Customer Support Workflow Runtime Stopped ===")
 
 app = FastAPI(
@@ -619,26 +1074,35 @@ class SolutionApprovalInput(BaseModel):
     final_solution: str = Field(description="Final solution text")
     support_notes: str = Field(description="Additional notes from support team")
 
+class StatusBatchInput(BaseModel):
+    ticket_ids: List[str] = Field(min_length=1, max_length=STATUS_BATCH_MAX_TICKETS, description="Tickets to look up")
+    include_output: bool = Field(default=False, description="Also return each workflow's serialized output")
+    resolve: bool = Field(default=True, description="Replace claim-check references in the outputs with the stored payloads")
+
 # === API Endpoints ===
+def build_workflow_input(ticket: TicketInput) -> Dict[str, Any]:
+    """Workflow input for a validated ticket"""
+    return {
+        "ticket_id": ticket.ticket_id,
+        "customer_id": ticket.customer_id,
+        "description": ticket.description,
+        "parallel_lookups": PARALLEL_TRIAGE_LOOKUPS
+    }
+
 @app.post("/support/ticket")
 def create_support_ticket(ticket: TicketInput):
     """Create a new support ticket and start the workflow"""
     try:
-        client = DaprWorkflowClient()
+        client = get_workflow_client()
         instance_id = f"support-{ticket.ticket_id}"
         
-        workflow_input = {
-            "ticket_id": ticket.ticket_id,
-            "customer_id": ticket.customer_id,
-            "description": ticket.description
-        }
-        
         scheduled_id = client.schedule_new_workflow(
             workflow=customer_support_workflow,
-            input=workflow_input,
+            input=build_workflow_input(ticket),
             instance_id=instance_id
         )
         
+        ticket_index.add(ticket.ticket_id)
         logging.info(f"Support ticket workflow started: {scheduled_id}")
         return {
             "instance_id": scheduled_id,
@@ -650,11 +1114,114 @@ def create_support_ticket(ticket: TicketInput):
         logging.error(f"Error creating support ticket: {e}")
         return {"error": f"Failed to create support ticket: {str(e)}"}
 
+def schedule_batch_ticket(client: DaprWorkflowClient, index: int, ticket: TicketInput) -> Dict[str, Any]:
+    """Schedule one ticket of a batch; runs on the ticket_scheduler pool"""
+    instance_id = f"support-{ticket.ticket_id}"
+    result = {"index": index, "ticket_id": ticket.ticket_id, "instance_id": instance_id}
+    try:
+        client.schedule_new_workflow(
+            workflow=customer_support_workflow,
+            input=build_workflow_input(ticket),
+            instance_id=instance_id
+        )
+        result["status"] = "workflow_started"
+        ticket_index.add(ticket.ticket_id)
+    except Exception as e:
+        # The sidecar rejects instance IDs that are already running with ALREADY_EXISTS
+        if is_already_exists(e):
+            result["status"] = "duplicate"
+        else:
+            logging.error(f"Error scheduling batch ticket {ticket.ticket_id}: {e}")
+            result.update(status="failed", error=str(e))
+    return result
+
+async def iter_batch_items(request: Request):
+    """Yield (index, raw item) pairs from a JSON array body or an NDJSON stream"""
+    if "ndjson" in request.headers.get("content-type", ""):
+        # Parse line by line as the body arrives instead of buffering it
+        buffer = b""
+        index = 0
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield index, line
+                    index += 1
+        if buffer.strip():
+            yield index, buffer
+        return
+    
+    body = await request.body()
+    if body.lstrip().startswith(b"["):
+        for index, item in enumerate(json.loads(body)):
+            yield index, item
+    else:
+        lines = [line for line in body.splitlines() if line.strip()]
+        for index, line in enumerate(lines):
+            yield index, line
+
+@app.post("/support/tickets:batch")
+async def create_support_tickets_batch(request: Request):
+    """Create many support tickets from a JSON array or NDJSON body and start their workflows"""
+    start_time = time.perf_counter()
+    client = get_workflow_client()
+    loop = asyncio.get_running_loop()
+    # Bounds both the scheduling calls in flight and how far ahead of them the body is read
+    slots = asyncio.Semaphore(TICKET_BATCH_CONCURRENCY)
+    seen_instances = set()
+    results = []
+    pending = []
+    
+    async def schedule(index: int, ticket: TicketInput):
+        try:
+            return await loop.run_in_executor(ticket_scheduler, schedule_batch_ticket, client, index, ticket)
+        finally:
+            slots.release()
+    
+    try:
+        async for index, item in iter_batch_items(request):
+            try:
+                ticket = TicketInput.model_validate_json(item) if isinstance(item, bytes) else TicketInput.model_validate(item)
+            except ValueError as e:
+                results.append({"index": index, "status": "invalid", "error": str(e)})
+                continue
+            
+            instance_id = f"support-{ticket.ticket_id}"
+            if instance_id in seen_instances:
+                results.append({"index": index, "ticket_id": ticket.ticket_id, "instance_id": instance_id, "status": "duplicate"})
+                continue
+            seen_instances.add(instance_id)
+            
+            await slots.acquire()
+            pending.append(asyncio.create_task(schedule(index, ticket)))
+    except ValueError as e:
+        # Malformed JSON array; tickets already handed to the scheduler still complete
+        results.append({"status": "invalid", "error": f"Malformed batch body: {e}"})
+    
+    results.extend(await asyncio.gather(*pending))
+    results.sort(key=lambda result: result.get("index", -1))
+    
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    elapsed = time.perf_counter() - start_time
+    logging.info(f"Batch ticket intake: {len(results)} item(s) in {elapsed:.2f}s {counts}")
+    return {
+        "total": len(results),
+        "scheduled": counts.get("workflow_started", 0),
+        "duplicates": counts.get("duplicate", 0),
+        "invalid": counts.get("invalid", 0),
+        "failed": counts.get("failed", 0),
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "results": results
+    }
+
 @app.post("/support/approve/{ticket_id}")
 def approve_solution(ticket_id: str, approval: SolutionApprovalInput):
     """Approve or modify the proposed solution"""
     try:
-        client = DaprWorkflowClient()
+        client = get_workflow_client()
         instance_id = f"support-{ticket_id}"
         
         client.raise_workflow_event(
@@ -664,6 +1231,7 @@ def approve_solution(ticket_id: str, approval: SolutionApprovalInput):
         )
         
         logging.info(f"Solution approval sent for ticket: {ticket_id}")
+        publish_ticket_stage(ticket_id, "review_submitted", approved=approval.approved)
         return {
             "status": "approval_sent",
             "ticket_id": ticket_id,
@@ -674,115 +1242,363 @@ def approve_solution(ticket_id: str, approval: SolutionApprovalInput):
         logging.error(f"Error approving solution for ticket {ticket_id}: {e}")
         return {"error": f"Failed to approve solution: {str(e)}"}
 
-@app.get("/support/status/{ticket_id}")
-def get_ticket_status(ticket_id: str):
-    """Get the current status of a support ticket"""
+def resolve_output(serialized_output: Optional[str]) -> Optional[str]:
+    """Serialized workflow output with its claim-check references resolved"""
+    if not serialized_output or not claim_check or CLAIM_KEY not in serialized_output:
+        return serialized_output
+    return json.dumps(claim_check.resolve(json.loads(serialized_output)))
+
+def read_ticket_status(ticket_id: str, resolve: bool = True) -> Dict[str, Any]:
+    """Workflow runtime status and output of a support ticket"""
     try:
-        client = DaprWorkflowClient()
+        client = get_workflow_client()
         instance_id = f"support-{ticket_id}"
         
         state = client.get_workflow_state(instance_id)
+        output = state.serialized_output if state and state.serialized_output else None
         
         return {
             "ticket_id": ticket_id,
             "instance_id": instance_id,
             "status": state.runtime_status.name if state else "not_found",
-            "output": state.serialized_output if state and state.serialized_output else None
+            "output": resolve_output(output) if resolve else output
         }
         
     except Exception as e:
         logging.error(f"Error getting status for ticket {ticket_id}: {e}")
         return {"error": f"Failed to get ticket status: {str(e)}"}
 
+@app.get("/support/status/{ticket_id}")
+async def get_ticket_status(
+    ticket_id: str,
+    wait: float = Query(0, ge=0, description="Long poll: seconds to wait for a stage event newer than `after`"),
+    after: int = Query(0, ge=0, description="Sequence number of the last stage event the client has seen"),
+    resolve: bool = Query(True, description="Replace claim-check references in the output with the stored payloads"),
+):
+    """Get the current status of a support ticket, optionally waiting for its next stage"""
+    latest = ticket_events.latest(ticket_id)
+    status = None
+    if wait and not (latest and (latest["seq"] > after or latest["final"])):
+        if latest is None:
+            # No stage seen in this process yet: don't wait on a workflow that has already finished
+            status = await asyncio.to_thread(read_ticket_status, ticket_id, resolve)
+        if status is None or status.get("status") in ACTIVE_WORKFLOW_STATUSES:
+            await ticket_events.wait(ticket_id, after, min(wait, STATUS_LONG_POLL_MAX_SECONDS))
+            status = None
+    if status is None:
+        status = await asyncio.to_thread(read_ticket_status, ticket_id, resolve)
+    latest = ticket_events.latest(ticket_id)
+    if latest is not None:
+        status.update(stage=latest["stage"], seq=latest["seq"])
+    return status
+
+def lookup_ticket_status(client: DaprWorkflowClient, ticket_id: str, include_output: bool,
+                         resolve: bool = True) -> Dict[str, Any]:
+    """Runtime status of one ticket's workflow; runs on the status_executor pool"""
+    instance_id = f"support-{ticket_id}"
+    result = {"ticket_id": ticket_id, "instance_id": instance_id}
+    cached = None if include_output else terminal_statuses.get(ticket_id)
+    if cached is not None:
+        result["status"] = cached
+    else:
+        try:
+            state = client.get_workflow_state(instance_id, fetch_payloads=include_output)
+            result["status"] = state.runtime_status.name if state else "not_found"
+            if include_output:
+                output = state.serialized_output if state and state.serialized_output else None
+                result["output"] = resolve_output(output) if resolve else output
+            terminal_statuses.remember(ticket_id, result["status"])
+        except Exception as e:
+            logging.error(f"Error getting status for ticket {ticket_id}: {e}")
+            result.update(status="error", error=str(e))
+    latest = ticket_events.latest(ticket_id)
+    if latest is not None:
+        result.update(stage=latest["stage"], seq=latest["seq"])
+    return result
+
+def resolve_ticket_statuses(ticket_ids: List[str], include_output: bool = False,
+                            resolve: bool = True) -> Dict[str, Dict[str, Any]]:
+    """Statuses of many tickets, looked up concurrently over the shared workflow client"""
+    client = get_workflow_client()
+    results = status_executor.map(
+        lambda ticket_id: lookup_ticket_status(client, ticket_id, include_output, resolve), ticket_ids
+    )
+    return {result["ticket_id"]: result for result in results}
+
+@app.post("/support/status:batch")
+async def get_ticket_statuses_batch(batch: StatusBatchInput):
+    """Status of many support tickets in one request"""
+    start_time = time.perf_counter()
+    ticket_ids = list(dict.fromkeys(batch.ticket_ids))
+    statuses = await asyncio.to_thread(resolve_ticket_statuses, ticket_ids, batch.include_output, batch.resolve)
+    counts = {}
+    for result in statuses.values():
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return {
+        "total": len(ticket_ids),
+        "counts": counts,
+        "elapsed_ms": round((time.perf_counter() - start_time) * 1000, 1),
+        "results": [statuses[ticket_id] for ticket_id in ticket_ids]
+    }
+
+@app.get("/support/tickets")
+async def list_support_tickets(
+    status: Optional[str] = Query(None, description="Comma-separated runtime statuses, e.g. RUNNING,COMPLETED"),
+    created_after: Optional[datetime] = Query(None, description="Only tickets created at or after this time"),
+    created_before: Optional[datetime] = Query(None, description="Only tickets created before this time"),
+    limit: int = Query(TICKET_LIST_DEFAULT_LIMIT, ge=1, le=TICKET_LIST_MAX_LIMIT, description="Tickets per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_status: bool = Query(False, description="Look up each listed ticket's runtime status")
+):
+    """List support tickets newest first from the ticket index, optionally filtered by status"""
+    statuses = {name.strip().upper() for name in status.split(",") if name.strip()} if status else None
+    timestamp = lambda value: value.timestamp() if value is not None else None
+    try:
+        page = await asyncio.to_thread(
+            ticket_index.list, limit,
+            created_after=timestamp(created_after), created_before=timestamp(created_before), cursor=cursor,
+            statuses=statuses, resolve=resolve_ticket_statuses if statuses or include_status else None,
+            max_scan=TICKET_LIST_MAX_SCAN
+        )
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    return {"status": "success", **page}
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """One Server-Sent Events message: the stage as event name, its seq as ID"""
+    lines = [f"id: {event['seq']}"] if "seq" in event else []
+    lines.append(f"event: {event['stage']}")
+    lines.append(f"data: {json.dumps(event, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+async def stream_ticket_events(ticket_id: str, after: int):
+    if ticket_events.latest(ticket_id) is None:
+        # Nothing seen for this ticket in this process: report the workflow's state once
+        status = await asyncio.to_thread(read_ticket_status, ticket_id)
+        finished = status.get("status") not in ACTIVE_WORKFLOW_STATUSES
+        yield format_sse({**status, "ticket_id": ticket_id, "stage": "status", "final": finished})
+        if finished:
+            return
+    while True:
+        events = await ticket_events.wait(ticket_id, after, STREAM_KEEPALIVE_SECONDS)
+        if not events:
+            yield ": keepalive\n\n"
+            continue
+        for event in events:
+            yield format_sse(event)
+            after = event["seq"]
+            if event["final"]:
+                return
+
+@app.get("/support/stream/{ticket_id}")
+async def stream_ticket_status(request: Request, ticket_id: str, after: int = Query(0, ge=0)):
+    """Server-Sent Events with the ticket's stage transitions, closed once the ticket finishes"""
+    last_event_id = request.headers.get("last-event-id", "")
+    if last_event_id.isdigit():
+        after = max(after, int(last_event_id))
+    return StreamingResponse(
+        stream_ticket_events(ticket_id, after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/support/trace/{ticket_id}")
+def get_ticket_trace(ticket_id: str):
+    """Span tree of a support ticket with per-span durations"""
+    trace = tracer.tree(ticket_id)
+    if trace is None:
+        hint = "" if TRACING_ENABLED else " (tracing is off, set TRACING_ENABLED=true)"
+        return {"error": f"No trace recorded for ticket {ticket_id}{hint}"}
+    return trace
+
 @app.get("/data")
-def list_all_data():
-    """List all data: customers, systems, analysis, and tickets"""
+async def list_all_data(
+    request: Request,
+    stores: Optional[str] = Query(None, description="Comma-separated subset of: customers, systems, analysis, tickets"),
+    limit: int = Query(DATA_PAGE_DEFAULT_LIMIT, ge=1, le=DATA_PAGE_MAX_LIMIT, description="Items per store per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    format: str = Query("json", description="json for one page, ndjson to stream every item")
+):
+    """List customers, systems, analysis, and tickets, one page at a time or as an NDJSON stream"""
+    selected = [name.strip() for name in stores.split(",") if name.strip()] if stores else list(DATA_STORES)
+    unknown = [name for name in selected if name not in DATA_STORES]
+    if unknown:
+        return {"status": "error", "message": f"Unknown store(s): {', '.join(unknown)}. Choose from {', '.join(DATA_STORES)}"}
     try:
-        with DaprClient() as client:
-            result = {
-                "customers": [],
-                "systems": [],
-                "analysis": [],
-                "tickets": []
-            }
-            
-            # List customers from customer-state
-            try:
-                customers_response = client.get_bulk_state("customer-state", [])
-                if hasattr(customers_response, 'items'):
-                    for item in customers_response.items:
-                        if item.data:
-                            customer_data = json.loads(item.data)
-                            result["customers"].append({
-                                "key": item.key,
-                                "data": customer_data
-                            })
-            except Exception as e:
-                logging.warning(f"Error listing customers: {e}")
-                result["customers"] = {"error": str(e)}
-            
-            # List systems from system-state
-            try:
-                systems_response = client.get_bulk_state("system-state", [])
-                if hasattr(systems_response, 'items'):
-                    for item in systems_response.items:
-                        if item.data:
-                            system_data = json.loads(item.data)
-                            result["systems"].append({
-                                "key": item.key,
-                                "data": system_data
-                            })
-            except Exception as e:
-                logging.warning(f"Error listing systems: {e}")
-                result["systems"] = {"error": str(e)}
-            
-            # List analysis from analysis-state
-            try:
-                analysis_response = client.get_bulk_state("analysis-state", [])
-                if hasattr(analysis_response, 'items'):
-                    for item in analysis_response.items:
-                        if item.data:
-                            analysis_data = json.loads(item.data)
-                            result["analysis"].append({
-                                "key": item.key,
-                                "data": analysis_data
-                            })
-            except Exception as e:
-                logging.warning(f"Error listing analysis: {e}")
-                result["analysis"] = {"error": str(e)}
-            
-            # List tickets from execution-state (workflow instances)
-            try:
-                tickets_response = client.get_bulk_state("execution-state", [])
-                if hasattr(tickets_response, 'items'):
-                    for item in tickets_response.items:
-                        if item.data:
-                            ticket_data = json.loads(item.data)
-                            result["tickets"].append({
-                                "key": item.key,
-                                "data": ticket_data
-                            })
-            except Exception as e:
-                logging.warning(f"Error listing tickets: {e}")
-                result["tickets"] = {"error": str(e)}
-            
-            return {
-                "status": "success",
-                "counts": {
-                    "customers": len(result["customers"]) if isinstance(result["customers"], list) else 0,
-                    "systems": len(result["systems"]) if isinstance(result["systems"], list) else 0,
-                    "analysis": len(result["analysis"]) if isinstance(result["analysis"], list) else 0,
-                    "tickets": len(result["tickets"]) if isinstance(result["tickets"], list) else 0
-                },
-                "data": result
-            }
-            
+        tokens = decode_cursor(cursor)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    if cursor:
+        # Stores missing from the cursor were exhausted on an earlier page
+        selected = [name for name in selected if name in tokens]
+    
+    if format == "ndjson" or "application/x-ndjson" in request.headers.get("accept", ""):
+        return StreamingResponse(stream_data(selected, limit, tokens), media_type="application/x-ndjson")
+    
+    async def fetch(name: str):
+        try:
+            return await asyncio.to_thread(fetch_page, dapr_pool, DATA_STORES[name], limit, tokens.get(name, ""))
+        except Exception as e:
+            logging.warning(f"Error listing {name}: {e}")
+            return {"error": str(e)}, ""
+    
+    # The stores are independent, so fetch their pages concurrently
+    pages = await asyncio.gather(*(fetch(name) for name in selected))
+    data = {name: items for name, (items, _) in zip(selected, pages)}
+    next_tokens = {name: token for name, (_, token) in zip(selected, pages) if token}
+    return {
+        "status": "success",
+        "counts": {name: len(items) if isinstance(items, list) else 0 for name, items in data.items()},
+        "data": data,
+        "next_cursor": encode_cursor(next_tokens)
+    }
+
+async def stream_data(selected, page_size: int, tokens: Dict[str, str]):
+    """Yield NDJSON lines for every item of the selected stores as pages arrive"""
+    # Bounded queue: producers wait for the client to catch up, so memory stays at
+    # roughly one page per store regardless of store size
+    queue = asyncio.Queue(maxsize=page_size)
+    
+    async def produce(name: str):
+        token = tokens.get(name, "")
+        count = 0
+        try:
+            while True:
+                items, token = await asyncio.to_thread(fetch_page, dapr_pool, DATA_STORES[name], page_size, token)
+                for item in items:
+                    await queue.put(json.dumps({"store": name, **item}) + "\n")
+                count += len(items)
+                if not token:
+                    break
+            await queue.put(json.dumps({"store": name, "done": True, "count": count}) + "\n")
+        except Exception as e:
+            logging.warning(f"Error streaming {name}: {e}")
+            await queue.put(json.dumps({"store": name, "error": str(e), "count": count}) + "\n")
+        await queue.put(None)
+    
+    producers = [asyncio.create_task(produce(name)) for name in selected]
+    try:
+        remaining = len(producers)
+        while remaining:
+            line = await queue.get()
+            if line is None:
+                remaining -= 1
+            else:
+                yield line
+    finally:
+        # Client went away or the stream finished: stop fetching further pages
+        for producer in producers:
+            producer.cancel()
+
+@app.get("/dapr/subscribe")
+def subscribe():
+    """Programmatic Dapr subscriptions"""
+    return [
+        {"pubsubname": "support-pubsub", "topic": INVALIDATION_TOPIC, "route": "/events/state-invalidations"},
+        {"pubsubname": "support-pubsub", "topic": EVENTS_TOPIC, "route": "/events/solution-notifications"}
+    ]
+
+@app.post("/events/state-invalidations")
+async def on_state_invalidation(request: Request):
+    """Drop cached customer/system records after a writer updates them"""
+    try:
+        event = await request.json()
+        data = event.get("data", event)
+        if isinstance(data, str):
+            data = json.loads(data)
+        store_name = data.get("store_name")
+        if store_name in CACHED_STORES:
+            keys = data.get("keys")
+            if keys:
+                for key in keys:
+                    state_cache.invalidate(store_name, key)
+            else:
+                state_cache.invalidate(store_name)
     except Exception as e:
-        logging.error(f"Error listing data: {e}")
-        return {
-            "status": "error",
-            "message": f"Failed to list data: {str(e)}"
-        }
+        logging.warning(f"Ignoring malformed state invalidation event: {e}")
+    return {"status": "SUCCESS"}
+
+@app.post("/events/solution-notifications")
+async def on_ticket_event(request: Request):
+    """Feed published stage events to the status streams and long polls"""
+    try:
+        event = await request.json()
+        data = event.get("data", event)
+        if isinstance(data, str):
+            data = json.loads(data)
+        if ticket_events.publish(data) is not None:
+            pending_approvals.observe(data)
+    except Exception as e:
+        logging.warning(f"Ignoring malformed ticket event: {e}")
+    return {"status": "SUCCESS"}
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Ticket, activity, LLM and tool metrics in the Prometheus text format"""
+    if support_metrics is None:
+        return Response("# metrics disabled (METRICS_ENABLED=false)\n", media_type=SupportMetrics.CONTENT_TYPE)
+    return Response(support_metrics.render(), media_type=SupportMetrics.CONTENT_TYPE)
+
+@app.get("/metrics/state-cache")
+def state_cache_metrics():
+    """Customer/system lookup cache hit, miss and eviction counters"""
+    return state_cache.metrics()
+
+@app.get("/metrics/dapr-client-pool")
+def dapr_client_pool_metrics():
+    """Shared Dapr client pool usage and acquire-wait statistics"""
+    return dapr_pool.metrics()
+
+@app.get("/metrics/ticket-events")
+def ticket_event_metrics():
+    """Stage events received, status streams / long polls waiting and tickets pending approval"""
+    return {**ticket_events.metrics(), "approvals": pending_approvals.metrics()}
+
+@app.get("/metrics/ticket-index")
+def ticket_index_metrics():
+    """Ticket index writes, conflicts and bucket reads"""
+    return ticket_index.metrics()
+
+@app.get("/metrics/key-directory")
+def key_directory_metrics():
+    """Keys buffered for and recorded in the /data key directories"""
+    return directory_recorder.metrics()
+
+@app.get("/metrics/payloads")
+def payload_metrics():
+    """Claim-check payloads stored, referenced and resolved"""
+    if claim_check is None:
+        return {"enabled": False}
+    return {"enabled": True, **claim_check.metrics()}
+
+@app.get("/metrics/llm-routing")
+def llm_routing_metrics():
+    """Calls, fallbacks, tokens and estimated cost per agent and model tier"""
+    if model_router is None:
+        return {"enabled": False}
+    return {"enabled": True, **model_router.metrics()}
+
+@app.get("/metrics/prompt-cache")
+def prompt_cache_metrics():
+    """Prompt prefix size and provider-cached prompt tokens per agent"""
+    return {
+        "enabled": STABLE_PROMPT_PREFIX,
+        "agents": {layout.name: layout.metrics() for layout in (triage_layout, expert_layout)},
+    }
+
+@app.get("/metrics/llm-gateway")
+def llm_gateway_metrics():
+    """Concurrency limit, queue waits, retries and throttling per LLM gateway lane"""
+    if llm_gateway is None:
+        return {"enabled": False}
+    return {"enabled": True, **llm_gateway.metrics()}
+
+@app.get("/metrics/llm-cache")
+def llm_cache_metrics():
+    """LLM response cache hit rate and token savings"""
+    if llm_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **llm_cache.metrics()}
 
 if __name__ == "__main__":
     import uvicorn
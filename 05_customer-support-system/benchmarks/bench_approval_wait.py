@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Approval wait benchmark: memory of parked tickets and replay time of long waits
+Runs customer_support_workflow on the real durabletask orchestration executor, with a
+minimal in-memory backend in place of the Dapr workflow engine: it keeps each
+instance's history, turns the workflow's actions into history events (activities
+complete at once with canned results), fires timers on demand and honours
+continue_as_new. Reports:
+
+- parked: --tickets tickets driven into the approval wait. Memory the app process
+  retains per parked ticket (tracemalloc, with the backend's histories taken out) and
+  the history the backend stores per ticket. --hold-spans keeps each parked ticket's
+  root span open in the tracer, as the wait did before.
+- long wait: --long-tickets tickets waiting through every reminder of a --sla-hours SLA
+  before they are approved, once per APPROVAL_CONTINUE_AS_NEW_REMINDERS setting. Peak
+  history size, and the time to replay the history on each reminder's wake-up and when
+  the approval arrives.
+
+Usage:
+    python benchmarks/bench_approval_wait.py --tickets 50000 --sla-hours 720 --continue-as-new 0 4 1
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("METRICS_ENABLED", "true")
+
+import dapr.ext.workflow as wf
+from dapr.ext.workflow.logger import LoggerOptions
+from durabletask import worker
+from durabletask.internal import helpers
+from durabletask.internal import orchestrator_service_pb2 as pb
+
+WORKFLOW = "customer_support_workflow"
+START = datetime(2026, 1, 5, 9, 0, 0)
+ACTIVITY_RESULTS = {
+    "triage_activity": lambda ticket_id: {
+        "ticket_id": ticket_id, "customer_id": "CUST001", "user_reported_issue": "Dapr sidecar is not connecting",
+        "triage_analysis": "Enterprise customer on Dapr 1.12 with Redis; sidecar health checks fail. " * 12,
+        "triage": {"customer_found": True, "has_entitlement": True},
+    },
+    "expert_analysis_activity": lambda ticket_id: {
+        "ticket_id": ticket_id, "status": "analysis_complete", "timestamp": 0,
+        "expert_analysis": "Raise the sidecar's app health probe timeout and check the Redis connection pool. " * 48,
+    },
+    "approval_reminder_activity": lambda ticket_id: {"ticket_id": ticket_id, "level": 1},
+    "customer_notification_activity": lambda ticket_id: {
+        "ticket_id": ticket_id, "status": "customer_notified", "customer_message": "Your solution is ready. " * 20,
+    },
+}
+
+
+class Instance:
+    __slots__ = ("instance_id", "history", "timers", "output", "executions")
+
+    def __init__(self, instance_id: str):
+        self.instance_id = instance_id
+        self.history = []
+        self.timers = {}
+        self.output = None
+        self.executions = 1
+
+
+class HistoryBackend:
+    """Just enough of a workflow backend to run one workflow on durabletask's executor"""
+
+    def __init__(self, workflow, results=None):
+        # Canned result per activity name: a function of the ticket ID
+        self.results = results or ACTIVITY_RESULTS
+        registry = worker._Registry()
+        # One set of logger options for every context, as WorkflowRuntime passes its own
+        options = LoggerOptions()
+        registry.add_named_orchestrator(WORKFLOW, lambda ctx, data: workflow(wf.DaprWorkflowContext(ctx, options), data))
+        self.executor = worker._OrchestrationExecutor(registry, logging.getLogger("bench"))
+        self.instances = {}
+
+    def start(self, instance_id: str, data, now: datetime) -> Instance:
+        instance = self.instances[instance_id] = Instance(instance_id)
+        self._run(instance, [helpers.new_orchestrator_started_event(now),
+                             helpers.new_execution_started_event(WORKFLOW, instance_id, json.dumps(data))], now)
+        return instance
+
+    def fire_next_timer(self, instance: Instance) -> float:
+        timer_id, fire_at = min(instance.timers.items(), key=lambda item: item[1])
+        del instance.timers[timer_id]
+        return self._run(instance, [helpers.new_orchestrator_started_event(fire_at),
+                                    helpers.new_timer_fired_event(timer_id, fire_at)], fire_at)
+
+    def raise_event(self, instance: Instance, name: str, data, now: datetime) -> float:
+        return self._run(instance, [helpers.new_orchestrator_started_event(now),
+                                    helpers.new_event_raised_event(name, json.dumps(data))], now)
+
+    def _run(self, instance: Instance, new_events, now: datetime) -> float:
+        """Deliver events until the workflow waits or completes; returns the first execution's time"""
+        ticket_id = instance.instance_id.removeprefix("support-")
+        first = None
+        while new_events:
+            start = time.perf_counter()
+            result = self.executor.execute(instance.instance_id, instance.history, new_events)
+            first = first if first is not None else time.perf_counter() - start
+            instance.history.extend(new_events)
+            new_events = []
+            for action in result.actions:
+                kind = action.WhichOneof("orchestratorActionType")
+                if kind == "scheduleTask":
+                    name = action.scheduleTask.name
+                    instance.history.append(helpers.new_task_scheduled_event(action.id, name, action.scheduleTask.input.value))
+                    new_events.append(helpers.new_task_completed_event(action.id, json.dumps(self.results[name](ticket_id))))
+                elif kind == "createTimer":
+                    fire_at = action.createTimer.fireAt.ToDatetime()
+                    instance.history.append(helpers.new_timer_created_event(action.id, fire_at))
+                    instance.timers[action.id] = fire_at
+                elif kind == "completeOrchestration":
+                    complete = action.completeOrchestration
+                    if complete.orchestrationStatus == pb.ORCHESTRATION_STATUS_CONTINUED_AS_NEW:
+                        instance.history, instance.timers = [], {}
+                        instance.executions += 1
+                        new_events = [helpers.new_orchestrator_started_event(now),
+                                      helpers.new_execution_started_event(WORKFLOW, instance.instance_id, complete.result.value),
+                                      *complete.carryoverEvents]
+                        break
+                    instance.output = json.loads(complete.result.value) if complete.result.value else None
+            if new_events and new_events[0].WhichOneof("eventType") != "orchestratorStarted":
+                new_events.insert(0, helpers.new_orchestrator_started_event(now))
+        return first or 0.0
+
+
+def history_bytes(instance: Instance) -> int:
+    return sum(event.ByteSize() for event in instance.history)
+
+
+def park(app, args) -> dict:
+    """Drive --tickets tickets into the approval wait and measure what stays in memory"""
+    if args.hold_spans:
+        app.tracer.release = lambda ticket_id, span_id: None
+    backend = HistoryBackend(app.customer_support_workflow)
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    for i in range(args.tickets):
+        ticket_id = f"P{i:06d}"
+        backend.start(f"support-{ticket_id}", {"ticket_id": ticket_id, "customer_id": "CUST001",
+                                               "description": "Dapr sidecar is not connecting"}, START)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    with_histories = tracemalloc.get_traced_memory()[0] - base
+    stored = sum(history_bytes(instance) for instance in backend.instances.values())
+    events = sum(len(instance.history) for instance in backend.instances.values())
+    waiting = sum(1 for instance in backend.instances.values() if instance.timers and instance.output is None)
+    backend.instances.clear()
+    gc.collect()
+    app_side = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return {
+        "tickets": args.tickets,
+        "waiting": waiting,
+        "seconds": elapsed,
+        "app_bytes_per_ticket": app_side / args.tickets,
+        "backend_bytes_per_ticket": (with_histories - app_side) / args.tickets,
+        "history_bytes_per_ticket": stored / args.tickets,
+        "history_events_per_ticket": events / args.tickets,
+        "open_spans": len(app.tracer._open),
+    }
+
+
+def long_wait(app, args, continue_every: int) -> dict:
+    """Tickets that get every reminder of the SLA, then the approval; replay cost of each wake-up"""
+    app.APPROVAL_CONTINUE_AS_NEW_REMINDERS = continue_every
+    backend = HistoryBackend(app.customer_support_workflow)
+    reminders = len(app.approval_reminder_offsets())
+    wakeups, approvals, peak_events, peak_sizes, executions = [], [], [], [], []
+    for i in range(args.long_tickets):
+        ticket_id = f"L{continue_every}-{i:04d}"
+        instance = backend.start(f"support-{ticket_id}", {"ticket_id": ticket_id, "customer_id": "CUST001",
+                                                          "description": "Dapr sidecar is not connecting"}, START)
+        events, size = len(instance.history), history_bytes(instance)
+        for _ in range(reminders):
+            wakeups.append(backend.fire_next_timer(instance))
+            events, size = max(events, len(instance.history)), max(size, history_bytes(instance))
+        approved_at = START + timedelta(seconds=app.APPROVAL_SLA_SECONDS - 60)
+        approvals.append(backend.raise_event(instance, "solution_approved", {"final_solution": "Raise the timeout"},
+                                             approved_at))
+        assert instance.output and instance.output["status"] == "completed", instance.output
+        peak_events.append(events)
+        peak_sizes.append(size)
+        executions.append(instance.executions)
+    return {
+        "continue_every": continue_every,
+        "reminders": reminders,
+        "executions": statistics.median(executions),
+        "peak_events": statistics.median(peak_events),
+        "peak_kib": statistics.median(peak_sizes) / 1024,
+        "wakeup_ms": statistics.mean(wakeups) * 1000 if wakeups else 0.0,
+        "approval_ms": statistics.median(approvals) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=50000, help="Tickets parked in the approval wait")
+    parser.add_argument("--hold-spans", action="store_true", help="Keep parked tickets' root spans open, as before")
+    parser.add_argument("--long-tickets", type=int, default=20, help="Tickets per long-wait run")
+    parser.add_argument("--sla-hours", type=float, default=720, help="Approval SLA of the long-wait runs")
+    parser.add_argument("--reminder-minutes", type=float, default=60, help="Wait before the first reminder")
+    parser.add_argument("--max-reminder-hours", type=float, default=8, help="Longest wait between reminders")
+    parser.add_argument("--continue-as-new", type=int, nargs="+", default=[0, 4, 1],
+                        help="APPROVAL_CONTINUE_AS_NEW_REMINDERS settings to compare (0 = never)")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    import app
+    app.APPROVAL_SLA_SECONDS = args.sla_hours * 3600
+    app.APPROVAL_REMINDER_SECONDS = args.reminder_minutes * 60
+    app.APPROVAL_REMINDER_MAX_SECONDS = args.max_reminder_hours * 3600
+
+    if args.tickets:
+        parked = park(app, args)
+        print(f"Parked {parked['waiting']}/{parked['tickets']} tickets in the approval wait in {parked['seconds']:.1f}s"
+              f"{' (root spans held open)' if args.hold_spans else ''}")
+        print(f"  app memory retained      {parked['app_bytes_per_ticket']:>10.0f} B/ticket  "
+              f"({parked['open_spans']} open spans)")
+        print(f"  backend history          {parked['history_bytes_per_ticket']:>10.0f} B/ticket serialized, "
+              f"{parked['history_events_per_ticket']:.0f} events, {parked['backend_bytes_per_ticket']:.0f} B/ticket in memory")
+
+    if args.long_tickets:
+        print(f"\nLong wait: {args.sla_hours:.0f}h SLA, reminders from {args.reminder_minutes:.0f} min "
+              f"up to every {args.max_reminder_hours:.0f}h, approved at the end ({args.long_tickets} tickets, medians)")
+        print(f"{'continue as new':>16} {'reminders':>10} {'executions':>11} {'peak history':>13} "
+              f"{'peak KiB':>9} {'replay ms/wake-up':>18} {'approval replay ms':>19}")
+        for every in args.continue_as_new:
+            r = long_wait(app, args, every)
+            print(f"{('never' if every == 0 else f'every {every}'):>16} {r['reminders']:>10} {r['executions']:>11.0f} "
+                  f"{r['peak_events']:>13.0f} {r['peak_kib']:>9.1f} {r['wakeup_ms']:>18.2f} {r['approval_ms']:>19.2f}")
+
+
+if __name__ == "__main__":
+    main()
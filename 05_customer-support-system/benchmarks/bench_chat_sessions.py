@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Chat session startup benchmark for 03_durable-agent-chat: an agent per session vs the shared ChatRuntime
+Opens --sessions simulated Chainlit sessions against the in-memory Dapr stub (which
+also accepts workflow runtime connections, without ever handing out work) and
+reports, per session:
+
+- time to first message: what on_chat_start costs before the welcome message is sent
+- resident memory and threads added
+
+  per-session  the previous on_chat_start: a DurableAgent with its own workflow runtime,
+               state load and registry registration for every session (run for
+               --per-session-sessions, since each one holds threads and a gRPC stream)
+  shared       ChatRuntime: the agent is built by the first session only, later ones
+               just open their memory session
+
+Usage:
+    python benchmarks/bench_chat_sessions.py --sessions 1000 --per-session-sessions 100
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(os.path.dirname(BENCHMARKS))
+sys.path.insert(0, REPO)
+sys.path.insert(0, os.path.join(REPO, "03_durable-agent-chat"))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("DAPR_LLM_COMPONENT_DEFAULT", "openai")
+
+from dapr_stub import FakeDaprSidecar
+
+AGENT = {
+    "name": "TravelAssistant-Chat",
+    "role": "Travel Assistant",
+    "goal": "Help users find flights and remember preferences",
+    "instructions": [
+        "You are a travel assistant that helps users search for flights.",
+        "Use the search_flights tool to find flights to destinations.",
+        "Provide clear flight information with airline names and prices.",
+    ],
+    "message_bus_name": "message-pubsub",
+    "state_store_name": "statestore",
+    "state_key": "execution-chat",
+    "agents_registry_store_name": "registry-state",
+}
+
+
+def rss_kib() -> int:
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+    except (OSError, StopIteration):
+        return 0
+
+
+def seed(sidecar, history: int):
+    """Registry entry and an execution state with `history` finished turns, as a used deployment has"""
+    sidecar.seed("registry-state", "agents_registry", b"{}")
+    instances = {
+        f"{i:032x}": {
+            "input": "Find flights to Tokyo", "source": "user_input", "workflow_name": "AgenticWorkflow",
+            "start_time": "2026-01-01T00:00:00+00:00", "end_time": "2026-01-01T00:00:05+00:00", "status": "completed",
+            "messages": [{"role": "user", "content": "Find flights to Tokyo"},
+                         {"role": "assistant", "content": "SkyHighAir $450.00, GlobalWings $375.50"}],
+            "tool_history": [],
+        }
+        for i in range(history)
+    }
+    sidecar.seed("statestore", "execution-chat", json.dumps({"instances": instances}).encode())
+
+
+def measure(label: str, sessions: int, open_session):
+    latencies = []
+    rss, threads = rss_kib(), threading.active_count()
+    for i in range(sessions):
+        start = time.perf_counter()
+        open_session(i)
+        latencies.append(time.perf_counter() - start)
+    result = {
+        "sessions": sessions,
+        "first_ms": latencies[0] * 1000,
+        "p50_ms": sorted(latencies)[len(latencies) // 2] * 1000,
+        "p95_ms": sorted(latencies)[int(len(latencies) * 0.95)] * 1000,
+        "rss_kib_per_session": (rss_kib() - rss) / sessions,
+        "threads_per_session": (threading.active_count() - threads) / sessions,
+    }
+    print(f"{label:<12} {sessions:>8} {result['first_ms']:>10.1f} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+          f"{result['rss_kib_per_session']:>13.1f} {result['threads_per_session']:>9.2f}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1000, help="Sessions opened on the shared runtime")
+    parser.add_argument("--per-session-sessions", type=int, default=100,
+                        help="Sessions opened with an agent each (0 = skip)")
+    parser.add_argument("--history", type=int, default=200, help="Finished turns in the seeded execution state")
+    parser.add_argument("--dapr-latency", type=float, default=0.0005, help="Latency per Dapr call (s)")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    from dapr_agents import DurableAgent
+    from dapr_agents.llm.dapr import DaprChatClient
+    from dapr_agents.memory import ConversationDaprStateMemory
+    from session_runtime import ChatRuntime, SessionDurableAgent, SessionMemory
+
+    with FakeDaprSidecar(latency=args.dapr_latency, max_workers=args.per_session_sessions + 64) as sidecar:
+        seed(sidecar, args.history)
+        print(f"{'mode':<12} {'sessions':>8} {'first ms':>10} {'p50 ms':>9} {'p95 ms':>9} "
+              f"{'RSS KiB/sess':>13} {'thr/sess':>9}")
+
+        memory = SessionMemory(
+            factory=lambda session_id: ConversationDaprStateMemory(store_name="memory-state", session_id=session_id),
+            idle_seconds=3600,
+        )
+        runtime = ChatRuntime(lambda m: SessionDurableAgent(**AGENT, tools=[], llm=DaprChatClient(), memory=m), memory)
+        measure("shared", args.sessions, lambda i: runtime.start_session(f"session-{i:08x}"))
+
+        # Idle eviction: every session above has been idle for longer than this
+        memory.idle_seconds = 0.0
+        runtime.start_session("session-late")
+        print(f"\nafter idle eviction: {memory.metrics()}")
+        runtime.shutdown()
+
+        agents = []
+        if args.per_session_sessions:
+            def per_session(i):
+                agents.append(DurableAgent(
+                    **AGENT, tools=[], llm=DaprChatClient(),
+                    memory=ConversationDaprStateMemory(store_name="memory-state", session_id=f"session-{i:08x}"),
+                ))
+
+            measure("per-session", args.per_session_sessions, per_session)
+            for agent in agents:
+                agent.stop_runtime()
+            agents.clear()
+
+
+if __name__ == "__main__":
+    main()
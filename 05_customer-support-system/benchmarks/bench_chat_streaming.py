@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Chat streaming benchmark for 03_durable-agent-chat: time until the user sees something
+Runs --turns chat turns (a flight search tool call, then a --answer-words word answer)
+through the app's SessionDurableAgent against the in-memory Dapr stub, with a fake LLM
+that takes --llm-latency to start answering and --token-latency per word. The Dapr stub
+hands out no workflow work, so the agent's workflow is driven inline on a worker thread
+(workflow_driver), calling the agent's own activities the way the runtime would.
+
+  blocking   the previous on_message: await the finished turn, then send the answer
+  streaming  ChatRuntime.stream(): tokens and tool progress are sent as they arrive
+
+Usage:
+    python benchmarks/bench_chat_streaming.py --turns 20 --llm-latency 0.3 --token-latency 0.02
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(os.path.dirname(BENCHMARKS))
+sys.path.insert(0, REPO)
+sys.path.insert(0, os.path.join(REPO, "03_durable-agent-chat"))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from dapr_agents import tool
+from pydantic import BaseModel, Field
+
+from bench_chat_sessions import AGENT, seed
+from dapr_stub import FakeDaprSidecar
+from fake_llm import FakeChatClient
+from workflow_driver import InlineTask, InlineWorkflowContext
+
+ANSWER = "I found two flights for you: SkyHighAir at $450.00 and GlobalWings at $375.50, both with one checked bag. "
+CITIES = ["London", "Tokyo", "Paris", "Lisbon"]
+
+
+class DestinationSchema(BaseModel):
+    destination: str = Field(description="Destination city name")
+
+
+@tool(args_model=DestinationSchema)
+def search_flights(destination: str) -> str:
+    """Search for flights to the specified destination."""
+    return f"SkyHighAir $450.00, GlobalWings $375.50 to {destination}"
+
+
+class AgentWorkflowContext(InlineWorkflowContext):
+    """InlineWorkflowContext for agent workflows, whose activities take their input as keyword arguments"""
+
+    def call_activity(self, activity, *, input=None, retry_policy=None) -> InlineTask:
+        self.activity_calls.append(getattr(activity, "__name__", str(activity)))
+        result = activity(**(input or {}))
+        if asyncio.iscoroutine(result):
+            # Activities run on a runtime worker thread with an event loop of their own
+            result = asyncio.run(result)
+        return InlineTask(result)
+
+
+def inline_agent_class():
+    from session_runtime import SessionDurableAgent
+
+    class InlineChatAgent(SessionDurableAgent):
+        """SessionDurableAgent whose turns run inline instead of on the workflow runtime"""
+
+        def when_all(self, tasks):
+            return InlineTask([task.get_result() for task in tasks])
+
+        async def run_session(self, session_id, input_data, instance_id=None):
+            instance_id = instance_id or f"turn-{time.perf_counter_ns()}"
+            self.memory.bind(instance_id, session_id)
+            try:
+                return await asyncio.to_thread(self._drive, instance_id, {"task": input_data})
+            finally:
+                self.memory.unbind(instance_id)
+                self.state.get("instances", {}).pop(instance_id, None)
+
+        def _drive(self, instance_id, workflow_input):
+            generator = self.tool_calling_workflow(AgentWorkflowContext(instance_id), workflow_input)
+            result = None
+            try:
+                while True:
+                    result = generator.send(result).get_result()
+            except StopIteration as stop:
+                return stop.value
+
+    return InlineChatAgent
+
+
+async def blocking_turn(runtime, session_id: str, text: str) -> dict:
+    start = time.perf_counter()
+    await runtime.agent.run_session(session_id, text)
+    elapsed = time.perf_counter() - start
+    return {"first_event": elapsed, "first_token": elapsed, "total": elapsed, "events": 1}
+
+
+async def streaming_turn(runtime, session_id: str, text: str) -> dict:
+    start = time.perf_counter()
+    first_event = first_token = None
+    events = 0
+    async for event in runtime.stream(session_id, text):
+        now = time.perf_counter() - start
+        events += 1
+        first_event = first_event if first_event is not None else now
+        if event["type"] == "token" and first_token is None:
+            first_token = now
+    total = time.perf_counter() - start
+    return {"first_event": first_event, "first_token": first_token or total, "total": total, "events": events}
+
+
+async def run_mode(mode: str, runtime, args) -> list:
+    session_id = runtime.start_session(f"bench-{mode}")
+    turn = streaming_turn if mode == "streaming" else blocking_turn
+    results = []
+    for i in range(args.turns):
+        results.append(await turn(runtime, session_id, f"Find flights to {CITIES[i % len(CITIES)]}"))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Time before the LLM's first token (s)")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="Time per answer word (s)")
+    parser.add_argument("--answer-words", type=int, default=60, help="Approximate length of the final answer")
+    parser.add_argument("--dapr-latency", type=float, default=0.0005, help="Latency per Dapr call (s)")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    from dapr_agents.memory import ConversationDaprStateMemory
+    from session_runtime import ChatRuntime, SessionMemory
+
+    answer = ANSWER * max(1, args.answer_words // len(ANSWER.split()))
+    agent_class = inline_agent_class()
+
+    with FakeDaprSidecar(latency=args.dapr_latency) as sidecar:
+        seed(sidecar, history=0)
+        results = {}
+        for mode in ("blocking", "streaming"):
+            llm = FakeChatClient(latency=args.llm_latency, token_latency=args.token_latency, final_answer=answer,
+                                 tool_calls=[{"name": "SearchFlights", "arguments": {"destination": "London"}}])
+            memory = SessionMemory(
+                factory=lambda session_id: ConversationDaprStateMemory(store_name="memory-state", session_id=session_id)
+            )
+            runtime = ChatRuntime(lambda m: agent_class(**AGENT, tools=[search_flights], llm=llm, memory=m), memory)
+            runtime.agent.text_formatter.print_message = lambda *a, **k: None
+            results[mode] = asyncio.run(run_mode(mode, runtime, args))
+            runtime.shutdown()
+
+    print(f"{args.turns} turns, LLM first token {args.llm_latency * 1000:.0f} ms, "
+          f"{args.token_latency * 1000:.0f} ms/word, {len(answer.split())}-word answer\n")
+    print(f"{'mode':<10} {'first output ms':>16} {'first token ms':>15} {'turn ms':>9} {'events/turn':>12}")
+    for mode, turns in results.items():
+        print(f"{mode:<10} {statistics.median(t['first_event'] for t in turns) * 1000:>16.0f} "
+              f"{statistics.median(t['first_token'] for t in turns) * 1000:>15.0f} "
+              f"{statistics.median(t['total'] for t in turns) * 1000:>9.0f} "
+              f"{statistics.mean(t['events'] for t in turns):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
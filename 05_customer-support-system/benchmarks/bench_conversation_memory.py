@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Conversation memory benchmark: prompt size, latency and state traffic over a long session
+Runs one agent session of --turns turns (a question, a tool call, its result and an
+answer per turn) through a dapr_agents Agent, the way samples 01 and 04 use it, with:
+
+  full        ConversationDaprStateMemory, the whole history under one key
+  window      CompactingDaprStateMemory without a summarizer (evicted turns are dropped)
+  compacting  CompactingDaprStateMemory summarizing evicted turns through the
+              `openai-mini` Conversation API component of the Dapr stub
+
+The mocked chat model's latency grows with the prompt (--llm-latency plus
+--prefill-us per prompt token), as a real model's prefill does.
+
+Usage:
+    python benchmarks/bench_conversation_memory.py --turns 200 --budget 4000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(BENCHMARKS)))
+
+from dapr_agents import Agent, tool
+from dapr_agents.memory import ConversationDaprStateMemory
+from pydantic import BaseModel, Field
+
+from common.compacting_memory import CompactingDaprStateMemory, conversation_summarizer
+from dapr_stub import FakeDaprSidecar
+from fake_llm import FakeChatClient
+
+QUESTION = ("Turn {turn}: I'm flying from Seattle with two kids in late {month}, we prefer morning departures, "
+            "aisle seats and one checked bag each. What are the options to {city} this time?")
+ANSWER = ("Here are the flights I found: SkyHighAir at $450 departing 07:10 and GlobalWings at $375.50 departing "
+          "09:45, both with aisle seats available and one checked bag included for each passenger. ") * 3
+SUMMARY = ("The user flies from Seattle with two kids, prefers morning departures, aisle seats and one checked bag "
+           "each, and has asked about flights to several cities; SkyHighAir ($450) and GlobalWings ($375.50) were "
+           "offered each time. ") * 3
+CITIES = ["London", "Tokyo", "Paris", "Lisbon", "Denver", "Austin", "Rome", "Oslo"]
+MONTHS = ["May", "June", "July", "August"]
+
+
+class DestinationSchema(BaseModel):
+    destination: str = Field(description="Destination city name")
+
+
+@tool(args_model=DestinationSchema)
+def search_flights(destination: str) -> str:
+    """Search for flights to the specified destination."""
+    return f"SkyHighAir $450.00 07:10, GlobalWings $375.50 09:45 to {destination}"
+
+
+class PrefillChatClient(FakeChatClient):
+    """FakeChatClient whose latency grows with the prompt, recording prompt tokens per call"""
+
+    def __init__(self, prefill_seconds_per_token: float, **kwargs):
+        super().__init__(**kwargs)
+        self.prefill = prefill_seconds_per_token
+        self.prompt_tokens = []
+
+    def generate(self, messages=None, **kwargs):
+        response = super().generate(messages=messages, **kwargs)
+        tokens = response.metadata["usage"]["prompt_tokens"]
+        self.prompt_tokens.append(tokens)
+        time.sleep(tokens * self.prefill)
+        return response
+
+
+def build_memory(mode: str, session_id: str, budget: int):
+    if mode == "full":
+        return ConversationDaprStateMemory(store_name="memory-state", session_id=session_id)
+    return CompactingDaprStateMemory(
+        store_name="memory-state", session_id=session_id, token_budget=budget,
+        summarizer=conversation_summarizer("openai-mini") if mode == "compacting" else None,
+    )
+
+
+async def run_session(mode: str, sidecar, args) -> dict:
+    llm = PrefillChatClient(args.prefill_us / 1e6, latency=args.llm_latency, final_answer=ANSWER,
+                            tool_calls=[{"name": "SearchFlights", "arguments": {"destination": "London"}}])
+    memory = build_memory(mode, f"bench-{mode}", args.budget)
+    agent = Agent(name="TravelBuddy", role="Travel Assistant", goal="Help users find flights",
+                  instructions=["Find flights", "Remember preferences"], tools=[search_flights], llm=llm, memory=memory)
+    agent.text_formatter.print_message = lambda *a, **k: None
+
+    calls, state_bytes = dict(sidecar.servicer.calls), dict(sidecar.servicer.state_bytes)
+    latencies, first_prompt = [], []
+    for turn in range(1, args.turns + 1):
+        question = QUESTION.format(turn=turn, month=MONTHS[turn % len(MONTHS)], city=CITIES[turn % len(CITIES)])
+        start = time.perf_counter()
+        await agent.run(question)
+        latencies.append(time.perf_counter() - start)
+        first_prompt.append(llm.prompt_tokens[-2])
+    if isinstance(memory, CompactingDaprStateMemory):
+        memory.wait()
+    stored = sum(len(value) for key, (value, _) in sidecar.servicer.stores["memory-state"].items()
+                 if key.startswith(f"bench-{mode}"))
+    return {
+        "latencies": latencies,
+        "prompt_tokens": first_prompt,
+        "total_prompt_tokens": sum(llm.prompt_tokens),
+        "dapr_calls": sum(sidecar.servicer.calls.values()) - sum(calls.values()),
+        "state_read": sidecar.servicer.state_bytes["read"] - state_bytes.get("read", 0),
+        "state_written": sidecar.servicer.state_bytes["written"] - state_bytes.get("written", 0),
+        "stored": stored,
+        "memory": memory.metrics() if isinstance(memory, CompactingDaprStateMemory) else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--budget", type=int, default=4000, help="Token budget of the compacting memory")
+    parser.add_argument("--modes", nargs="+", default=["full", "window", "compacting"],
+                        choices=["full", "window", "compacting"])
+    parser.add_argument("--llm-latency", type=float, default=0.01, help="Fixed latency per chat call (s)")
+    parser.add_argument("--prefill-us", type=float, default=20.0, help="Extra latency per prompt token (µs)")
+    parser.add_argument("--summary-latency", type=float, default=0.2, help="Latency of the summarizer model (s)")
+    parser.add_argument("--dapr-latency", type=float, default=0.0005, help="Latency per Dapr state call (s)")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    checkpoints = sorted({1, args.turns // 4, args.turns // 2, 3 * args.turns // 4, args.turns} - {0})
+    with FakeDaprSidecar(latency=args.dapr_latency, conversation_latency=args.summary_latency) as sidecar:
+        sidecar.servicer.conversation_reply = SUMMARY
+        results = {mode: asyncio.run(run_session(mode, sidecar, args)) for mode in args.modes}
+
+    print(f"Prompt tokens of each turn's first LLM call (budget {args.budget}):")
+    print(f"{'turn':>6} " + " ".join(f"{mode:>12}" for mode in results))
+    for turn in checkpoints:
+        print(f"{turn:>6} " + " ".join(f"{r['prompt_tokens'][turn - 1]:>12}" for r in results.values()))
+    print(f"\nTurn latency (ms), mean of the last {max(1, args.turns // 10)} turns:")
+    tail = max(1, args.turns // 10)
+    print("       " + " ".join(f"{mode:>12}" for mode in results))
+    print("       " + " ".join(f"{sum(r['latencies'][-tail:]) / tail * 1000:>12.1f}" for r in results.values()))
+    print(f"\n{'mode':<12} {'prompt tokens':>14} {'session s':>10} {'Dapr calls':>11} {'state read':>12} "
+          f"{'written':>12} {'stored':>10}")
+    for mode, r in results.items():
+        print(f"{mode:<12} {r['total_prompt_tokens']:>14} {sum(r['latencies']):>10.1f} {r['dapr_calls']:>11} "
+              f"{r['state_read'] / 1024:>10.0f}Ki {r['state_written'] / 1024:>10.0f}Ki {r['stored'] / 1024:>8.1f}Ki")
+    for mode, r in results.items():
+        if r["memory"]:
+            print(f"{mode}: {r['memory']}")
+
+
+if __name__ == "__main__":
+    main()
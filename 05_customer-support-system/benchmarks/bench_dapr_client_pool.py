@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: fresh DaprClient per call vs the shared DaprClientPool
+Runs customer lookups against an in-process Dapr gRPC stub and reports calls per second.
+
+Usage:
+    python benchmarks/bench_dapr_client_pool.py --calls 2000 --threads 1 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dapr.clients import DaprClient
+from dapr_client_pool import DaprClientPool
+from dapr_stub import FakeDaprSidecar
+
+
+def fresh_client_lookup(customer_id: str):
+    with DaprClient() as client:
+        return client.get_state("customer-state", customer_id).data
+
+
+def run(label: str, lookup, calls: int, threads: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lookup, ["CUST001"] * calls))
+    elapsed = time.perf_counter() - start
+    rate = calls / elapsed
+    print(f"{label:<28} threads={threads:<3} calls={calls:<6} {rate:>10.0f} calls/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--pool-size", type=int, default=4)
+    args = parser.parse_args()
+
+    with FakeDaprSidecar() as sidecar:
+        sidecar.seed("customer-state", "CUST001", json.dumps({"customer_id": "CUST001"}).encode())
+        pool = DaprClientPool(size=args.pool_size)
+        pool.start(warm=args.pool_size)
+
+        def pooled_lookup(customer_id: str):
+            with pool.client() as client:
+                return client.get_state("customer-state", customer_id).data
+
+        for threads in args.threads:
+            before = run("fresh DaprClient per call", fresh_client_lookup, args.calls, threads)
+            after = run(f"pooled (size={args.pool_size})", pooled_lookup, args.calls, threads)
+            print(f"{'speedup':<28} threads={threads:<3} {after / before:>22.1f}x\n")
+
+        print("Pool metrics:", json.dumps(pool.metrics(), indent=2))
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+/data listing benchmark: one in-memory response vs cursor pages vs NDJSON streaming
+Seeds the in-process Dapr stub with --tickets execution-state records of about
+--payload-bytes each, serves the app in-process and measures total time, time to
+first byte and peak Python heap (tracemalloc) for:
+
+  legacy      the previous implementation: bulk-read all four stores, decode
+              everything and return one response dict
+  paginated   GET /data?limit=N, following next_cursor until exhausted
+  ndjson      GET /data?format=ndjson, consumed line by line
+
+Usage:
+    python benchmarks/bench_data_listing.py --tickets 20000 --payload-bytes 2000
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+import tracemalloc
+import warnings
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from dapr_stub import FakeDaprSidecar
+
+
+def legacy_list_all_data():
+    """The previous /data body: one bulk read per store, sequentially, all decoded into one dict"""
+    import app as support_app
+    result = {}
+    with support_app.dapr_pool.client() as client:
+        for name, store_name in support_app.DATA_STORES.items():
+            # Real sidecars need explicit keys; the stub's key list stands in for them
+            keys = list(SIDECAR.servicer.stores[store_name])
+            try:
+                response = client.get_bulk_state(store_name, keys)
+                result[name] = [{"key": item.key, "data": json.loads(item.data)} for item in response.items if item.data]
+            except Exception as e:
+                result[name] = {"error": str(e)}
+    return {
+        "status": "success",
+        "counts": {k: len(v) if isinstance(v, list) else 0 for k, v in result.items()},
+        "errors": [f"{k}: {v['error'][:80]}" for k, v in result.items() if isinstance(v, dict)],
+        "data": result
+    }
+
+
+def serve(support_app) -> str:
+    import uvicorn
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(support_app.app, host="127.0.0.1", port=port,
+                                           lifespan="off", log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+def measure(label, run):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    items, first_byte = run(start)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<12} items={items:<8} total={elapsed * 1000:8.1f} ms  first byte={first_byte * 1000:8.1f} ms  "
+          f"peak heap={peak / 1e6:7.1f} MB")
+
+
+def main():
+    global SIDECAR
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=20000)
+    parser.add_argument("--payload-bytes", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=500, help="Page size for the paginated and streaming modes")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    warnings.simplefilter("ignore")
+
+    with FakeDaprSidecar() as SIDECAR:
+        filler = "x" * args.payload_bytes
+        for i in range(args.tickets):
+            SIDECAR.seed("execution-state", f"support-T{i:07d}||metadata", json.dumps({"history": filler, "n": i}).encode())
+        for i in range(100):
+            SIDECAR.seed("customer-state", f"CUST{i:06d}", json.dumps({"customer_id": f"CUST{i:06d}"}).encode())
+            SIDECAR.seed("system-state", f"CUST{i:06d}", json.dumps({"customer_id": f"CUST{i:06d}"}).encode())
+
+        import app as support_app
+        support_app.app.get("/legacy-data")(legacy_list_all_data)
+        url = serve(support_app)
+        session = requests.Session()
+        print(f"execution-state items={args.tickets} payload={args.payload_bytes} B page size={args.limit}\n")
+
+        def legacy(start):
+            response = session.get(f"{url}/legacy-data", stream=True)
+            first = None
+            chunks = []
+            for chunk in response.iter_content(65536):
+                first = first or time.perf_counter() - start
+                chunks.append(chunk)
+            body = json.loads(b"".join(chunks))
+            for error in body["errors"]:
+                print(f"  legacy error: {error}")
+            return sum(body["counts"].values()), first
+
+        def paginated(start):
+            cursor, total, first = None, 0, None
+            while True:
+                params = {"limit": args.limit, **({"cursor": cursor} if cursor else {})}
+                body = session.get(f"{url}/data", params=params).json()
+                first = first or time.perf_counter() - start
+                total += sum(body["counts"].values())
+                cursor = body["next_cursor"]
+                if not cursor:
+                    return total, first
+
+        def ndjson(start):
+            response = session.get(f"{url}/data", params={"format": "ndjson", "limit": args.limit}, stream=True)
+            total, first = 0, None
+            for line in response.iter_lines():
+                first = first or time.perf_counter() - start
+                if b'"key"' in line:
+                    total += 1
+            return total, first
+
+        measure("legacy", legacy)
+        measure("paginated", paginated)
+        measure("ndjson", ndjson)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Knowledge base benchmark: index build time, index size and query latency
+Generates a synthetic corpus (Dapr terms mixed with a Zipf-distributed filler
+vocabulary), builds the BM25 index and the memory-mapped embedding matrix, and
+reports p50/p95/p99 latency for BM25-only and hybrid (BM25 + cosine, RRF) queries.
+
+Usage:
+    python benchmarks/bench_knowledge_base.py --docs 10000 1000000 --queries 200
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge_base import Document, KnowledgeBase, build_embeddings
+
+DAPR_TERMS = (
+    "sidecar state store redis pubsub topic subscription workflow activity actor reminder timer placement "
+    "scheduler component metadata yaml kubernetes injector annotation mtls certificate sentry invocation "
+    "grpc http timeout connection refused latency upgrade version compatibility secret binding health "
+    "readiness memory oomkilled eviction retry resiliency policy tracing metrics configuration namespace"
+).split()
+FILLER_VOCABULARY = 50000
+
+
+def synthetic_texts(count: int, seed: int, words_per_doc: int = 24):
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        terms = rng.choice(DAPR_TERMS, size=6)
+        filler = np.minimum(rng.zipf(1.3, size=words_per_doc - 6), FILLER_VOCABULARY)
+        yield " ".join([*terms, *(f"w{n}" for n in filler)])
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(len(samples) * q))]
+    return statistics.median(samples), pick(0.95), pick(0.99)
+
+
+def run(docs: int, queries: int, dim: int, seed: int):
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        kb = KnowledgeBase(corpus_dir, use_embeddings=True, embedding_dim=dim)
+        start = time.perf_counter()
+        kb.build((Document(issue=text[:60], source=f"doc-{i}"), text)
+                 for i, text in enumerate(synthetic_texts(docs, seed)))
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        build_embeddings(corpus_dir, dim, texts=synthetic_texts(docs, seed), count=docs)
+        embed_seconds = time.perf_counter() - start
+        kb.embeddings = np.load(os.path.join(corpus_dir, ".index", f"embeddings-{dim}.npy"), mmap_mode="r")
+        kb.loaded = True
+
+        index_mb = (kb.posting_docs.nbytes + kb.posting_weights.nbytes + kb.offsets.nbytes) / 1e6
+        print(f"\n{docs:,} documents: BM25 build {build_seconds:.1f}s ({len(kb.vocabulary):,} terms, "
+              f"{len(kb.posting_docs):,} postings, {index_mb:.0f} MB), embeddings {embed_seconds:.1f}s "
+              f"({kb.embeddings.nbytes / 1e6:.0f} MB memory-mapped)")
+
+        rng = np.random.default_rng(seed + 1)
+        query_texts = [" ".join(rng.choice(DAPR_TERMS, size=rng.integers(2, 6))) for _ in range(queries)]
+        for label, hybrid in (("bm25", False), ("hybrid", True)):
+            latencies = []
+            for query in query_texts:
+                start = time.perf_counter()
+                kb.search(query, k=5, hybrid=hybrid)
+                latencies.append((time.perf_counter() - start) * 1000)
+            p50, p95, p99 = percentiles(latencies)
+            print(f"  {label:<7} p50={p50:7.2f} ms  p95={p95:7.2f} ms  p99={p99:7.2f} ms")
+        del kb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, nargs="+", default=[10000, 1000000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=128, help="Embedding dimensions")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    for docs in args.docs:
+        run(docs, args.queries, args.dim, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+LLM gateway benchmark: a burst of tickets against a rate-limited provider, with and without the gateway
+Submits --tickets tickets at once to --concurrency activity threads running
+customer_support_workflow offline (as bench_support_workflow does). Every LLM call of
+the triage and expert agents and the customer notification is served by one
+fake_provider.FakeProvider with a requests-per-minute quota, a cap on requests in
+flight, and latency that rises with load.
+
+  off  LLM_GATEWAY_ENABLED=false: every activity calls the provider at once and a 429
+       fails the call (the triage and expert activities then fail the ticket, the
+       notification falls back to a canned message)
+  on   the process-wide gateway (common/llm_gateway.py) with the same quota:
+       requests are paced, concurrency adapts to the 429s, throttled calls are
+       retried with jitter, and notifications are admitted before expert analyses
+
+Reports ticket outcomes, throughput, ticket latency, notification latency and how
+many notifications fell back, the provider's 429s and peak load, and the gateway's
+queue waits per lane.
+
+Usage:
+    python benchmarks/bench_llm_gateway.py --tickets 60 --concurrency 32 --rpm 1800 --max-in-flight 4
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, os.path.dirname(os.path.dirname(BENCHMARKS)))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from bench_support_workflow import EXPERT_ANSWER, EXPERT_TOOL_CALLS, TRIAGE_ANSWER, TRIAGE_TOOL_CALLS, TicketRunner, seed
+from common.llm_gateway import LLMGateway, gateway_chat_client
+from dapr_stub import FakeDaprSidecar
+from fake_provider import FakeProvider, ProviderChatClient
+from workflow_driver import inline_workflow_api
+
+FALLBACK = "has been processed by our team"
+
+
+def configure(app, gateway, provider: FakeProvider, sidecar):
+    """Provider-backed clients for both agents, wrapped the way app.py wraps the real ones"""
+    app.llm_cache = None
+    app.model_router = None
+    app.llm_gateway = gateway
+    sidecar.servicer.conversation_provider = provider
+    for agent, lane, tool_calls, answer in (
+        (app.triage_agent, "normal", TRIAGE_TOOL_CALLS, json.dumps(TRIAGE_ANSWER)),
+        (app.expert_agent, "low", EXPERT_TOOL_CALLS, EXPERT_ANSWER),
+    ):
+        llm = ProviderChatClient(provider, tool_calls=tool_calls, final_answer=answer, model="gpt-4o")
+        agent.llm = app.tracer.trace_chat_client(gateway_chat_client(llm, gateway, lane))
+        agent.text_formatter.print_message = lambda *a, **k: None
+
+
+def timed_notifications(app, samples: list):
+    """Wrap create_customer_notification to time it and spot the canned fallback message"""
+    create = app.create_customer_notification
+    lock = threading.Lock()
+
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        message = create(*args, **kwargs)
+        with lock:
+            samples.append((time.perf_counter() - start, FALLBACK in message))
+        return message
+
+    app.create_customer_notification = timed
+    return create
+
+
+def run_mode(app, mode: str, args, sidecar) -> dict:
+    provider = FakeProvider(requests_per_minute=args.rpm, max_in_flight=args.max_in_flight,
+                            latency=args.llm_latency, overload_latency=args.overload_latency)
+    gateway = LLMGateway(requests_per_minute=args.rpm, max_concurrency=args.gateway_max_concurrency,
+                         retry_base=args.retry_base, retry_max=args.retry_max,
+                         max_retries=args.max_retries) if mode == "on" else None
+    configure(app, gateway, provider, sidecar)
+    notifications = []
+    create = timed_notifications(app, notifications)
+    runner = TicketRunner(app, approve=True)
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="workflow-worker") as pool:
+            start = time.perf_counter()
+            latencies = sorted(pool.map(lambda _: runner.run_one(), range(args.tickets)))
+            elapsed = time.perf_counter() - start
+    finally:
+        app.create_customer_notification = create
+    notify_seconds = sorted(seconds for seconds, _ in notifications)
+    metrics = gateway.metrics() if gateway else {"lanes": {}, "concurrency_limit": None}
+    return {
+        "mode": mode,
+        "statuses": dict(runner.statuses),
+        "completed": runner.statuses.get("completed", 0),
+        "tickets_per_second": runner.statuses.get("completed", 0) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+        "notify_p95_ms": notify_seconds[min(len(notify_seconds) - 1, int(len(notify_seconds) * 0.95))] * 1000
+        if notify_seconds else 0.0,
+        "notify_fallbacks": sum(fallback for _, fallback in notifications),
+        "provider": dict(provider.stats),
+        "limit": metrics["concurrency_limit"],
+        "lanes": metrics["lanes"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=32, help="Activity threads")
+    parser.add_argument("--rpm", type=float, default=1800, help="Provider requests per minute")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="Provider cap on requests in flight")
+    parser.add_argument("--llm-latency", type=float, default=0.15, help="Provider latency per request (s)")
+    parser.add_argument("--overload-latency", type=float, default=0.02, help="Added latency per other request in flight (s)")
+    parser.add_argument("--gateway-max-concurrency", type=int, default=16)
+    parser.add_argument("--max-retries", type=int, default=6)
+    parser.add_argument("--retry-base", type=float, default=0.2, help="Backoff base (s)")
+    parser.add_argument("--retry-max", type=float, default=5.0, help="Longest backoff (s)")
+    parser.add_argument("--modes", nargs="+", default=["off", "on"], choices=["off", "on"])
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    with FakeDaprSidecar(max_workers=max(32, args.concurrency * 4)) as sidecar:
+        seed(sidecar)
+        import app
+        app.dapr_pool.start()
+        results = []
+        with inline_workflow_api():
+            for mode in args.modes:
+                results.append(run_mode(app, mode, args, sidecar))
+        app.dapr_pool.close()
+
+    print(f"\n{args.tickets} tickets at once on {args.concurrency} threads; provider: {args.rpm:.0f} requests/min, "
+          f"{args.max_in_flight} in flight, {args.llm_latency * 1000:.0f} ms + {args.overload_latency * 1000:.0f} ms "
+          f"per concurrent request\n")
+    print(f"{'gateway':<8} {'completed':>9} {'tickets/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'notify p95':>10} "
+          f"{'fallbacks':>9} {'requests':>8} {'429s':>6} {'peak':>5} {'limit':>6}  statuses")
+    for r in results:
+        limit = f"{r['limit']:.1f}" if r["limit"] is not None else "-"
+        print(f"{r['mode']:<8} {r['completed']:>9} {r['tickets_per_second']:>9.2f} {r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} "
+              f"{r['notify_p95_ms']:>10.0f} {r['notify_fallbacks']:>9} {r['provider']['requests']:>8} "
+              f"{r['provider']['rejected']:>6} {r['provider']['peak_in_flight']:>5} {limit:>6}  {r['statuses']}")
+    for r in results:
+        for lane, stats in sorted(r["lanes"].items()):
+            print(f"  {r['mode']} lane {lane:<7} attempts {stats['attempts']:>4}  retries {stats['retries']:>4}  "
+                  f"429s {stats['throttled']:>4}  failed {stats['failed']:>3}  "
+                  f"wait p95 {stats['p95_wait_seconds'] * 1000:>7.0f} ms  max {stats['max_wait_seconds'] * 1000:>7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
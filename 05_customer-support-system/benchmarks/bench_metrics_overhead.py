@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Metrics overhead benchmark: cost of span + Prometheus instrumentation per ticket
+Replays the span pattern of one ticket (workflow, activities, agent runs, LLM and
+tool calls, approval wait) with instrumentation off, metrics only and tracing +
+metrics, first with no work inside the spans (the pure instrumentation cost) and
+then with CPU work standing in for the ticket, reporting the throughput loss. The
+modes run interleaved for --rounds rounds and the median is reported, so drift in CPU
+speed over the run doesn't land on one mode.
+
+Usage:
+    python benchmarks/bench_metrics_overhead.py --tickets 500 --rounds 5 --work-us 20000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import SupportMetrics
+from tracing import Tracer, workflow_span_id
+
+ACTIVITIES = {
+    # activity -> (LLM calls, tool calls)
+    "triage_activity": (3, 2),
+    "expert_analysis_activity": (3, 3),
+    "customer_notification_activity": (1, 0),
+}
+
+
+def spin(microseconds: float):
+    deadline = time.perf_counter() + microseconds / 1e6
+    while time.perf_counter() < deadline:
+        pass
+
+
+def build(mode: str) -> Tracer:
+    tracer = Tracer(enabled=mode != "off", store=mode == "tracing+metrics", max_tickets=1000)
+    if mode != "off":
+        metrics = SupportMetrics(tracer)
+        tracer.add_listener(metrics.on_span, kinds=metrics.kinds)
+    return tracer
+
+
+def run_ticket(tracer: Tracer, ticket_id: str, work_us: float):
+    """One ticket's spans; the work is split evenly across the LLM and tool calls"""
+    calls = sum(llm + tools for llm, tools in ACTIVITIES.values())
+    per_call = work_us / calls
+    root = workflow_span_id(ticket_id)
+    tracer.start_span(ticket_id, "customer_support_workflow", "workflow", span_id=root)
+    for activity, (llm_calls, tool_calls) in ACTIVITIES.items():
+        if activity == "customer_notification_activity":
+            wait_id = f"{ticket_id}/approval"
+            tracer.start_span(ticket_id, "wait solution_approved", "wait", span_id=wait_id, parent_id=root)
+            tracer.end_span(ticket_id, wait_id, timed_out=False)
+        with tracer.span(activity, "activity", ticket_id=ticket_id, parent_id=root):
+            with tracer.span("agent", "agent"):
+                for i in range(max(llm_calls, tool_calls)):
+                    if i < llm_calls:
+                        with tracer.span("llm.generate", "llm", model="gpt-4o") as span:
+                            spin(per_call)
+                            if span is not None:
+                                span.set(prompt_tokens=900, completion_tokens=250, total_tokens=1150)
+                    if i < tool_calls:
+                        with tracer.span("lookup_customer", "tool"):
+                            spin(per_call)
+    tracer.end_span(ticket_id, root, outcome="completed")
+
+
+def measure(mode: str, tickets: int, work_us: float) -> float:
+    tracer = build(mode)
+    start = time.perf_counter()
+    for i in range(tickets):
+        run_ticket(tracer, f"T{i}", work_us)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=500, help="Tickets per mode and round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--work-us", type=float, default=20000,
+                        help="CPU work per ticket (µs); real tickets spend seconds in LLM calls")
+    args = parser.parse_args()
+
+    modes = ("off", "metrics", "tracing+metrics")
+    print(f"Instrumentation cost per ticket ({args.tickets} tickets, no work):")
+    empty = {mode: measure(mode, args.tickets, 0) for mode in modes}
+    for mode in modes:
+        print(f"  {mode:<16} {empty[mode] / args.tickets * 1e6:8.1f} µs/ticket")
+
+    print(f"Throughput with {args.work_us:.0f} µs of work per ticket ({args.rounds} rounds, median):")
+    rounds = {mode: [] for mode in modes}
+    for _ in range(args.rounds):
+        for mode in modes:
+            rounds[mode].append(measure(mode, args.tickets, args.work_us))
+    elapsed = {mode: statistics.median(times) for mode, times in rounds.items()}
+    for mode in modes:
+        print(f"  {mode:<16} {args.tickets / elapsed[mode]:9.1f} tickets/s  "
+              f"overhead={(elapsed[mode] / elapsed['off'] - 1):+.2%}")
+
+    tracer = Tracer(store=False)
+    metrics = SupportMetrics(tracer)
+    tracer.add_listener(metrics.on_span, kinds=metrics.kinds)
+    for i in range(100):
+        run_ticket(tracer, f"T{i}", 0)
+    start = time.perf_counter()
+    body = metrics.render()
+    print(f"Scrape of GET /metrics: {len(body):,} bytes in {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Model routing benchmark: latency, tokens and cost per ticket with routing off vs on
+Runs --tickets tickets through customer_support_workflow offline, as
+bench_support_workflow does (real activities and agents, scripted chat clients, the
+in-memory Dapr stub), with tier-aware fakes: a call on the small model takes
+--small-latency-ratio of the large model's latency, and its final answers fail
+validation at --small-invalid-rate (triage JSON with a field missing, a customer
+message that doesn't mention the ticket).
+
+  off  LLM_ROUTING_ENABLED=false: every call on gpt-4o / the openai component
+  on   the app's routing policies: triage and notification start on gpt-4o-mini /
+       openai-mini and fall back to the large tier on invalid answers, expert
+       analysis stays on gpt-4o
+
+Cost uses the tiers' list prices from common/model_router.py.
+
+Usage:
+    python benchmarks/bench_model_routing.py --tickets 100 --llm-latency 0.2 --small-invalid-rate 0.1
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, os.path.dirname(os.path.dirname(BENCHMARKS)))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from bench_support_workflow import EXPERT_ANSWER, EXPERT_TOOL_CALLS, TRIAGE_ANSWER, TRIAGE_TOOL_CALLS, TicketRunner, seed
+from common.llm_cache import estimate_tokens
+from common.model_router import DEFAULT_TIERS, ModelRouter, RoutePolicy, route_chat_client, tiers_from_env
+from dapr_stub import FakeDaprSidecar
+from fake_llm import FakeChatClient
+from workflow_driver import inline_workflow_api
+
+TIERS = {tier.model: tier for tier in DEFAULT_TIERS} | {tier.component: tier for tier in DEFAULT_TIERS}
+LARGE = DEFAULT_TIERS[-1]
+
+
+class Usage:
+    """Calls, tokens and list-price cost per tier across all fakes"""
+
+    def __init__(self):
+        self.by_tier = defaultdict(lambda: {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0})
+        self._lock = threading.Lock()
+
+    def add(self, model: str, prompt_tokens: int, completion_tokens: int):
+        tier = TIERS.get(model, LARGE)
+        with self._lock:
+            entry = self.by_tier[tier.name]
+            entry["calls"] += 1
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+            entry["cost"] += tier.cost(prompt_tokens, completion_tokens)
+
+
+class Flaky:
+    """Deterministic failure schedule: every 1/rate-th small-model answer is invalid"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._count = 0.0
+        self._lock = threading.Lock()
+
+    def fail(self) -> bool:
+        with self._lock:
+            before = int(self._count)
+            self._count += self.rate
+            return int(self._count) > before
+
+
+class TieredChatClient(FakeChatClient):
+    """FakeChatClient whose latency and answer quality depend on the requested model"""
+
+    def __init__(self, usage: Usage, flaky: Flaky, small_ratio: float, invalid_answer: str, **kwargs):
+        super().__init__(**kwargs)
+        self.usage = usage
+        self.flaky = flaky
+        self.small_ratio = small_ratio
+        self.invalid_answer = invalid_answer
+        # Latency is applied here, per call, from the requested model
+        self._large_latency, self.latency = self.latency, 0.0
+        self._local = threading.local()
+
+    def _message(self, messages):
+        message = super()._message(messages)
+        if message.content and getattr(self._local, "small", False) and self.flaky.fail():
+            message.content = self.invalid_answer
+        return message
+
+    def generate(self, messages=None, *, model=None, **kwargs):
+        small = TIERS.get(model or self.model, LARGE) is not LARGE
+        self._local.small = small
+        time.sleep(self._large_latency * (self.small_ratio if small else 1.0))
+        response = super().generate(messages, model=model, **kwargs)
+        usage = response.metadata["usage"]
+        self.usage.add(model or self.model, usage["prompt_tokens"], usage["completion_tokens"])
+        return response
+
+
+def configure(app, router, args, usage: Usage, flaky: Flaky):
+    """Fresh fakes for both agents, wrapped the way app.py wraps the real clients"""
+    app.llm_cache = None
+    app.model_router = router
+    invalid_triage = json.dumps({key: value for key, value in TRIAGE_ANSWER.items() if key != "customer_found"})
+    for agent, name, tool_calls, answer, invalid in (
+        (app.triage_agent, "triage", TRIAGE_TOOL_CALLS, json.dumps(TRIAGE_ANSWER), invalid_triage),
+        (app.expert_agent, "expert", EXPERT_TOOL_CALLS, EXPERT_ANSWER, EXPERT_ANSWER),
+    ):
+        llm = TieredChatClient(usage, flaky, args.small_latency_ratio, invalid, latency=args.llm_latency,
+                               tool_calls=tool_calls, final_answer=answer, model="gpt-4o")
+        agent.llm = route_chat_client(app.tracer.trace_chat_client(llm), router, name)
+        agent.text_formatter.print_message = lambda *a, **k: None
+
+
+def conversation_reply(usage: Usage, flaky: Flaky):
+    def reply(component: str, prompt: str) -> str:
+        ticket_id = prompt.split("Ticket ID: ", 1)[-1].split("\n", 1)[0].strip()
+        text = f"Dear Customer, we have resolved ticket {ticket_id}. Thank you for your patience."
+        if TIERS.get(component, LARGE) is not LARGE and flaky.fail():
+            text = "Dear Customer, your issue has been resolved."
+        usage.add(component, estimate_tokens(prompt), estimate_tokens(text))
+        return text
+    return reply
+
+
+def run_mode(app, mode: str, args, sidecar, policies) -> dict:
+    router = ModelRouter(tiers_from_env(), policies) if mode == "on" else None
+    usage, flaky = Usage(), Flaky(args.small_invalid_rate)
+    configure(app, router, args, usage, flaky)
+    sidecar.servicer.conversation_reply = conversation_reply(usage, flaky)
+    runner = TicketRunner(app, approve=True)
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="workflow-worker") as pool:
+        latencies = sorted(pool.map(lambda _: runner.run_one(), range(args.tickets)))
+    total = {key: sum(entry[key] for entry in usage.by_tier.values())
+             for key in ("calls", "prompt_tokens", "completion_tokens", "cost")}
+    metrics = router.metrics() if router else {"agents": {}}
+    fallbacks = sum(tier["fallbacks"] for agent in metrics["agents"].values() for tier in agent["tiers"].values())
+    return {
+        "mode": mode,
+        "statuses": dict(runner.statuses),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+        "calls": total["calls"] / args.tickets,
+        "tokens": (total["prompt_tokens"] + total["completion_tokens"]) / args.tickets,
+        "large_tokens": sum(usage.by_tier[LARGE.name][key] for key in ("prompt_tokens", "completion_tokens"))
+        / args.tickets,
+        "cost": total["cost"] / args.tickets,
+        "fallbacks": fallbacks / args.tickets,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Large-model latency per call (s)")
+    parser.add_argument("--small-latency-ratio", type=float, default=0.4, help="Small-model latency / large-model latency")
+    parser.add_argument("--small-invalid-rate", type=float, default=0.1, help="Share of invalid small-model answers")
+    parser.add_argument("--modes", nargs="+", default=["off", "on"], choices=["off", "on"])
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    with FakeDaprSidecar(max_workers=max(32, args.concurrency * 4)) as sidecar:
+        sidecar.servicer.component_latency = {
+            tier.component: args.llm_latency * (1.0 if tier is LARGE else args.small_latency_ratio)
+            for tier in DEFAULT_TIERS
+        }
+        seed(sidecar)
+        import app
+        app.dapr_pool.start()
+        # The app's own per-agent policies (LLM_ROUTE_* overrides included)
+        policies = app.model_router.policies if app.model_router else {
+            "triage": RoutePolicy(task="lookup", validator=app.is_valid_triage_output),
+            "expert": RoutePolicy(task="analysis"),
+            "notification": RoutePolicy(task="draft"),
+        }
+        results = []
+        with inline_workflow_api():
+            for mode in args.modes:
+                results.append(run_mode(app, mode, args, sidecar, policies))
+        app.dapr_pool.close()
+
+    print(f"\n{args.tickets} tickets at concurrency {args.concurrency}; large model {args.llm_latency * 1000:.0f} ms/call, "
+          f"small model x{args.small_latency_ratio}, {args.small_invalid_rate:.0%} invalid small-model answers\n")
+    print(f"{'routing':<8} {'p50 ms':>8} {'p95 ms':>8} {'LLM calls':>10} {'tokens':>8} {'on gpt-4o':>10} "
+          f"{'cost $/1k tickets':>18} {'fallbacks':>10}  statuses")
+    for r in results:
+        print(f"{r['mode']:<8} {r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} {r['calls']:>10.2f} {r['tokens']:>8.0f} "
+              f"{r['large_tokens']:>10.0f} {r['cost'] * 1000:>18.3f} {r['fallbacks']:>10.2f}  {r['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
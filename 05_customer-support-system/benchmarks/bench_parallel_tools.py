@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark: sequential vs concurrent tool execution for the support agents
+Tools are stubbed with injected delays and the LLM is mocked to request all of a
+turn's tool calls at once (2 lookups for triage, 4 knowledge base queries for the
+expert). Three triage variants are compared:
+
+  sequential   original synchronous tools, executed one after another
+  offloaded    tools wrapped with offload_tools(), executed concurrently
+  fan-out      lookups run as parallel activities (wf.when_all), triage without tool turn
+
+Usage:
+    python benchmarks/bench_parallel_tools.py --tickets 30 --tool-delay 0.05 --llm-latency 0.02
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dapr_agents import Agent, tool
+from agent_runtime import offload_tools, run_ticket_agent
+from fake_llm import FakeChatClient
+
+TOOL_DELAY = 0.05
+
+
+@tool
+def lookup_customer(customer_id: str) -> dict:
+    """Look up customer information by customer ID"""
+    time.sleep(TOOL_DELAY)
+    return {"customer_id": customer_id, "support_entitlement": True}
+
+
+@tool
+def lookup_system_info(customer_id: str) -> dict:
+    """Look up customer's system information"""
+    time.sleep(TOOL_DELAY)
+    return {"customer_id": customer_id, "dapr_version": "1.12.0"}
+
+
+@tool
+def query_knowledge_base(query_focus: str) -> dict:
+    """Query the knowledge base"""
+    time.sleep(TOOL_DELAY)
+    return {"query_focus": query_focus, "similar_issues": []}
+
+
+TRIAGE_CALLS = [
+    {"name": "LookupCustomer", "arguments": {"customer_id": "CUST001"}},
+    {"name": "LookupSystemInfo", "arguments": {"customer_id": "CUST001"}},
+]
+EXPERT_CALLS = [
+    {"name": "QueryKnowledgeBase", "arguments": {"query_focus": focus}}
+    for focus in ("connection timeout", "component configuration", "version compatibility", "networking")
+]
+
+
+def build_agent(tools, tool_calls, llm_latency) -> Agent:
+    agent = Agent(name="Benchmark Agent", role="Support", tools=tools,
+                  llm=FakeChatClient(latency=llm_latency, tool_calls=tool_calls))
+    agent.text_formatter.print_message = lambda *a, **k: None
+    return agent
+
+
+def measure(label: str, run_ticket, tickets: int):
+    latencies = []
+    for i in range(tickets):
+        start = time.perf_counter()
+        run_ticket(i)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{label:<34} p50={p50:7.1f} ms   p95={p95:7.1f} ms")
+    return p50
+
+
+def main():
+    global TOOL_DELAY
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=30)
+    parser.add_argument("--tool-delay", type=float, default=0.05, help="Injected delay per tool call (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.02, help="Mocked LLM latency per turn (s)")
+    args = parser.parse_args()
+    TOOL_DELAY = args.tool_delay
+
+    logging.disable(logging.CRITICAL)
+    executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="agent-tool")
+    print(f"tool delay={args.tool_delay}s, LLM latency={args.llm_latency}s, tickets={args.tickets}\n")
+
+    triage_tools = [lookup_customer, lookup_system_info]
+    expert_tools = [query_knowledge_base]
+
+    def agent_ticket(agent):
+        # Every ticket runs on its own copy of the agent, so every ticket sends the same prompt size
+        def run(i):
+            return run_ticket_agent(agent, f"Ticket {i}")
+        return run
+
+    print("Triage (customer + system lookup)")
+    base = measure("  sequential tools", agent_ticket(build_agent(triage_tools, TRIAGE_CALLS, args.llm_latency)), args.tickets)
+    offloaded = measure("  offloaded tools (concurrent)",
+                        agent_ticket(build_agent(offload_tools(triage_tools, executor), TRIAGE_CALLS, args.llm_latency)),
+                        args.tickets)
+    no_tool_agent = build_agent([], None, args.llm_latency)
+
+    def fan_out(i):
+        # wf.when_all over two lookup activities, then a single triage LLM turn
+        futures = [executor.submit(lookup_customer, "CUST001"), executor.submit(lookup_system_info, "CUST001")]
+        [f.result() for f in futures]
+        return agent_ticket(no_tool_agent)(i)
+
+    fanned = measure("  workflow fan-out (when_all)", fan_out, args.tickets)
+    print(f"  p50 improvement: offloaded {base / offloaded:.2f}x, fan-out {base / fanned:.2f}x\n")
+
+    print("Expert analysis (4 knowledge base queries)")
+    base = measure("  sequential tools", agent_ticket(build_agent(expert_tools, EXPERT_CALLS, args.llm_latency)), args.tickets)
+    offloaded = measure("  offloaded tools (concurrent)",
+                        agent_ticket(build_agent(offload_tools(expert_tools, executor), EXPERT_CALLS, args.llm_latency)),
+                        args.tickets)
+    print(f"  p50 improvement: {base / offloaded:.2f}x")
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Workflow payload benchmark: history size and replay time with and without claim checks
+Runs --tickets tickets through customer_support_workflow on the real durabletask
+orchestration executor (bench_approval_wait.HistoryBackend), approved as soon as they
+wait. Activities return the texts of the sample workflow-state.json (a 1.7 KB triage
+analysis, a 4 KB expert analysis), passed through the app's own slimming helpers, so
+with claim checks they write their payloads to the in-memory Dapr stub and return
+references.
+
+  inline  PAYLOAD_CLAIM_CHECK=false: every text is copied into the history
+  claim   references, payloads stored as JSON
+  zlib    references, payloads stored zlib-compressed
+  zstd    references, payloads stored zstd-compressed (needs the zstandard package)
+
+Reports per ticket: history size while parked on the approval and when finished, the
+workflow output, the time to replay the finished history, the time the activities
+spend storing payloads, and the time a status read takes to resolve the output from
+a cold cache (another replica).
+
+Usage:
+    python benchmarks/bench_payload_history.py --tickets 500 --modes inline claim zlib zstd
+"""
+
+import argparse
+import copy
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from durabletask.internal import helpers
+
+from bench_approval_wait import ACTIVITY_RESULTS, START, HistoryBackend, history_bytes
+from dapr_stub import FakeDaprSidecar
+
+with open(os.path.join(os.path.dirname(BENCHMARKS), "workflow-state.json"), encoding="utf-8") as f:
+    SAMPLE = json.load(f)
+
+
+def activity_results(app, timings: list) -> dict:
+    """Activity results built from the sample output and slimmed the way the activities do"""
+
+    def timed(build):
+        def run(ticket_id):
+            start = time.perf_counter()
+            result = build(ticket_id)
+            timings.append(time.perf_counter() - start)
+            return result
+        return run
+
+    def triage(ticket_id):
+        result = {**copy.deepcopy(SAMPLE["triage_result"]), "ticket_id": ticket_id}
+        result["triage"] = {"customer_info": {"customer_id": "CUST001", "name": "Acme Corp", "support_entitlement": True,
+                                              "system_info": {"dapr_version": "1.12.0"}},
+                            "user_reported_issue": result["user_reported_issue"], "has_entitlement": True,
+                            "additional_info": result["triage_analysis"], "customer_found": True}
+        return app.slim_triage_result(result)
+
+    def expert(ticket_id):
+        result = {**copy.deepcopy(SAMPLE["expert_result"]), "ticket_id": ticket_id}
+        # What store_analysis_result writes before the activity returns
+        with app.dapr_pool.client() as client:
+            client.save_state("analysis-state", f"analysis-{ticket_id}", json.dumps(result))
+        return app.slim_expert_result(result, stored=True)
+
+    def notification(ticket_id):
+        result = {**copy.deepcopy(SAMPLE["notification_result"]), "ticket_id": ticket_id}
+        result["customer_message"] = app.slim_payload(ticket_id, "customer_message", result["customer_message"])
+        return result
+
+    return {
+        **ACTIVITY_RESULTS,
+        "triage_activity": timed(triage),
+        "expert_analysis_activity": timed(expert),
+        "customer_notification_activity": timed(notification),
+    }
+
+
+def run_mode(app, mode: str, args, sidecar) -> dict:
+    from claim_check import ClaimCheck
+
+    app.claim_check = None if mode == "inline" else ClaimCheck(
+        app.dapr_pool, threshold=args.threshold, compression="none" if mode == "claim" else mode
+    )
+    timings = []
+    backend = HistoryBackend(app.customer_support_workflow, activity_results(app, timings))
+    calls_before = dict(sidecar.servicer.calls)
+    parked, finished, outputs, replays, wakeups, resolves = [], [], [], [], [], []
+    for i in range(args.tickets):
+        ticket_id = f"{mode[:2].upper()}{i:05d}"
+        instance = backend.start(f"support-{ticket_id}", {"ticket_id": ticket_id, "customer_id": "CUST001",
+                                                          "description": SAMPLE["triage_result"]["user_reported_issue"]},
+                                 START)
+        parked.append(history_bytes(instance))
+        wakeups.append(backend.raise_event(instance, "solution_approved", SAMPLE["final_solution"], START))
+        assert instance.output and instance.output["status"] == "completed", instance.output
+        finished.append(history_bytes(instance))
+
+        # Replay the finished history, as a worker does whenever the workflow runs again
+        for _ in range(args.replays):
+            start = time.perf_counter()
+            backend.executor.execute(instance.instance_id, instance.history,
+                                     [helpers.new_orchestrator_started_event(START)])
+            replays.append(time.perf_counter() - start)
+
+        serialized = json.dumps(instance.output)
+        outputs.append(len(serialized))
+        if app.claim_check:
+            # A status read on another replica: nothing cached
+            app.claim_check._cache.clear()
+        start = time.perf_counter()
+        resolved = json.loads(app.resolve_output(serialized))
+        resolves.append(time.perf_counter() - start)
+        assert resolved["expert_result"]["expert_analysis"] == SAMPLE["expert_result"]["expert_analysis"]
+        backend.instances.pop(instance.instance_id)
+
+    calls = {name: count - calls_before.get(name, 0) for name, count in sidecar.servicer.calls.items()}
+    metrics = app.claim_check.metrics() if app.claim_check else {}
+    return {
+        "mode": mode,
+        "parked_kib": statistics.mean(parked) / 1024,
+        "finished_kib": statistics.mean(finished) / 1024,
+        "output_bytes": statistics.mean(outputs),
+        "replay_ms": statistics.median(replays) * 1000,
+        "wakeup_ms": statistics.median(wakeups) * 1000,
+        "activity_ms": sum(timings) / args.tickets * 1000,
+        "resolve_ms": statistics.median(resolves) * 1000,
+        "stored_kib": metrics.get("stored_bytes_compressed", 0) / args.tickets / 1024,
+        "ratio": metrics.get("compression_ratio", 1.0),
+        "saves": calls.get("SaveState", 0) / args.tickets,
+        "bulk_reads": calls.get("GetBulkState", 0) / args.tickets,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=500)
+    parser.add_argument("--modes", nargs="+", default=["inline", "claim", "zlib", "zstd"],
+                        choices=["inline", "claim", "zlib", "zstd"])
+    parser.add_argument("--replays", type=int, default=3, help="Replays of each finished history")
+    parser.add_argument("--threshold", type=int, default=1024, help="PAYLOAD_CLAIM_THRESHOLD_BYTES")
+    parser.add_argument("--dapr-latency", type=float, default=0.0005, help="Latency per Dapr call (s)")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    with FakeDaprSidecar(latency=args.dapr_latency) as sidecar:
+        import app
+        app.dapr_pool.start()
+        results = []
+        for mode in args.modes:
+            try:
+                results.append(run_mode(app, mode, args, sidecar))
+            except RuntimeError as e:
+                print(f"{mode}: skipped ({e})")
+        app.dapr_pool.close()
+
+    print(f"\n{args.tickets} tickets, approved at once; payloads from workflow-state.json, "
+          f"claim threshold {args.threshold} B, Dapr latency {args.dapr_latency * 1000:.1f} ms\n")
+    print(f"{'mode':<7} {'parked KiB':>10} {'final KiB':>10} {'output B':>9} {'replay ms':>10} {'wake-up ms':>11} "
+          f"{'activity ms':>12} {'status ms':>10} {'stored KiB':>11} {'ratio':>6} {'saves':>6} {'bulk reads':>11}")
+    for r in results:
+        print(f"{r['mode']:<7} {r['parked_kib']:>10.1f} {r['finished_kib']:>10.1f} {r['output_bytes']:>9.0f} "
+              f"{r['replay_ms']:>10.3f} {r['wakeup_ms']:>11.3f} {r['activity_ms']:>12.2f} {r['resolve_ms']:>10.2f} "
+              f"{r['stored_kib']:>11.1f} {r['ratio']:>6.2f} {r['saves']:>6.1f} {r['bulk_reads']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
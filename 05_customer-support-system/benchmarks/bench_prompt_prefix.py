@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Prompt prefix benchmark: time to first token and billed tokens per ticket, agent prompts vs stable layout
+Runs --tickets tickets through customer_support_workflow offline, as
+bench_support_workflow does, with a chat client that behaves like a provider with
+prompt prefix caching: prompts are tokenized at about four characters per token (tool
+schemas first, then the messages), prefixes of --min-prefix tokens or more are cached
+in --block-token steps, and time to first token is --base-latency plus --prefill-us
+per prompt token that isn't served from the cache. Cached prompt tokens are billed at
+half price, as OpenAI does.
+
+  agent   STABLE_PROMPT_PREFIX=false: the agents' own prompts (date, instructions, then
+          the ticket data and task steps)
+  stable  the shared prompt layout (common/prompt_layout.py): fixed prefix, then only
+          the ticket's fields
+
+Usage:
+    python benchmarks/bench_prompt_prefix.py --tickets 200 --concurrency 4
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, os.path.dirname(os.path.dirname(BENCHMARKS)))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from bench_support_workflow import EXPERT_ANSWER, EXPERT_TOOL_CALLS, TRIAGE_ANSWER, TRIAGE_TOOL_CALLS, TicketRunner, seed
+from common.prompt_layout import use_prompt_layout
+from dapr_stub import FakeDaprSidecar
+from fake_llm import FakeChatClient
+from workflow_driver import inline_workflow_api
+
+# gpt-4o list prices, USD per 1M tokens
+PROMPT_COST, CACHED_PROMPT_COST, COMPLETION_COST = 2.50, 1.25, 10.00
+
+
+class PrefixCache:
+    """Provider-side prompt cache: digests of every cacheable prefix seen so far"""
+
+    def __init__(self, min_prefix: int, block: int):
+        self.min_prefix = min_prefix
+        self.block = block
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def lookup(self, text: str) -> int:
+        """Cached tokens at the start of `text`; remembers its prefixes for later prompts"""
+        data = text.encode()
+        digest = hashlib.sha1(data[:self.min_prefix * 4])
+        digests = []
+        for size in range(self.min_prefix, len(data) // 4 + 1, self.block):
+            if size > self.min_prefix:
+                digest.update(data[(size - self.block) * 4:size * 4])
+            digests.append((size, digest.digest()))
+        with self._lock:
+            cached = max((size for size, digest in digests if digest in self._seen), default=0)
+            self._seen.update(digest for _, digest in digests)
+        return cached
+
+
+class CachingChatClient(FakeChatClient):
+    """FakeChatClient billed and timed like a provider with prompt prefix caching"""
+
+    def __init__(self, cache: PrefixCache, calls: list, base_latency: float, prefill: float, **kwargs):
+        super().__init__(latency=0.0, **kwargs)
+        self.cache = cache
+        self.records = calls
+        self.base_latency = base_latency
+        self.prefill = prefill
+
+    def generate(self, messages=None, *, tools=None, **kwargs):
+        schemas = [tool.to_function_call() if hasattr(tool, "to_function_call") else tool for tool in tools or []]
+        text = json.dumps(schemas) + "".join(
+            json.dumps(message if isinstance(message, dict) else message.model_dump(), default=str)
+            for message in messages or []
+        )
+        prompt_tokens = len(text) // 4
+        cached = self.cache.lookup(text)
+        ttft = self.base_latency + (prompt_tokens - cached) * self.prefill
+        time.sleep(ttft)
+        response = super().generate(messages, tools=tools, **kwargs)
+        usage = response.metadata["usage"]
+        usage.update(prompt_tokens=prompt_tokens, total_tokens=prompt_tokens + usage["completion_tokens"],
+                     prompt_tokens_details={"cached_tokens": cached})
+        self.records.append((ttft, prompt_tokens, cached, usage["completion_tokens"]))
+        return response
+
+
+def configure(app, mode: str, cache: PrefixCache, calls: list, args):
+    """Fresh provider-like clients for both agents and the prompt layout of the mode"""
+    stable = mode == "stable"
+    app.llm_cache = None
+    app.model_router = None
+    app.STABLE_PROMPT_PREFIX = stable
+    for agent, layout, tool_calls, answer in (
+        (app.triage_agent, app.triage_layout, TRIAGE_TOOL_CALLS, json.dumps(TRIAGE_ANSWER)),
+        (app.expert_agent, app.expert_layout, EXPERT_TOOL_CALLS, EXPERT_ANSWER),
+    ):
+        llm = CachingChatClient(cache, calls, args.base_latency, args.prefill_us / 1e6,
+                                tool_calls=tool_calls, final_answer=answer, model="gpt-4o")
+        agent.llm = app.tracer.trace_chat_client(llm)
+        agent.text_formatter.print_message = lambda *a, **k: None
+        use_prompt_layout(agent, layout if stable else None)
+
+
+def run_mode(app, mode: str, args) -> dict:
+    cache, calls = PrefixCache(args.min_prefix, args.block_tokens), []
+    configure(app, mode, cache, calls, args)
+    runner = TicketRunner(app, approve=True)
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="workflow-worker") as pool:
+        latencies = sorted(pool.map(lambda _: runner.run_one(), range(args.tickets)))
+    ttfts = sorted(call[0] for call in calls)
+    prompt = sum(call[1] for call in calls)
+    cached = sum(call[2] for call in calls)
+    completion = sum(call[3] for call in calls)
+    cost = ((prompt - cached) * PROMPT_COST + cached * CACHED_PROMPT_COST + completion * COMPLETION_COST) / 1e6
+    return {
+        "mode": mode,
+        "statuses": dict(runner.statuses),
+        "ttft_p50_ms": statistics.median(ttfts) * 1000,
+        "ttft_p95_ms": ttfts[min(len(ttfts) - 1, int(len(ttfts) * 0.95))] * 1000,
+        "ticket_p50_ms": statistics.median(latencies) * 1000,
+        "prompt_tokens": prompt / args.tickets,
+        "cached_share": cached / prompt if prompt else 0.0,
+        # Billed prompt tokens at full-price equivalent: cached tokens count half
+        "billed_prompt_tokens": (prompt - cached / 2) / args.tickets,
+        "cost": cost / args.tickets,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--base-latency", type=float, default=0.05, help="Time to first token of an empty prompt (s)")
+    parser.add_argument("--prefill-us", type=float, default=40.0, help="Prefill time per uncached prompt token (us)")
+    parser.add_argument("--min-prefix", type=int, default=1024, help="Shortest cached prefix (tokens)")
+    parser.add_argument("--block-tokens", type=int, default=128, help="Cache granularity (tokens)")
+    parser.add_argument("--modes", nargs="+", default=["agent", "stable"], choices=["agent", "stable"])
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    with FakeDaprSidecar(max_workers=max(32, args.concurrency * 4)) as sidecar:
+        seed(sidecar)
+        import app
+        app.dapr_pool.start()
+        print("prompt prefix per agent: " + ", ".join(
+            f"{layout.name} {layout.prefix_tokens} tokens" for layout in (app.triage_layout, app.expert_layout)))
+        results = []
+        with inline_workflow_api():
+            for mode in args.modes:
+                results.append(run_mode(app, mode, args))
+        app.dapr_pool.close()
+
+    print(f"\n{args.tickets} tickets at concurrency {args.concurrency}; TTFT {args.base_latency * 1000:.0f} ms + "
+          f"{args.prefill_us:.0f} us per uncached prompt token; prefixes of {args.min_prefix}+ tokens cached "
+          f"in {args.block_tokens}-token steps\n")
+    print(f"{'prompt':<7} {'TTFT p50 ms':>12} {'TTFT p95 ms':>12} {'ticket p50 ms':>14} {'prompt tok':>11} "
+          f"{'cached':>7} {'billed tok':>11} {'$/1k tickets':>13}  statuses")
+    for r in results:
+        print(f"{r['mode']:<7} {r['ttft_p50_ms']:>12.1f} {r['ttft_p95_ms']:>12.1f} {r['ticket_p50_ms']:>14.0f} "
+              f"{r['prompt_tokens']:>11.0f} {r['cached_share']:>7.1%} {r['billed_prompt_tokens']:>11.0f} "
+              f"{r['cost'] * 1000:>13.3f}  {r['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+End-to-end ticket benchmark: customer_support_workflow fully offline
+Drives the real workflow, activities, agents and tools in-process: the agents' chat
+clients are replaced by scripted fakes (tool calls, then a final answer, after a
+configurable latency) and Dapr state, pub/sub and Conversation API calls go to the
+in-memory sidecar stub. Tickets run through the inline workflow driver on a thread
+pool at each concurrency level, standing in for the workflow worker's activity threads.
+
+Reports throughput and p50/p95/p99 ticket latency per concurrency level, then
+memory allocated (peak) and retained per ticket from a sequential tracemalloc pass.
+--json saves the results; --baseline compares against saved results and exits
+non-zero when throughput or p95 latency regressed by more than --tolerance.
+
+Usage:
+    python benchmarks/bench_support_workflow.py --tickets 200 --concurrency 1 8 32 --llm-latency 0.05
+    python benchmarks/bench_support_workflow.py --json baseline.json
+    python benchmarks/bench_support_workflow.py --baseline baseline.json --tolerance 0.15
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from dapr_stub import FakeDaprSidecar
+from fake_llm import FakeChatClient
+from workflow_driver import inline_workflow_api, run_workflow
+
+CUSTOMERS = 10
+TRIAGE_ANSWER = {
+    "customer_info": {
+        "customer_id": "CUST001", "name": "Acme Corporation", "support_entitlement": True,
+        "system_info": {"environment": "Production", "dapr_version": "1.12.0", "kubernetes_version": "1.28.2",
+                        "cloud_provider": "Azure", "region": "East US"},
+    },
+    "user_reported_issue": "Dapr sidecar keeps timing out",
+    "has_entitlement": True,
+    "customer_found": True,
+    "additional_info": "Enterprise customer running Dapr 1.12.0 on Azure",
+}
+TRIAGE_TOOL_CALLS = [
+    {"name": "LookupCustomer", "arguments": {"customer_id": "CUST001"}},
+    {"name": "LookupSystemInfo", "arguments": {"customer_id": "CUST001"}},
+]
+EXPERT_TOOL_CALLS = [
+    {"name": "QueryKnowledgeBase", "arguments": {"query_focus": focus}}
+    for focus in ("sidecar timeout", "state store configuration", "dapr 1.12 upgrade")
+]
+EXPERT_ANSWER = "Raise the sidecar's app health probe timeout and check the state store connection pool. " * 8
+APPROVAL = {"final_solution": "Raise the timeout", "support_notes": "Reviewed"}
+
+
+def seed(sidecar: FakeDaprSidecar):
+    for i in range(1, CUSTOMERS + 1):
+        customer_id = f"CUST{i:03d}"
+        sidecar.seed("customer-state", customer_id, json.dumps(
+            {"customer_id": customer_id, "name": f"Customer {i}", "support_entitlement": True}).encode())
+        sidecar.seed("system-state", customer_id, json.dumps(
+            {"customer_id": customer_id, "environment": "Production", "dapr_version": "1.12.0"}).encode())
+
+
+def configure(app, llm_latency: float, llm_cache: bool):
+    """Swap the agents' chat clients for scripted fakes, wrapped the way app.py wraps the real ones"""
+    from common.llm_cache import cache_chat_client
+
+    cache = app.llm_cache if llm_cache else None
+    if not llm_cache:
+        app.llm_cache = None
+    for agent, tool_calls, answer in (
+        (app.triage_agent, TRIAGE_TOOL_CALLS, json.dumps(TRIAGE_ANSWER)),
+        (app.expert_agent, EXPERT_TOOL_CALLS, EXPERT_ANSWER),
+    ):
+        llm = FakeChatClient(latency=llm_latency, tool_calls=tool_calls, final_answer=answer, model="gpt-4o")
+        agent.llm = app.tracer.trace_chat_client(cache_chat_client(llm, cache) if cache is not None else llm)
+        agent.text_formatter.print_message = lambda *a, **k: None
+
+
+class TicketRunner:
+    """Runs tickets through customer_support_workflow with unique ticket IDs"""
+
+    def __init__(self, app, approve: bool):
+        self.app = app
+        self.events = {"solution_approved": APPROVAL} if approve else {}
+        self.statuses = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def run_one(self) -> float:
+        with self._lock:
+            self._next += 1
+            index = self._next
+        ticket_id = f"BENCH{index:06d}"
+        ticket = {
+            "ticket_id": ticket_id,
+            "customer_id": f"CUST{index % CUSTOMERS + 1:03d}",
+            "description": "Dapr sidecar keeps timing out when calling the state store",
+        }
+        start = time.perf_counter()
+        result = run_workflow(self.app.customer_support_workflow, ticket,
+                              instance_id=f"support-{ticket_id}", events=self.events)
+        elapsed = time.perf_counter() - start
+        status = result.get("status")
+        with self._lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+        return elapsed
+
+
+def percentile(samples, q: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+
+def measure_concurrency(runner: TicketRunner, tickets: int, concurrency: int) -> dict:
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="workflow-worker") as pool:
+        start = time.perf_counter()
+        latencies = sorted(pool.map(lambda _: runner.run_one(), range(tickets)))
+        elapsed = time.perf_counter() - start
+    return {
+        "tickets_per_second": tickets / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def measure_allocations(runner: TicketRunner, tickets: int) -> dict:
+    """Peak bytes allocated while a ticket runs and bytes/blocks still held afterwards"""
+    tracemalloc.start()
+    try:
+        start_bytes = tracemalloc.get_traced_memory()[0]
+        start_blocks = sys.getallocatedblocks()
+        peaks = []
+        for _ in range(tickets):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            runner.run_one()
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        retained_bytes = tracemalloc.get_traced_memory()[0] - start_bytes
+        retained_blocks = sys.getallocatedblocks() - start_blocks
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_kib_per_ticket": sorted(peaks)[len(peaks) // 2] / 1024,
+        "retained_kib_per_ticket": retained_bytes / tickets / 1024,
+        "retained_blocks_per_ticket": retained_blocks / tickets,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for level, current in results["concurrency"].items():
+        previous = baseline.get("concurrency", {}).get(level)
+        if not previous:
+            continue
+        if current["tickets_per_second"] < previous["tickets_per_second"] * (1 - tolerance):
+            regressions.append(f"concurrency {level}: throughput {current['tickets_per_second']:.1f} "
+                               f"< baseline {previous['tickets_per_second']:.1f} tickets/s")
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"concurrency {level}: p95 {current['p95_ms']:.1f} ms "
+                               f"> baseline {previous['p95_ms']:.1f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=200, help="Tickets per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Mocked latency per chat call (s)")
+    parser.add_argument("--conversation-latency", type=float, default=None,
+                        help="Mocked Conversation API latency (s), defaults to --llm-latency")
+    parser.add_argument("--dapr-latency", type=float, default=0.0, help="Latency per state/pubsub call (s)")
+    parser.add_argument("--timeout", action="store_true", help="Let the approval wait time out instead of approving")
+    parser.add_argument("--llm-cache", action="store_true", help="Keep the LLM response cache enabled")
+    parser.add_argument("--alloc-tickets", type=int, default=50, help="Tickets in the tracemalloc pass (0 = skip)")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Compare against results saved with --json")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    conversation_latency = args.llm_latency if args.conversation_latency is None else args.conversation_latency
+
+    with FakeDaprSidecar(latency=args.dapr_latency, max_workers=max(32, max(args.concurrency) * 2),
+                         conversation_latency=conversation_latency) as sidecar:
+        seed(sidecar)
+        import app
+        app.dapr_pool.start()
+        configure(app, args.llm_latency, args.llm_cache)
+        runner = TicketRunner(app, approve=not args.timeout)
+
+        results = {
+            "config": {key: value for key, value in vars(args).items() if key not in ("json", "baseline")},
+            "concurrency": {},
+        }
+        with inline_workflow_api():
+            for _ in range(3):
+                runner.run_one()  # warm-up: knowledge base, pooled clients, event loops
+            print(f"{'concurrency':>11} {'tickets/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+            for concurrency in args.concurrency:
+                level = measure_concurrency(runner, args.tickets, concurrency)
+                results["concurrency"][str(concurrency)] = level
+                print(f"{concurrency:>11} {level['tickets_per_second']:>10.1f} {level['p50_ms']:>9.1f} "
+                      f"{level['p95_ms']:>9.1f} {level['p99_ms']:>9.1f}")
+            if args.alloc_tickets:
+                results["allocations"] = measure_allocations(runner, args.alloc_tickets)
+                allocations = results["allocations"]
+                print(f"allocations: peak {allocations['peak_kib_per_ticket']:.1f} KiB/ticket, retained "
+                      f"{allocations['retained_kib_per_ticket']:.1f} KiB and "
+                      f"{allocations['retained_blocks_per_ticket']:.0f} blocks/ticket")
+
+        results["statuses"] = runner.statuses
+        print(f"workflow statuses: {runner.statuses}  Dapr calls: {dict(sidecar.servicer.calls)}")
+        app.dapr_pool.close()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Ticket status and listing benchmark at 10k tickets
+Serves the app in-process against the in-memory Dapr stub, with the workflow client
+replaced by a fake that answers get_workflow_state after --state-latency. Compares:
+
+- status of --lookup tickets: one GET /support/status/{ticket_id} each vs one POST /support/status:batch
+- listing: a full scan of the execution-state store (what /data does for tickets) vs
+  GET /support/tickets pages from the ticket index, unfiltered and filtered by status
+
+Usage:
+    python benchmarks/bench_ticket_listing.py --tickets 10000 --lookup 200 --state-latency 0.002
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from dapr_stub import FakeDaprSidecar
+
+# Keys the workflow actor keeps per instance in execution-state (history, inbox, metadata)
+KEYS_PER_INSTANCE = 8
+
+
+class FakeWorkflowClient:
+    """DaprWorkflowClient stand-in answering get_workflow_state from a dict"""
+
+    def __init__(self, statuses, latency: float):
+        self.statuses = statuses
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get_workflow_state(self, instance_id, *, fetch_payloads=True):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        status = self.statuses.get(instance_id.removeprefix("support-"))
+        if status is None:
+            return None
+        output = json.dumps({"status": "completed"}) if fetch_payloads and status == "COMPLETED" else None
+        return SimpleNamespace(runtime_status=SimpleNamespace(name=status), serialized_output=output)
+
+
+def seed(sidecar, app, tickets: int, seed_value: int):
+    """Execution-state keys for every instance plus the ticket index, spread over the last day"""
+    rng = random.Random(seed_value)
+    now = time.time()
+    statuses = {}
+    payload = b"x" * 300
+    for i in range(tickets):
+        ticket_id = f"T{i:06d}"
+        statuses[ticket_id] = rng.choices(["COMPLETED", "RUNNING", "FAILED"], weights=[80, 15, 5])[0]
+        for k in range(KEYS_PER_INSTANCE):
+            key = f"customer-support||dapr.internal.default.customer-support.workflow||support-{ticket_id}||history-{k:06d}"
+            sidecar.seed("execution-state", key, payload)
+        app.ticket_index.add(ticket_id, created_at=now - rng.uniform(0, 86400))
+    app.ticket_index.flush()
+    return statuses
+
+
+def legacy_scan(app, page_size: int = 1000):
+    """Every execution-state key, paged, reduced to the support-* instance IDs"""
+    from state_listing import fetch_page
+
+    instances = set()
+    token = ""
+    reads = 0
+    while True:
+        items, token = fetch_page(app.dapr_pool, "execution-state", page_size, token)
+        reads += 1
+        for item in items:
+            instance = next((part for part in item["key"].split("||") if part.startswith("support-")), None)
+            if instance:
+                instances.add(instance)
+        if not token:
+            return instances, reads
+
+
+async def timed(label: str, coro, detail=lambda result: ""):
+    start = time.perf_counter()
+    result = await coro
+    elapsed = time.perf_counter() - start
+    print(f"{label:<52} {elapsed * 1000:9.1f} ms  {detail(result)}")
+    return result
+
+
+async def run(app, args, statuses, workflow_client):
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        ids = [f"T{i:06d}" for i in random.Random(1).sample(range(args.tickets), args.lookup)]
+
+        async def one_by_one():
+            for ticket_id in ids:
+                (await client.get(f"/support/status/{ticket_id}")).raise_for_status()
+            return len(ids)
+
+        async def batch():
+            response = await client.post("/support/status:batch", json={"ticket_ids": ids})
+            return response.json()["counts"]
+
+        print(f"Status of {args.lookup} tickets:")
+        await timed(f"  {args.lookup} x GET /support/status/{{id}}", one_by_one())
+        await timed("  POST /support/status:batch (cold)", batch(), str)
+        calls = workflow_client.calls
+        await timed("  POST /support/status:batch (terminal cached)", batch(),
+                    lambda counts: f"{workflow_client.calls - calls} workflow lookups")
+
+        print(f"\nListing {args.tickets} tickets:")
+        await timed("  full execution-state scan", asyncio.to_thread(legacy_scan, app),
+                    lambda result: f"{len(result[0])} instances, {result[1]} page reads")
+
+        async def first_page(params):
+            response = await client.get("/support/tickets", params=params)
+            return response.json()
+
+        await timed(f"  GET /support/tickets?limit={args.limit} (first page)",
+                    first_page({"limit": args.limit}), lambda page: f"{page['count']} tickets")
+        await timed(f"  ... status=RUNNING", first_page({"limit": args.limit, "status": "RUNNING"}),
+                    lambda page: f"{page['count']} tickets, {page['scanned']} scanned")
+
+        async def walk(params):
+            cursor, pages, total = None, 0, 0
+            while True:
+                page = await first_page({**params, **({"cursor": cursor} if cursor else {})})
+                pages += 1
+                total += page["count"]
+                cursor = page["next_cursor"]
+                if not cursor:
+                    return pages, total
+
+        await timed(f"  every page, limit={args.limit}", walk({"limit": args.limit}),
+                    lambda result: f"{result[1]} tickets in {result[0]} pages")
+        print(f"\nindex: {app.ticket_index.metrics()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=10000)
+    parser.add_argument("--lookup", type=int, default=200, help="Tickets looked up in the status comparison")
+    parser.add_argument("--limit", type=int, default=50, help="Page size of GET /support/tickets")
+    parser.add_argument("--state-latency", type=float, default=0.002, help="Fake get_workflow_state latency (s)")
+    parser.add_argument("--dapr-latency", type=float, default=0.0005, help="Latency per Dapr state call (s)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    with FakeDaprSidecar(latency=args.dapr_latency) as sidecar:
+        import app
+        app.dapr_pool.start()
+        statuses = seed(sidecar, app, args.tickets, args.seed)
+        workflow_client = FakeWorkflowClient(statuses, args.state_latency)
+        app.workflow_client = workflow_client
+        asyncio.run(run(app, args, statuses, workflow_client))
+        app.dapr_pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+State-store calls per ticket: substring entitlement heuristic vs structured triage output
+Runs the triage agent against the in-process Dapr stub with a mocked LLM and counts
+GetState round trips per ticket over the same scope on both sides: the triage run
+(its lookup tool calls) plus the entitlement decision. The legacy side replays the old
+free-text triage answer, the substring scan and its fallback lookup_customer; the
+structured side parses the TriageOutput answer with the app's parse_triage_output.
+
+Usage:
+    python benchmarks/bench_triage_state_calls.py --tickets 50
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from dapr_stub import FakeDaprSidecar
+from fake_llm import FakeChatClient
+
+LEGACY_TRIAGE_TEXT = (
+    "## Triage Summary\n\n### Customer Information\n- **Customer ID**: CUST001\n- **Environment**: Production\n\n"
+    "### Entitlement Status\nThe entitlement status is not explicitly provided in the current lookup."
+)
+STRUCTURED_TRIAGE = {
+    "customer_info": {
+        "customer_id": "CUST001", "name": "Acme Corporation", "support_entitlement": True,
+        "system_info": {"environment": "Production", "dapr_version": "1.12.0", "kubernetes_version": "1.28.2",
+                        "cloud_provider": "Azure", "region": "East US"},
+    },
+    "user_reported_issue": "Dapr sidecar keeps timing out",
+    "has_entitlement": True,
+    "customer_found": True,
+    "additional_info": "Enterprise customer running Dapr 1.12.0 on Azure",
+}
+LOOKUP_CALLS = [
+    {"name": "LookupCustomer", "arguments": {"customer_id": "CUST001"}},
+    {"name": "LookupSystemInfo", "arguments": {"customer_id": "CUST001"}},
+]
+
+
+def legacy_has_entitlement(app, triage_analysis: str, customer_id: str) -> bool:
+    """The removed substring heuristic plus its fallback lookup, kept here as the baseline"""
+    text = triage_analysis.lower()
+    has_entitlement = any(marker in text for marker in (
+        "support_entitlement: true", "entitlement: true", "enterprise", "professional",
+        "has support", "entitled", "active support entitlement", "production environment"))
+    if not has_entitlement:
+        customer = app.lookup_customer(customer_id)
+        has_entitlement = bool(customer.get("support_entitlement"))
+    return has_entitlement
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=50)
+    parser.add_argument("--cache", action="store_true", help="Keep the customer/system lookup cache enabled")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    with FakeDaprSidecar() as sidecar:
+        sidecar.seed("customer-state", "CUST001", json.dumps({"customer_id": "CUST001", "support_entitlement": True}).encode())
+        sidecar.seed("system-state", "CUST001", json.dumps({"customer_id": "CUST001", "environment": "Production"}).encode())
+
+        import app
+        if not args.cache:
+            app.state_cache.ttl = 0
+        app.triage_agent.text_formatter.print_message = lambda *a, **k: None
+        calls = sidecar.servicer.calls
+
+        def measure(final_answer: str, decide) -> float:
+            """GetState calls per ticket for one triage run plus the entitlement decision"""
+            app.triage_agent.llm = FakeChatClient(latency=0, tool_calls=LOOKUP_CALLS, final_answer=final_answer)
+            before = calls["GetState"]
+            for i in range(args.tickets):
+                response = app.run_ticket_agent(app.triage_agent, f"Triage ticket {i} for CUST001")
+                if not decide(response.content):
+                    raise SystemExit(f"ticket {i}: entitlement not granted")
+            return (calls["GetState"] - before) / args.tickets
+
+        # Legacy: free-text triage, substring scan, fallback lookup
+        legacy = measure(LEGACY_TRIAGE_TEXT, lambda content: legacy_has_entitlement(app, content, "CUST001"))
+        # Structured: typed has_entitlement, no scan and no extra lookup
+        structured = measure(json.dumps(STRUCTURED_TRIAGE),
+                             lambda content: app.parse_triage_output(content).to_triage_result().has_entitlement)
+
+        print(f"tickets={args.tickets} cache={'on' if args.cache else 'off'} (triage run + entitlement decision)")
+        print(f"substring heuristic + fallback lookup  {legacy:.2f} GetState calls/ticket")
+        print(f"structured TriageResult                {structured:.2f} GetState calls/ticket")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+In-process stand-in for a Dapr sidecar, used by the offline benchmarks
+Serves the Dapr gRPC API (state, pubsub and the Conversation API) from memory and
+answers the HTTP health check that DaprClient performs on construction, so the real
+Dapr SDK can be benchmarked without a sidecar, Redis, an LLM or network access.
+"""
+
+import json
+import threading
+import time
+from collections import defaultdict
+from concurrent import futures
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Union
+
+import grpc
+from dapr.conf import settings
+from dapr.proto.common.v1 import common_pb2 as common_v1
+from dapr.proto.runtime.v1 import dapr_pb2, dapr_pb2_grpc
+from durabletask.internal import orchestrator_service_pb2_grpc
+from google.protobuf import empty_pb2
+
+
+class InMemoryDaprServicer(dapr_pb2_grpc.DaprServicer):
+    """Implements the subset of the Dapr API used by the samples on top of dicts"""
+
+    def __init__(self, latency: float = 0.0, conversation_latency: float = 0.0,
+                 conversation_reply: Union[str, Callable[[str, str], str]] = "Dear Customer, your issue has been resolved.",
+                 component_latency: Optional[Dict[str, float]] = None):
+        self.latency = latency
+        self.conversation_latency = conversation_latency
+        # Per-component latency overrides, e.g. a faster openai-mini
+        self.component_latency = component_latency or {}
+        self.conversation_reply = conversation_reply
+        # Optional rate-limited provider behind the Conversation API (fake_provider.FakeProvider)
+        self.conversation_provider = None
+        self.stores = defaultdict(dict)  # store -> key -> (value bytes, etag)
+        self.published = []
+        self.calls = defaultdict(int)
+        self.state_bytes = defaultdict(int)  # "read" / "written"
+        self._lock = threading.Lock()
+        self._etag = 0
+
+    def _delay(self, method: str):
+        with self._lock:
+            self.calls[method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _next_etag(self) -> str:
+        self._etag += 1
+        return str(self._etag)
+
+    def GetState(self, request, context):
+        self._delay("GetState")
+        value, etag = self.stores[request.store_name].get(request.key, (b"", ""))
+        self.state_bytes["read"] += len(value)
+        return dapr_pb2.GetStateResponse(data=value, etag=etag)
+
+    def GetBulkState(self, request, context):
+        self._delay("GetBulkState")
+        store = self.stores[request.store_name]
+        items = []
+        for key in request.keys:
+            value, etag = store.get(key, (b"", ""))
+            items.append(dapr_pb2.BulkStateItem(key=key, data=value, etag=etag))
+            self.state_bytes["read"] += len(value)
+        return dapr_pb2.GetBulkStateResponse(items=items)
+
+    def QueryStateAlpha1(self, request, context):
+        # Only paging is supported: the token is the offset into the sorted keys
+        self._delay("QueryStateAlpha1")
+        page = json.loads(request.query).get("page", {})
+        store = self.stores[request.store_name]
+        keys = sorted(store)
+        offset = int(page.get("token") or 0)
+        limit = page.get("limit") or len(keys)
+        results = [
+            dapr_pb2.QueryStateItem(key=key, data=store[key][0], etag=store[key][1])
+            for key in keys[offset:offset + limit]
+        ]
+        return dapr_pb2.QueryStateResponse(results=results, token=str(offset + len(results)))
+
+    def SaveState(self, request, context):
+        self._delay("SaveState")
+        with self._lock:
+            store = self.stores[request.store_name]
+            for state in request.states:
+                # Optimistic concurrency: a save carrying an ETag must match the stored one, and a
+                # first-write save without one only creates keys
+                etag = state.etag.value if state.HasField("etag") else ""
+                first_write = state.options.concurrency == common_v1.StateOptions.CONCURRENCY_FIRST_WRITE
+                if (etag and store.get(state.key, (b"", ""))[1] != etag) or (not etag and first_write and state.key in store):
+                    context.abort(grpc.StatusCode.ABORTED, f"possible etag mismatch for key {state.key}")
+            for state in request.states:
+                store[state.key] = (state.value, self._next_etag())
+                self.state_bytes["written"] += len(state.value)
+        return empty_pb2.Empty()
+
+    def ExecuteStateTransaction(self, request, context):
+        self._delay("ExecuteStateTransaction")
+        with self._lock:
+            store = self.stores[request.storeName]
+            for operation in request.operations:
+                state = operation.request
+                if state.HasField("etag") and state.etag.value and store.get(state.key, (b"", ""))[1] != state.etag.value:
+                    context.abort(grpc.StatusCode.ABORTED, f"possible etag mismatch for key {state.key}")
+            for operation in request.operations:
+                state = operation.request
+                if operation.operationType == "delete":
+                    store.pop(state.key, None)
+                else:
+                    store[state.key] = (state.value, self._next_etag())
+                    self.state_bytes["written"] += len(state.value)
+        return empty_pb2.Empty()
+
+    def DeleteState(self, request, context):
+        self._delay("DeleteState")
+        with self._lock:
+            self.stores[request.store_name].pop(request.key, None)
+        return empty_pb2.Empty()
+
+    def PublishEvent(self, request, context):
+        self._delay("PublishEvent")
+        with self._lock:
+            self.published.append((request.pubsub_name, request.topic, request.data))
+        return empty_pb2.Empty()
+
+    def ConverseAlpha2(self, request, context):
+        # A fixed reply (or one computed from the component and prompt) after the simulated LLM latency
+        self._delay("ConverseAlpha2")
+        latency = self.component_latency.get(request.name, self.conversation_latency)
+        if latency:
+            time.sleep(latency)
+        prompt = " ".join(content.text for conversation_input in request.inputs
+                          for message in conversation_input.messages
+                          for content in message.of_user.content)
+        provider = self.conversation_provider
+        if provider is not None:
+            try:
+                provider.complete(len(prompt) // 4 + 300)
+            except Exception as e:
+                # How a component's 429 reaches the Dapr client
+                context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(e))
+        reply = self.conversation_reply
+        if callable(reply):
+            reply = reply(request.name, prompt)
+        return dapr_pb2.ConversationResponseAlpha2(
+            context_id=request.context_id or "",
+            outputs=[
+                dapr_pb2.ConversationResultAlpha2(choices=[
+                    dapr_pb2.ConversationResultChoices(
+                        finish_reason="stop", index=0,
+                        message=dapr_pb2.ConversationResultMessage(content=reply),
+                    )
+                ])
+                for _ in request.inputs
+            ],
+        )
+
+
+class IdleTaskHubServicer(orchestrator_service_pb2_grpc.TaskHubSidecarServiceServicer):
+    """Workflow engine that never hands out work: lets WorkflowRuntime.start() connect and idle"""
+
+    def Hello(self, request, context):
+        return empty_pb2.Empty()
+
+    def GetWorkItems(self, request, context):
+        # Hold the stream open (one server thread per connected runtime) until the worker disconnects
+        while context.is_active():
+            time.sleep(0.5)
+        return iter(())
+
+
+class _HealthHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeDaprSidecar:
+    """Starts the gRPC servicer and health endpoint on free local ports and points the Dapr SDK at them"""
+
+    def __init__(self, latency: float = 0.0, max_workers: int = 32, conversation_latency: float = 0.0):
+        self.servicer = InMemoryDaprServicer(latency=latency, conversation_latency=conversation_latency)
+        self._grpc_server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+        dapr_pb2_grpc.add_DaprServicer_to_server(self.servicer, self._grpc_server)
+        orchestrator_service_pb2_grpc.add_TaskHubSidecarServiceServicer_to_server(IdleTaskHubServicer(), self._grpc_server)
+        self.grpc_port = self._grpc_server.add_insecure_port("127.0.0.1:0")
+        self._http_server = ThreadingHTTPServer(("127.0.0.1", 0), _HealthHandler)
+        self.http_port = self._http_server.server_address[1]
+
+    def seed(self, store_name: str, key: str, value: bytes):
+        self.servicer.stores[store_name][key] = (value, self.servicer._next_etag())
+
+    def __enter__(self):
+        self._grpc_server.start()
+        threading.Thread(target=self._http_server.serve_forever, daemon=True).start()
+        settings.DAPR_RUNTIME_HOST = "127.0.0.1"
+        settings.DAPR_GRPC_PORT = self.grpc_port
+        settings.DAPR_HTTP_PORT = self.http_port
+        settings.DAPR_GRPC_ENDPOINT = None
+        settings.DAPR_HTTP_ENDPOINT = None
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._http_server.shutdown()
+        self._grpc_server.stop(grace=None)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Deterministic stand-in for the agents' chat clients, used by the offline benchmarks
+The first turn of a conversation asks for the scripted tool calls, the turn after the
+tool results comes back with a fixed final answer. Only messages after the latest user
+message count as the current conversation, so agents with shared memory replay the
+script for every task. Latency is simulated with a blocking sleep, the same way a
+synchronous OpenAI/Dapr chat call blocks its caller, and usage is estimated from the
+message text (about four characters per token). With a token_latency the answer is
+generated word by word: stream=True yields each word as it is produced, a plain call
+returns once the last one is.
+"""
+
+import itertools
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from dapr_agents.llm.chat import ChatClientBase
+from dapr_agents.types.message import (
+    AssistantMessage,
+    LLMChatCandidate,
+    LLMChatCandidateChunk,
+    LLMChatResponse,
+    LLMChatResponseChunk,
+)
+
+
+class FakeChatClient(ChatClientBase):
+    """Scripted chat client: one tool-calling turn, then a final answer"""
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        tool_calls: Optional[List[Dict[str, Any]]] = None,
+        final_answer: str = "Analysis complete.",
+        model: str = "fake-gpt",
+        token_latency: float = 0.0,
+    ):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.tool_calls = tool_calls or []
+        self.final_answer = final_answer
+        self.model = model
+        self.prompty = None
+        self.prompt_template = None
+        self.calls = 0
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_prompty(cls, prompty_source: Union[str, Path], timeout: Any = 1500) -> "FakeChatClient":
+        return cls()
+
+    def _message(self, messages) -> AssistantMessage:
+        history = list(messages) if isinstance(messages, list) else []
+        roles = [_field(m, "role") for m in history]
+        turn = len(roles) - roles[::-1].index("user") if "user" in roles else 0
+        already_called_tools = "tool" in roles[turn:]
+        if self.tool_calls and not already_called_tools:
+            with self._lock:
+                ids = [next(self._ids) for _ in self.tool_calls]
+            return AssistantMessage(
+                content=None,
+                tool_calls=[
+                    {
+                        "id": f"call_{call_id}",
+                        "type": "function",
+                        "function": {"name": call["name"], "arguments": json.dumps(call.get("arguments", {}))},
+                    }
+                    for call_id, call in zip(ids, self.tool_calls)
+                ],
+            )
+        return AssistantMessage(content=self.final_answer)
+
+    def generate(self, messages=None, *, input_data=None, model=None, tools=None,
+                 response_format=None, structured_mode=None, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        message = self._message(messages)
+        if stream:
+            return self._stream(message, model)
+        if self.token_latency and message.content:
+            time.sleep(self.token_latency * len(_words(message.content)))
+        prompt_tokens = sum(len(str(_field(m, "content") or "")) for m in messages or []) // 4 + 1
+        completion_tokens = len(message.content or "") // 4 + 1
+        return LLMChatResponse(
+            results=[LLMChatCandidate(message=message, finish_reason="stop")],
+            metadata={
+                "model": model or self.model,
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            },
+        )
+
+    def _stream(self, message: AssistantMessage, model: Optional[str]) -> Iterator[LLMChatResponseChunk]:
+        metadata = {"model": model or self.model}
+        for word in _words(message.content or ""):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            yield LLMChatResponseChunk(result=LLMChatCandidateChunk(content=word, role="assistant"), metadata=metadata)
+        for index, call in enumerate(getattr(message, "tool_calls", None) or []):
+            yield LLMChatResponseChunk(
+                result=LLMChatCandidateChunk(tool_calls=[{
+                    "index": index,
+                    "id": call.id,
+                    "type": call.type,
+                    "function": {"name": call.function.name, "arguments": call.function.arguments},
+                }]),
+                metadata=metadata,
+            )
+        yield LLMChatResponseChunk(
+            result=LLMChatCandidateChunk(finish_reason="tool_calls" if getattr(message, "tool_calls", None) else "stop"),
+            metadata=metadata,
+        )
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"\S+\s*", text)
+
+
+def _field(message, name: str):
+    return message.get(name) if isinstance(message, dict) else getattr(message, name, None)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for a rate-limited LLM provider, used by the offline benchmarks
+Enforces a requests-per-minute and a tokens-per-minute quota (token buckets holding one
+second's worth, as providers quantize per-minute quotas) and a cap on requests in
+flight. A request over any of them is rejected at once with a 429 (RateLimitError,
+with a Retry-After). Accepted requests take `latency` plus `overload_latency` for every
+other request in flight, so latency rises with load before the cap is reached.
+
+ProviderChatClient puts the provider behind the agents' chat clients, raising its 429s
+wrapped in ValueError as OpenAIChatClient does. For Conversation API calls, set
+`sidecar.servicer.conversation_provider` to the provider: the in-memory Dapr stub then
+answers over-quota calls with RESOURCE_EXHAUSTED.
+"""
+
+import threading
+import time
+from typing import Dict
+
+from fake_llm import FakeChatClient
+
+
+class RateLimitError(Exception):
+    """HTTP 429 from the provider"""
+
+    status_code = 429
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Bucket:
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def take(self, amount: float, now: float) -> float:
+        """0 when `amount` was taken, otherwise the seconds until it could be"""
+        if not self.rate:
+            return 0.0
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        amount = min(amount, self.capacity)
+        if self.level < amount:
+            return (amount - self.level) / self.rate
+        self.level -= amount
+        return 0.0
+
+
+class FakeProvider:
+    """Rate-limited provider: quotas, a concurrency cap and load-dependent latency"""
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0, max_in_flight: int = 0,
+                 latency: float = 0.1, overload_latency: float = 0.0):
+        self.requests = _Bucket(requests_per_minute)
+        self.tokens = _Bucket(tokens_per_minute)
+        self.max_in_flight = max_in_flight
+        self.latency = latency
+        self.overload_latency = overload_latency
+        self.in_flight = 0
+        self.stats: Dict[str, int] = {"requests": 0, "accepted": 0, "rejected": 0, "peak_in_flight": 0}
+        self._lock = threading.Lock()
+
+    def complete(self, tokens: int):
+        """Serve one request of about `tokens` tokens, or raise RateLimitError"""
+        with self._lock:
+            self.stats["requests"] += 1
+            now = time.monotonic()
+            if self.max_in_flight and self.in_flight >= self.max_in_flight:
+                wait = self.latency
+            else:
+                wait = self.requests.take(1, now) or self.tokens.take(tokens, now)
+            if wait:
+                self.stats["rejected"] += 1
+                raise RateLimitError("Rate limit reached", retry_after=round(wait, 3))
+            self.stats["accepted"] += 1
+            self.in_flight += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.in_flight)
+            latency = self.latency + self.overload_latency * (self.in_flight - 1)
+        try:
+            time.sleep(latency)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class ProviderChatClient(FakeChatClient):
+    """FakeChatClient whose calls are served by a FakeProvider"""
+
+    def __init__(self, provider: FakeProvider, **kwargs):
+        super().__init__(latency=0.0, **kwargs)
+        self.provider = provider
+
+    def generate(self, messages=None, **kwargs):
+        tokens = sum(len(str(m.get("content") if isinstance(m, dict) else getattr(m, "content", "")) or "")
+                     for m in messages or []) // 4 + 300
+        try:
+            self.provider.complete(tokens)
+        except RateLimitError as e:
+            # What OpenAIChatClient raises for any API error
+            raise ValueError(f"OpenAI API error (RateLimitError): {e}") from e
+        return super().generate(messages, **kwargs)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Load test for ticket intake: POST /support/ticket per ticket vs POST /support/tickets:batch
+Reports tickets per second for both paths. By default the app is served in-process
+with the workflow client replaced by a fake that sleeps for --schedule-latency per
+call, so no sidecar is needed; pass --url to load a running instance instead
+(ticket IDs are randomized so repeated runs don't collide).
+
+Usage:
+    python benchmarks/load_test_ticket_batch.py --tickets 2000 --batch-size 500
+    python benchmarks/load_test_ticket_batch.py --url http://localhost:8000 --tickets 1000
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+
+import grpc
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+
+class InstanceExistsError(grpc.RpcError):
+    """What the sidecar raises for an instance ID that is already running"""
+
+    def code(self):
+        return grpc.StatusCode.ALREADY_EXISTS
+
+
+class FakeWorkflowClient:
+    """DaprWorkflowClient stand-in with a fixed scheduling round trip"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.instances = set()
+        self._lock = threading.Lock()
+
+    def schedule_new_workflow(self, workflow, *, input=None, instance_id=None, **kwargs):
+        time.sleep(self.latency)
+        with self._lock:
+            if instance_id in self.instances:
+                raise InstanceExistsError(f"an active workflow with ID '{instance_id}' already exists")
+            self.instances.add(instance_id)
+        return instance_id
+
+
+def serve_in_process(schedule_latency: float) -> str:
+    import uvicorn
+    import app as support_app
+
+    support_app.workflow_client = FakeWorkflowClient(schedule_latency)
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(support_app.app, host="127.0.0.1", port=port,
+                                           lifespan="off", log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+def make_tickets(count: int, prefix: str):
+    return [
+        {"ticket_id": f"{prefix}-{i}", "customer_id": f"CUST00{i % 3 + 1}", "description": "Dapr sidecar timeout"}
+        for i in range(count)
+    ]
+
+
+def run_single(session, url, tickets):
+    start = time.perf_counter()
+    for ticket in tickets:
+        session.post(f"{url}/support/ticket", json=ticket).raise_for_status()
+    return time.perf_counter() - start
+
+
+def run_batch(session, url, tickets, batch_size, ndjson):
+    start = time.perf_counter()
+    scheduled = 0
+    for offset in range(0, len(tickets), batch_size):
+        chunk = tickets[offset:offset + batch_size]
+        if ndjson:
+            body = "\n".join(json.dumps(ticket) for ticket in chunk)
+            response = session.post(f"{url}/support/tickets:batch", data=body.encode(),
+                                    headers={"Content-Type": "application/x-ndjson"})
+        else:
+            response = session.post(f"{url}/support/tickets:batch", json=chunk)
+        response.raise_for_status()
+        scheduled += response.json()["scheduled"]
+    return time.perf_counter() - start, scheduled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running customer support app")
+    parser.add_argument("--tickets", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--schedule-latency", type=float, default=0.005,
+                        help="Fake workflow scheduling round trip in seconds (in-process mode)")
+    parser.add_argument("--skip-single", action="store_true", help="Only measure the batch endpoint")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    url = args.url or serve_in_process(args.schedule_latency)
+    session = requests.Session()
+    run_id = uuid.uuid4().hex[:8]
+    print(f"target={url} tickets={args.tickets} batch size={args.batch_size}\n")
+
+    if not args.skip_single:
+        elapsed = run_single(session, url, make_tickets(args.tickets, f"LT{run_id}-single"))
+        print(f"{'POST /support/ticket (sequential)':<40} {args.tickets / elapsed:9.1f} tickets/s")
+
+    for ndjson in (False, True):
+        label = f"POST /support/tickets:batch ({'NDJSON' if ndjson else 'array'})"
+        tickets = make_tickets(args.tickets, f"LT{run_id}-{'ndjson' if ndjson else 'array'}")
+        elapsed, scheduled = run_batch(session, url, tickets, args.batch_size, ndjson)
+        print(f"{label:<40} {args.tickets / elapsed:9.1f} tickets/s  ({scheduled} scheduled)")
+
+    # Resubmitting the same tickets must schedule nothing new
+    elapsed, scheduled = run_batch(session, url, tickets, args.batch_size, True)
+    print(f"{'resubmitted batch (all duplicates)':<40} {args.tickets / elapsed:9.1f} tickets/s  ({scheduled} scheduled)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Inline driver for Dapr workflow generator functions, used by the offline benchmarks
+Runs a workflow function in-process without a workflow sidecar: activities execute
+synchronously when they are scheduled, `when_all` / `when_any` resolve immediately,
+external events come from a dict and timers fire instantly when no event was raised.
+A workflow that continues as new is restarted with its new input, as the engine does.
+"""
+
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+import dapr.ext.workflow as wf
+
+
+class InlineTask:
+    """Completed task handle returned to the workflow"""
+
+    def __init__(self, result: Any = None, completed: bool = True):
+        self._result = result
+        self.completed = completed
+
+    def get_result(self) -> Any:
+        return self._result
+
+
+class InlineWorkflowContext:
+    """Minimal stand-in for DaprWorkflowContext"""
+
+    def __init__(self, instance_id: str, events: Optional[Dict[str, Any]] = None):
+        self.instance_id = instance_id
+        self.events = events or {}
+        self.is_replaying = False
+        self.current_utc_datetime = datetime.now(timezone.utc)
+        self.activity_calls = []
+        self.new_input = None
+
+    def call_activity(self, activity: Callable, *, input: Any = None, retry_policy=None) -> InlineTask:
+        self.activity_calls.append(getattr(activity, "__name__", str(activity)))
+        result = activity(self, input) if input is not None else activity(self)
+        return InlineTask(result)
+
+    def wait_for_external_event(self, name: str) -> InlineTask:
+        return InlineTask(self.events.get(name), completed=name in self.events)
+
+    def create_timer(self, fire_at) -> InlineTask:
+        return InlineTask(None)
+
+    def continue_as_new(self, new_input: Any, save_events: bool = False):
+        self.new_input = new_input
+
+
+def _when_all(tasks):
+    return InlineTask([task.get_result() for task in tasks])
+
+
+def _when_any(tasks):
+    # Raised external events win over timers, mirroring a reviewer who answers in time
+    winner = next((task for task in tasks if task.completed and task.get_result() is not None), tasks[-1])
+    return InlineTask(winner)
+
+
+_patch_lock = threading.Lock()
+_patch_depth = 0
+_original_api = None
+
+
+@contextmanager
+def inline_workflow_api():
+    """Temporarily route wf.when_all / wf.when_any to the inline implementations
+
+    Nests and may be entered from several threads; the originals come back when the last one exits.
+    """
+    global _patch_depth, _original_api
+    with _patch_lock:
+        if _patch_depth == 0:
+            _original_api = wf.when_all, wf.when_any
+            wf.when_all, wf.when_any = _when_all, _when_any
+        _patch_depth += 1
+    try:
+        yield
+    finally:
+        with _patch_lock:
+            _patch_depth -= 1
+            if _patch_depth == 0:
+                wf.when_all, wf.when_any = _original_api
+
+
+def run_workflow(workflow: Callable, workflow_input: Any, instance_id: str = "inline",
+                 events: Optional[Dict[str, Any]] = None) -> Any:
+    """Drive a workflow generator to completion and return its output"""
+    with inline_workflow_api():
+        while True:
+            ctx = InlineWorkflowContext(instance_id, events)
+            generator = workflow(ctx, workflow_input)
+            if not hasattr(generator, "send"):
+                return generator
+            result = None
+            try:
+                while True:
+                    task = generator.send(result)
+                    result = task.get_result()
+            except StopIteration as stop:
+                output = stop.value
+            if ctx.new_input is None:
+                return output
+            workflow_input = ctx.new_input
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Claim-check storage for large workflow payloads
+Activities return their results to the workflow engine, which appends them to the
+workflow's history and deserializes them again on every replay. Large values (LLM
+analyses, customer messages) are written to a state store instead, and the activity
+returns a compact reference in their place:
+
+    {"$claim": {"store": "internal-state", "key": "payload-TICK001-expert_analysis-3f2a...",
+                "codec": "zstd", "bytes": 5321}}
+
+Payload keys include a digest of the value, so a retried activity rewrites the same
+key and a payload reference always points at the value it was made from. Payloads are
+saved with a TTL (`ttlInSeconds`), so the store drops them once no workflow can still
+need them. Values can be compressed with zlib or, when the `zstandard` package is
+installed, zstd. A reference can also point into a JSON record that is already stored
+(`field`), so nothing is written twice. Such a reference follows the record: it resolves
+to the record's current field, so a record overwritten later resolves to its new value.
+
+References are resolved only when a value is needed: by the activity that reads it, or
+by the status endpoints when they return a workflow's output. Resolution fetches every
+reference of a document with one bulk read per store, and recently written or read
+values are kept in a small LRU, so the next activity of the same ticket doesn't read
+back what the previous one just wrote.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+CLAIM_KEY = "$claim"
+
+
+def _codec(name: str) -> Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    """(compress, decompress) for a codec name"""
+    if name == "json":
+        return (lambda data: data), (lambda data: data)
+    if name == "zlib":
+        return (lambda data: zlib.compress(data, 6)), zlib.decompress
+    if name == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd payload compression needs the zstandard package: pip install zstandard")
+        return (lambda data: zstandard.compress(data, 3)), zstandard.decompress
+    raise ValueError(f"Unknown payload codec: {name}")
+
+
+def is_claim(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and CLAIM_KEY in value
+
+
+class ClaimCheck:
+    """Stores large JSON values in a Dapr state store and resolves the references left in their place"""
+
+    def __init__(self, pool, store_name: str = "internal-state", threshold: int = 1024,
+                 compression: str = "none", cache_entries: int = 256, ttl_seconds: int = 0):
+        self.pool = pool
+        self.store_name = store_name
+        self.threshold = threshold
+        # Lifetime of stored payloads in the state store; 0 keeps them until deleted
+        self.ttl_seconds = ttl_seconds
+        self.codec = "json" if compression == "none" else compression
+        self._compress, _ = _codec(self.codec)
+        self.cache_entries = cache_entries
+        self._cache: "OrderedDict[Tuple[str, str, Optional[str]], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "stored": 0,
+            "stored_bytes": 0,
+            "stored_bytes_compressed": 0,
+            "referenced": 0,
+            "inline": 0,
+            "store_errors": 0,
+            "resolved": 0,
+            "cache_hits": 0,
+            "fetched": 0,
+            "missing": 0,
+        }
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _remember(self, cache_key: Tuple[str, str, Optional[str]], value: Any):
+        with self._lock:
+            self._cache[cache_key] = value
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+    def put(self, ticket_id: str, name: str, value: Any) -> Any:
+        """`value` itself when it is small, otherwise a reference to a stored copy
+
+        If the state store can't be written the value is returned as is: a larger
+        history is better than a failed ticket.
+        """
+        raw = json.dumps(value, separators=(",", ":")).encode()
+        if len(raw) < self.threshold:
+            self._count("inline")
+            return value
+        key = f"payload-{ticket_id}-{name}-{hashlib.sha256(raw).hexdigest()[:16]}"
+        cache_key = (self.store_name, key, None)
+        with self._lock:
+            written = cache_key in self._cache
+        if not written:
+            data = self._compress(raw)
+            try:
+                with self.pool.client() as client:
+                    client.save_state(
+                        self.store_name, key, data,
+                        state_metadata={"ttlInSeconds": str(self.ttl_seconds)} if self.ttl_seconds else {}
+                    )
+            except Exception as e:
+                logging.warning(f"Keeping {name} of ticket {ticket_id} inline, payload store failed: {e}")
+                self._count("store_errors")
+                return value
+            with self._lock:
+                self._stats["stored"] += 1
+                self._stats["stored_bytes"] += len(raw)
+                self._stats["stored_bytes_compressed"] += len(data)
+            self._remember(cache_key, value)
+        return {CLAIM_KEY: {"store": self.store_name, "key": key, "codec": self.codec, "bytes": len(raw)}}
+
+    def reference(self, store_name: str, key: str, field: str, value: Any) -> Any:
+        """Reference to `field` of the JSON record already stored at `key`, or `value` itself when it is small"""
+        size = len(json.dumps(value, separators=(",", ":")))
+        if size < self.threshold:
+            self._count("inline")
+            return value
+        self._remember((store_name, key, field), value)
+        self._count("referenced")
+        return {CLAIM_KEY: {"store": store_name, "key": key, "field": field, "codec": "json", "bytes": size}}
+
+    def resolve(self, document: Any) -> Any:
+        """Copy of `document` with every reference replaced by its value
+
+        References whose value is missing or unreadable are left in place.
+        """
+        claims: List[Dict[str, Any]] = []
+        _collect(document, claims)
+        if not claims:
+            return document
+
+        values: Dict[Tuple[str, str, Optional[str]], Any] = {}
+        wanted: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        with self._lock:
+            for claim in claims:
+                cache_key = (claim["store"], claim["key"], claim.get("field"))
+                if cache_key in self._cache:
+                    self._cache.move_to_end(cache_key)
+                    values[cache_key] = self._cache[cache_key]
+                    self._stats["cache_hits"] += 1
+                else:
+                    wanted.setdefault(claim["store"], {}).setdefault(claim["key"], []).append(claim)
+
+        for store_name, by_key in wanted.items():
+            try:
+                with self.pool.client() as client:
+                    items = client.get_bulk_state(store_name, list(by_key)).items
+            except Exception as e:
+                logging.error(f"Failed to resolve payloads from {store_name}: {e}")
+                continue
+            self._count("fetched", len(by_key))
+            for item in items:
+                for claim in by_key.get(item.key, ()):
+                    cache_key = (store_name, item.key, claim.get("field"))
+                    try:
+                        if item.error or not item.data:
+                            raise KeyError(item.error or "not found")
+                        value = json.loads(_codec(claim.get("codec", "json"))[1](item.data))
+                        if claim.get("field"):
+                            value = value[claim["field"]]
+                    except Exception as e:
+                        logging.warning(f"Payload {store_name}/{item.key} could not be resolved: {e}")
+                        self._count("missing")
+                        continue
+                    values[cache_key] = value
+                    self._remember(cache_key, value)
+
+        self._count("resolved", len(claims))
+        return _replace(document, values)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            stored = self._stats["stored_bytes"]
+            return {
+                **self._stats,
+                "codec": self.codec,
+                "threshold_bytes": self.threshold,
+                "compression_ratio": stored / self._stats["stored_bytes_compressed"] if stored else 1.0,
+                "cached": len(self._cache),
+            }
+
+
+def _collect(value: Any, claims: List[Dict[str, Any]]):
+    if is_claim(value):
+        claims.append(value[CLAIM_KEY])
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect(item, claims)
+    elif isinstance(value, list):
+        for item in value:
+            _collect(item, claims)
+
+
+def _replace(value: Any, values: Dict[Tuple[str, str, Optional[str]], Any]) -> Any:
+    if is_claim(value):
+        claim = value[CLAIM_KEY]
+        cache_key = (claim["store"], claim["key"], claim.get("field"))
+        return copy.deepcopy(values[cache_key]) if cache_key in values else value
+    if isinstance(value, dict):
+        return {key: _replace(item, values) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_replace(item, values) for item in value]
+    return value
+
+
+def claim_check_from_env(pool, default_store: str = "internal-state",
+                         default_ttl_seconds: int = 7 * 86400) -> Optional[ClaimCheck]:
+    """Build the claim check from PAYLOAD_* environment variables; None when PAYLOAD_CLAIM_CHECK=false"""
+    if os.getenv("PAYLOAD_CLAIM_CHECK", "true").lower() != "true":
+        return None
+    return ClaimCheck(
+        pool,
+        store_name=os.getenv("PAYLOAD_STORE", default_store),
+        threshold=int(os.getenv("PAYLOAD_CLAIM_THRESHOLD_BYTES", "1024")),
+        compression=os.getenv("PAYLOAD_COMPRESSION", "none").lower(),
+        cache_entries=int(os.getenv("PAYLOAD_CACHE_MAX_ENTRIES", "256")),
+        ttl_seconds=int(os.getenv("PAYLOAD_TTL_SECONDS", str(default_ttl_seconds))),
+    )
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Shared Dapr client pool for the Customer Support System
+Keeps a fixed number of long-lived DaprClient instances (one gRPC channel each)
+so tools, activities and API endpoints don't pay the channel setup and sidecar
+health check on every state store or pubsub call.
+"""
+
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+import grpc
+from dapr.clients import DaprClient
+
+# gRPC status codes that mean the channel itself is unusable and should be rebuilt
+RECONNECT_STATUS_CODES = {grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.INTERNAL}
+# gRPC status codes Dapr rejects a save with when its ETag no longer matches
+ETAG_CONFLICT_STATUS_CODES = {grpc.StatusCode.ABORTED, grpc.StatusCode.FAILED_PRECONDITION}
+
+
+def is_etag_conflict(error: BaseException) -> bool:
+    """True when a state save failed because another writer changed the key first"""
+    code = getattr(error, "code", None)
+    return callable(code) and code() in ETAG_CONFLICT_STATUS_CODES
+
+
+def is_already_exists(error: BaseException) -> bool:
+    """True when the sidecar rejected a new workflow because its instance ID is already in use"""
+    code = getattr(error, "code", None)
+    return callable(code) and code() == grpc.StatusCode.ALREADY_EXISTS
+
+
+class DaprClientPool:
+    """Thread-safe pool of DaprClient instances with lazy creation and reconnect on failure"""
+
+    def __init__(self, size: int = 4, acquire_timeout: float = 10.0, address: Optional[str] = None, tracer=None):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.address = address
+        # Optional tracing.Tracer: checked-out clients record state/pubsub calls as spans
+        self.tracer = tracer
+        self._idle: "queue.LifoQueue[DaprClient]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+        # Metrics
+        self._acquire_count = 0
+        self._acquire_wait_total = 0.0
+        self._acquire_wait_max = 0.0
+        self._acquire_timeouts = 0
+        self._reconnects = 0
+        self._in_use = 0
+
+    def _new_client(self) -> DaprClient:
+        return DaprClient(address=self.address) if self.address else DaprClient()
+
+    def start(self, warm: int = 1):
+        """Open the pool and pre-create `warm` clients so the first requests don't pay the handshake"""
+        with self._lock:
+            self._closed = False
+        for _ in range(min(warm, self.size)):
+            with self._lock:
+                if self._created >= self.size:
+                    break
+                self._created += 1
+            try:
+                self._idle.put(self._new_client())
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        logging.info(f"Dapr client pool started (size={self.size}, warm={warm})")
+
+    def close(self):
+        """Close every idle client; clients still checked out are closed when released"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                client = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(client)
+        logging.info("Dapr client pool closed")
+
+    def _acquire(self) -> DaprClient:
+        start = time.perf_counter()
+        deadline = start + self.acquire_timeout
+        while True:
+            try:
+                client = self._idle.get_nowait()
+                break
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    client = self._new_client()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+                break
+
+            # Pool is exhausted; wait for a release (short slices so a discarded client frees a slot)
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                with self._lock:
+                    self._acquire_timeouts += 1
+                raise TimeoutError(f"Timed out after {self.acquire_timeout}s waiting for a Dapr client")
+            try:
+                client = self._idle.get(timeout=min(remaining, 0.05))
+                break
+            except queue.Empty:
+                continue
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._acquire_count += 1
+            self._acquire_wait_total += waited
+            self._acquire_wait_max = max(self._acquire_wait_max, waited)
+            self._in_use += 1
+        return client
+
+    def _release(self, client: DaprClient, broken: bool = False):
+        with self._lock:
+            self._in_use -= 1
+            closed = self._closed
+        if broken or closed:
+            self._discard(client)
+        else:
+            self._idle.put(client)
+
+    def _discard(self, client: DaprClient):
+        with self._lock:
+            self._created -= 1
+        try:
+            client.close()
+        except Exception as e:
+            logging.debug(f"Error closing Dapr client: {e}")
+
+    @contextmanager
+    def client(self):
+        """Check out a client for the duration of the `with` block"""
+        client = self._acquire()
+        broken = False
+        try:
+            yield self.tracer.trace_dapr_client(client) if self.tracer else client
+        except grpc.RpcError as e:
+            # DaprGrpcError subclasses RpcError; drop channels that can no longer reach the sidecar
+            code = e.code() if hasattr(e, "code") else None
+            if code in RECONNECT_STATUS_CODES:
+                broken = True
+                with self._lock:
+                    self._reconnects += 1
+                logging.warning(f"Dapr client failed with {code.name}, reconnecting on next acquire")
+            raise
+        finally:
+            self._release(client, broken=broken)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of pool usage and acquire-wait statistics"""
+        with self._lock:
+            count = self._acquire_count
+            return {
+                "size": self.size,
+                "created": self._created,
+                "idle": self._idle.qsize(),
+                "in_use": self._in_use,
+                "acquire_count": count,
+                "acquire_wait_avg_ms": (self._acquire_wait_total / count * 1000) if count else 0.0,
+                "acquire_wait_max_ms": self._acquire_wait_max * 1000,
+                "acquire_timeouts": self._acquire_timeouts,
+                "reconnects": self._reconnects,
+            }
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Local retrieval engine behind the query_knowledge_base tool
+The corpus is a directory of Markdown articles (one issue per file) and JSONL
+files (one issue per line). It is loaded once into a BM25 inverted index stored
+as flat NumPy arrays: per-term slices of document IDs and precomputed BM25
+weights, so a query is a handful of scatter-adds and an argpartition.
+
+An optional dense index adds feature-hashed embeddings of every document,
+persisted as a memory-mapped NumPy matrix next to the corpus. Hybrid queries
+merge the BM25 and cosine rankings with reciprocal rank fusion.
+
+Build the embedding matrix ahead of time with:
+    python knowledge_base.py build-embeddings ./knowledge
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how i if in into is it its my no not of on or our so "
+    "that the their then there these this to was we what when where which while why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class Document:
+    __slots__ = ("issue", "solution", "technical_details", "source")
+
+    def __init__(self, issue: str, solution: str = "", technical_details: str = "", source: str = ""):
+        self.issue = issue
+        self.solution = solution
+        self.technical_details = technical_details
+        self.source = source
+
+
+# === Corpus Loading ===
+def _markdown_sections(text: str) -> Tuple[str, Dict[str, str]]:
+    title, sections, current = "", {}, "description"
+    for line in text.splitlines():
+        if line.startswith("# ") and not title:
+            title = line[2:].strip()
+        elif line.startswith("## "):
+            current = line[3:].strip().lower()
+        else:
+            sections[current] = sections.get(current, "") + line + "\n"
+    return title, {name: body.strip() for name, body in sections.items()}
+
+
+def read_corpus(corpus_dir: str) -> Iterator[Tuple[Document, str]]:
+    """Yield (document, indexed text) pairs from every *.md and *.jsonl file in corpus_dir, in a stable order"""
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "**", "*.md"), recursive=True)):
+        with open(path, encoding="utf-8") as f:
+            title, sections = _markdown_sections(f.read())
+        name = os.path.relpath(path, corpus_dir)
+        document = Document(
+            issue=title or os.path.splitext(os.path.basename(path))[0].replace("-", " "),
+            solution=sections.get("solution", ""),
+            technical_details=sections.get("technical details", ""),
+            source=name,
+        )
+        yield document, " ".join([document.issue, *sections.values()])
+
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "**", "*.jsonl"), recursive=True)):
+        name = os.path.relpath(path, corpus_dir)
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                document = Document(
+                    issue=record.get("issue") or record.get("title", ""),
+                    solution=record.get("solution", ""),
+                    technical_details=record.get("technical_details", ""),
+                    source=f"{name}:{record.get('id', line_number)}",
+                )
+                tags = " ".join(record.get("tags", []))
+                yield document, " ".join([document.issue, document.solution, document.technical_details,
+                                          record.get("description", ""), tags])
+
+
+# === Embeddings ===
+class HashingEmbedder:
+    """Dependency-free text embeddings: signed feature hashing of unigrams and bigrams, L2-normalized"""
+
+    def __init__(self, dim: int = 128):
+        self.dim = dim
+
+    def embed_tokens(self, tokens: List[str]) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            h = zlib.crc32(feature.encode())
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.embed_tokens(tokenize(text))
+
+
+def embeddings_path(corpus_dir: str, dim: int) -> str:
+    return os.path.join(corpus_dir, ".index", f"embeddings-{dim}.npy")
+
+
+def build_embeddings(corpus_dir: str, dim: int = 128, texts: Optional[Iterable[str]] = None,
+                     count: Optional[int] = None) -> str:
+    """Write the embedding matrix for corpus_dir as a .npy file, one row per document in corpus order"""
+    embedder = HashingEmbedder(dim)
+    if texts is None:
+        pairs = list(read_corpus(corpus_dir))
+        texts, count = (text for _, text in pairs), len(pairs)
+    path = embeddings_path(corpus_dir, dim)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    matrix = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(count, dim))
+    for row, text in enumerate(texts):
+        matrix[row] = embedder.embed(text)
+    matrix.flush()
+    del matrix
+    return path
+
+
+# === Index ===
+class KnowledgeBase:
+    """BM25 inverted index over a corpus directory, with an optional memory-mapped embedding index"""
+
+    def __init__(self, corpus_dir: str, use_embeddings: bool = False, embedding_dim: int = 128,
+                 k1: float = 1.2, b: float = 0.75):
+        self.corpus_dir = corpus_dir
+        self.use_embeddings = use_embeddings
+        self.embedder = HashingEmbedder(embedding_dim)
+        self.k1 = k1
+        self.b = b
+        self.documents: List[Document] = []
+        self.vocabulary: Dict[str, int] = {}
+        self.idf = np.zeros(0, dtype=np.float32)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.posting_docs = np.zeros(0, dtype=np.int32)
+        self.posting_weights = np.zeros(0, dtype=np.float32)
+        self.embeddings: Optional[np.ndarray] = None
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Read the corpus and build the index; safe to call more than once"""
+        with self._lock:
+            if self.loaded:
+                return
+            start = time.perf_counter()
+            self.build(read_corpus(self.corpus_dir) if os.path.isdir(self.corpus_dir) else [])
+            if self.use_embeddings and self.documents:
+                self.embeddings = self._open_embeddings()
+            self.loaded = True
+            logging.info(
+                f"Knowledge base loaded: {len(self.documents)} document(s), {len(self.vocabulary)} term(s), "
+                f"embeddings={'on' if self.embeddings is not None else 'off'} in {time.perf_counter() - start:.2f}s"
+            )
+
+    def build(self, pairs: Iterable[Tuple[Document, str]]):
+        """Index (document, text) pairs; postings are accumulated in compact arrays, then sorted by term"""
+        vocabulary: Dict[str, int] = {}
+        term_ids, doc_ids, term_freqs = array("i"), array("i"), array("f")
+        doc_lengths = array("f")
+        documents = []
+        for doc_id, (document, text) in enumerate(pairs):
+            documents.append(document)
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            counts: Dict[int, int] = {}
+            for token in tokens:
+                term_id = vocabulary.setdefault(token, len(vocabulary))
+                counts[term_id] = counts.get(term_id, 0) + 1
+            term_ids.extend(counts.keys())
+            doc_ids.extend([doc_id] * len(counts))
+            term_freqs.extend(counts.values())
+
+        terms = np.frombuffer(term_ids, dtype=np.int32)
+        docs = np.frombuffer(doc_ids, dtype=np.int32)
+        tf = np.frombuffer(term_freqs, dtype=np.float32)
+        lengths = np.frombuffer(doc_lengths, dtype=np.float32)
+        order = np.argsort(terms, kind="stable")
+        terms, docs, tf = terms[order], docs[order], tf[order]
+
+        document_count = len(documents)
+        df = np.bincount(terms, minlength=len(vocabulary))
+        average_length = float(lengths.mean()) if document_count else 0.0
+        idf = np.log1p((document_count - df + 0.5) / (df + 0.5)).astype(np.float32)
+        norm = self.k1 * (1 - self.b + self.b * lengths[docs] / (average_length or 1.0))
+
+        self.documents = documents
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.offsets = np.concatenate(([0], np.cumsum(df)))
+        self.posting_docs = docs
+        self.posting_weights = (idf[terms] * tf * (self.k1 + 1) / (tf + norm)).astype(np.float32)
+
+    def _open_embeddings(self) -> Optional[np.ndarray]:
+        path = embeddings_path(self.corpus_dir, self.embedder.dim)
+        if os.path.exists(path):
+            matrix = np.load(path, mmap_mode="r")
+            if matrix.shape == (len(self.documents), self.embedder.dim):
+                return matrix
+            logging.warning(f"Embedding matrix {path} doesn't match the corpus, rebuilding")
+        try:
+            build_embeddings(self.corpus_dir, self.embedder.dim)
+            return np.load(path, mmap_mode="r")
+        except OSError as e:
+            logging.warning(f"Knowledge base embeddings disabled, could not write {path}: {e}")
+            return None
+
+    def bm25(self, query: str) -> Tuple[np.ndarray, float]:
+        """Scores for every document and the best score any document could reach for this query"""
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        upper_bound = 0.0
+        for token in set(tokenize(query)):
+            term_id = self.vocabulary.get(token)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            # Each document appears once per term, so the fancy-indexed add is safe
+            scores[self.posting_docs[start:end]] += self.posting_weights[start:end]
+            upper_bound += float(self.idf[term_id]) * (self.k1 + 1)
+        return scores, upper_bound
+
+    @staticmethod
+    def _top(scores: np.ndarray, k: int) -> np.ndarray:
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+    def search(self, query: str, k: int = 5, hybrid: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """Return the top-k documents for a query with their BM25 (and, for hybrid, cosine) scores"""
+        if not self.loaded:
+            self.load()
+        if not self.documents:
+            return []
+        scores, upper_bound = self.bm25(query)
+        hybrid = self.embeddings is not None if hybrid is None else hybrid and self.embeddings is not None
+
+        if not hybrid:
+            ranked = self._top(scores, k)
+            return [self._result(doc_id, scores[doc_id], upper_bound) for doc_id in ranked]
+
+        # Reciprocal rank fusion of the two rankings (k=60 as in the original RRF paper)
+        depth = max(k * 10, 50)
+        similarities = np.asarray(self.embeddings @ self.embedder.embed(query))
+        fused: Dict[int, float] = {}
+        for ranking in (self._top(scores, depth), self._top(similarities, depth)):
+            for rank, doc_id in enumerate(ranking):
+                fused[int(doc_id)] = fused.get(int(doc_id), 0.0) + 1.0 / (60 + rank + 1)
+        ranked = sorted(fused, key=fused.get, reverse=True)[:k]
+        return [
+            {**self._result(doc_id, scores[doc_id], upper_bound), "similarity": round(float(similarities[doc_id]), 4)}
+            for doc_id in ranked
+        ]
+
+    def _result(self, doc_id: int, score: float, upper_bound: float) -> Dict[str, Any]:
+        document = self.documents[doc_id]
+        return {
+            "issue": document.issue,
+            "solution": document.solution,
+            "technical_details": document.technical_details,
+            "source": document.source,
+            "score": round(float(score), 4),
+            "confidence": round(float(score) / upper_bound, 2) if upper_bound else 0.0,
+        }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Knowledge base index tools")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build = subcommands.add_parser("build-embeddings", help="Write the memory-mapped embedding matrix")
+    build.add_argument("corpus_dir")
+    build.add_argument("--dim", type=int, default=128)
+    search = subcommands.add_parser("search", help="Run a query against a corpus")
+    search.add_argument("corpus_dir")
+    search.add_argument("query")
+    search.add_argument("-k", type=int, default=5)
+    search.add_argument("--hybrid", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "build-embeddings":
+        logging.info(f"Wrote {build_embeddings(args.corpus_dir, args.dim)}")
+    else:
+        kb = KnowledgeBase(args.corpus_dir, use_embeddings=args.hybrid)
+        print(json.dumps(kb.search(args.query, args.k, hybrid=args.hybrid), indent=2))
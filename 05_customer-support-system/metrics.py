@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Prometheus metrics for the Customer Support System
+A minimal in-process registry (counters, gauges, fixed-bucket histograms) rendered
+in the Prometheus text exposition format by GET /metrics. The support metrics are
+fed from finished tracing spans, so the workflow, activity, LLM and tool
+instrumentation points are shared with tracing and cost one dict lookup and one
+bisect per span.
+"""
+
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+TICKET_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 14400, 86400)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        """Add `amount` to the series with these label values (in label order)"""
+        key = label_values
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}" for key, value in sorted(values.items())]
+
+
+class Gauge(_Metric):
+    """Gauge whose value is read from a callback at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        super().__init__(name, help)
+        self.read = read
+
+    def _samples(self):
+        return [f"{self.name} {_number(self.read())}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        """Record `value` in the series with these label values (in label order)"""
+        key = label_values
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def _samples(self):
+        with self._lock:
+            snapshot = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        lines = []
+        for key, (counts, total) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class SupportMetrics:
+    """The customer support metrics, updated from finished tracing spans"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, tracer, prefix: str = "support", approvals_pending: Optional[Callable[[], float]] = None):
+        self.tracer = tracer
+        self.registry = Registry()
+        r = self.registry.register
+        self.ticket_latency = r(Histogram(
+            f"{prefix}_ticket_duration_seconds", "End-to-end ticket workflow duration", ("outcome",), TICKET_BUCKETS))
+        self.activity_duration = r(Histogram(
+            f"{prefix}_activity_duration_seconds", "Workflow activity duration", ("activity", "status")))
+        self.llm_latency = r(Histogram(
+            f"{prefix}_llm_call_duration_seconds", "LLM call latency", ("model", "call", "cache")))
+        self.llm_tokens = r(Histogram(
+            f"{prefix}_llm_tokens", "Tokens per LLM call", ("model", "type"), TOKEN_BUCKETS))
+        self.tool_latency = r(Histogram(
+            f"{prefix}_tool_call_duration_seconds", "Agent tool call latency", ("tool", "status")))
+        self.outcomes = r(Counter(
+            f"{prefix}_workflow_outcomes_total", "Finished ticket workflows by outcome", ("outcome",)))
+        self.approval_timeouts = r(Counter(
+            f"{prefix}_approval_timeouts_total", "Approval waits that ended on the timer"))
+        r(Gauge(f"{prefix}_workflows_in_flight", "Ticket workflows started and not yet finished",
+                lambda: tracer.open_span_count("workflow")))
+        r(Gauge(f"{prefix}_approvals_pending", "Tickets waiting for support team approval",
+                approvals_pending or (lambda: tracer.open_span_count("wait"))))
+        self._handlers = {
+            "workflow": self._on_workflow,
+            "activity": self._on_activity,
+            "llm": self._on_llm,
+            "tool": self._on_tool,
+            "wait": self._on_wait,
+        }
+        # Span kinds the metrics read; the tracer can skip the others when it doesn't store traces
+        self.kinds = frozenset(self._handlers)
+
+    def on_span(self, span):
+        handler = self._handlers.get(span.kind)
+        if handler is not None:
+            handler(span, span.end - span.start)
+
+    def _on_workflow(self, span, duration: float):
+        outcome = span.attributes.get("outcome") or span.status
+        self.ticket_latency.observe(duration, outcome)
+        self.outcomes.inc(outcome)
+
+    def _on_activity(self, span, duration: float):
+        self.activity_duration.observe(duration, span.name, span.status)
+
+    def _on_llm(self, span, duration: float):
+        attributes = span.attributes
+        model = str(attributes.get("model") or "")
+        self.llm_latency.observe(duration, model, span.name, attributes.get("cache") or "miss")
+        prompt_tokens = attributes.get("prompt_tokens")
+        if prompt_tokens:
+            self.llm_tokens.observe(prompt_tokens, model, "prompt")
+        completion_tokens = attributes.get("completion_tokens")
+        if completion_tokens:
+            self.llm_tokens.observe(completion_tokens, model, "completion")
+        cached_tokens = attributes.get("cached_tokens")
+        if cached_tokens:
+            self.llm_tokens.observe(cached_tokens, model, "cached")
+
+    def _on_tool(self, span, duration: float):
+        self.tool_latency.observe(duration, span.name, span.status)
+
+    def _on_wait(self, span, duration: float):
+        if span.attributes.get("timed_out"):
+            self.approval_timeouts.inc()
+
+    def render(self) -> str:
+        return self.registry.render()
@@ -3,44 +3,55 @@
 
 # Default ticket ID
 TICKET_ID=${1:-"TEST001"}
+BASE_URL=${BASE_URL:-"http://localhost:8000"}
 
 echo "🔍 Monitoring ticket: $TICKET_ID"
 echo "Press Ctrl+C to stop monitoring"
 echo "=================================="
 
+# Stage events arrive over Server-Sent Events as they happen, so nothing is polled.
+# The stream closes once the ticket finishes; on a dropped connection we resume
+# after the last event seen.
+LAST_ID_FILE=$(mktemp)
+FINAL_FILE=$(mktemp)
+trap 'rm -f "$LAST_ID_FILE" "$FINAL_FILE"' EXIT
+echo 0 > "$LAST_ID_FILE"
+
 while true; do
-  echo ""
-  echo "=== $(date '+%H:%M:%S') ==="
-  
-  # Get ticket status
-  STATUS_RESPONSE=$(curl -s "http://localhost:8000/support/status/$TICKET_ID" 2>/dev/null)
-  
-  if [ $? -eq 0 ] && [ -n "$STATUS_RESPONSE" ]; then
-    # Extract status using jq if available, otherwise use grep
-    if command -v jq &> /dev/null; then
-      STATUS=$(echo "$STATUS_RESPONSE" | jq -r '.status // "unknown"')
-      INSTANCE_ID=$(echo "$STATUS_RESPONSE" | jq -r '.instance_id // "unknown"')
-      OUTPUT=$(echo "$STATUS_RESPONSE" | jq -r '.output // "none"')
-      
-      echo "📊 Status: $STATUS"
-      echo "🆔 Instance: $INSTANCE_ID"
-      
-      # Show output if it's not "none" and not too long
-      if [ "$OUTPUT" != "none" ] && [ "$OUTPUT" != "null" ]; then
-        OUTPUT_LENGTH=$(echo "$OUTPUT" | wc -c)
-        if [ $OUTPUT_LENGTH -lt 200 ]; then
-          echo "📋 Output: $OUTPUT"
+  curl -sN -H "Accept: text/event-stream" \
+    "$BASE_URL/support/stream/$TICKET_ID?after=$(cat "$LAST_ID_FILE")" 2>/dev/null |
+  while IFS= read -r LINE; do
+    case "$LINE" in
+      id:*)
+        echo "${LINE#id: }" > "$LAST_ID_FILE"
+        ;;
+      data:*)
+        DATA="${LINE#data: }"
+        echo ""
+        echo "=== $(date '+%H:%M:%S') ==="
+        if command -v jq &> /dev/null; then
+          STAGE=$(echo "$DATA" | jq -r '.stage // "unknown"')
+          echo "📊 Stage: $STAGE"
+          if [ "$STAGE" = "status" ]; then
+            echo "🔄 Workflow status: $(echo "$DATA" | jq -r '.status // .error // "unknown"')"
+          fi
+          MESSAGE=$(echo "$DATA" | jq -r '.message // .error // empty')
+          [ -n "$MESSAGE" ] && echo "📋 $MESSAGE"
+          [ "$(echo "$DATA" | jq -r '.final')" = "true" ] && echo true > "$FINAL_FILE"
         else
-          echo "📋 Output: [Long output - check manually]"
+          # Fallback without jq
+          echo "📊 Event: $DATA"
+          case "$DATA" in *'"final": true'*) echo true > "$FINAL_FILE" ;; esac
         fi
-      fi
-    else
-      # Fallback without jq
-      echo "📊 Response: $STATUS_RESPONSE"
-    fi
-  else
-    echo "❌ Failed to get status (system may not be running)"
+        ;;
+    esac
+  done
+
+  if [ -s "$FINAL_FILE" ]; then
+    echo ""
+    echo "✅ Ticket $TICKET_ID finished"
+    break
   fi
-  
+  echo "❌ Stream closed (system may not be running), reconnecting..."
   sleep 3
 done
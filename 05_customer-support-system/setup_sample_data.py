@@ -2,146 +2,386 @@
 """
 Sample data setup script for the Customer Support System
 This script populates the state stores with sample customer and system data
+
+Without arguments it loads the three sample customers. For load tests it can
+generate N synthetic customers and systems from a seed, import/export records
+as NDJSON (one {"customer": ..., "system": ...} object per line) and bulk-load
+them in chunks with save_bulk_state:
+
+    python setup_sample_data.py --generate 100000 --seed 42 --chunk-size 500 --concurrency 8
+    python setup_sample_data.py --generate 100000 --export customers.ndjson --no-load
+    python setup_sample_data.py --import customers.ndjson --verify-sample 50
 """
 
+import argparse
 import json
 import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
 from dapr.clients import DaprClient
+from dapr.clients.grpc._state import StateItem
+from dapr_client_pool import DaprClientPool
+from state_cache import publish_invalidation
+from state_listing import record_keys
 from dotenv import load_dotenv
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 
+def notify_cache_invalidation(client, store_name, keys):
+    """Ask a running customer support system to drop its cached copies of the updated records"""
+    try:
+        publish_invalidation(client, store_name, keys)
+        scope = f"{len(keys)} {store_name} record(s)" if keys else f"all {store_name} records"
+        logging.info(f"Published cache invalidation for {scope}")
+    except Exception as e:
+        # The system may not be running yet; its cache entries expire on their own TTL
+        logging.warning(f"Could not publish cache invalidation for {store_name}: {e}")
+
+SAMPLE_CUSTOMERS = [
+    {
+        "customer_id": "CUST001",
+        "name": "Acme Corporation",
+        "email": "support@acme.com",
+        "support_entitlement": True,
+        "plan": "Enterprise",
+        "created_date": "2023-01-15"
+    },
+    {
+        "customer_id": "CUST002", 
+        "name": "TechStart Inc",
+        "email": "help@techstart.com",
+        "support_entitlement": True,
+        "plan": "Professional",
+        "created_date": "2023-06-20"
+    },
+    {
+        "customer_id": "CUST003",
+        "name": "Basic User LLC",
+        "email": "user@basicuser.com", 
+        "support_entitlement": False,
+        "plan": "Basic",
+        "created_date": "2024-01-10"
+    }
+]
+
+SAMPLE_SYSTEMS = [
+    {
+        "customer_id": "CUST001",
+        "environment": "Production",
+        "dapr_version": "1.12.0",
+        "kubernetes_version": "1.28.2",
+        "cloud_provider": "Azure",
+        "region": "East US",
+        "applications": [
+            {"name": "order-service", "version": "2.1.0"},
+            {"name": "payment-service", "version": "1.8.3"},
+            {"name": "inventory-service", "version": "3.0.1"}
+        ],
+        "components": [
+            {"type": "state", "name": "redis-state", "version": "v1"},
+            {"type": "pubsub", "name": "azure-servicebus", "version": "v1"},
+            {"type": "bindings", "name": "azure-storage", "version": "v1"}
+        ]
+    },
+    {
+        "customer_id": "CUST002",
+        "environment": "Staging", 
+        "dapr_version": "1.11.5",
+        "kubernetes_version": "1.27.1",
+        "cloud_provider": "AWS",
+        "region": "us-west-2",
+        "applications": [
+            {"name": "api-gateway", "version": "1.5.2"},
+            {"name": "user-service", "version": "2.0.0"}
+        ],
+        "components": [
+            {"type": "state", "name": "dynamodb-state", "version": "v1"},
+            {"type": "pubsub", "name": "aws-sns-sqs", "version": "v1"}
+        ]
+    },
+    {
+        "customer_id": "CUST003",
+        "environment": "Development",
+        "dapr_version": "1.10.0", 
+        "kubernetes_version": "1.26.0",
+        "cloud_provider": "Local",
+        "region": "localhost",
+        "applications": [
+            {"name": "test-app", "version": "0.1.0"}
+        ],
+        "components": [
+            {"type": "state", "name": "redis-local", "version": "v1"}
+        ]
+    }
+]
+
 def setup_sample_customers():
     """Set up sample customer data"""
-    customers = [
-        {
-            "customer_id": "CUST001",
-            "name": "Acme Corporation",
-            "email": "support@acme.com",
-            "support_entitlement": True,
-            "plan": "Enterprise",
-            "created_date": "2023-01-15"
-        },
-        {
-            "customer_id": "CUST002", 
-            "name": "TechStart Inc",
-            "email": "help@techstart.com",
-            "support_entitlement": True,
-            "plan": "Professional",
-            "created_date": "2023-06-20"
-        },
-        {
-            "customer_id": "CUST003",
-            "name": "Basic User LLC",
-            "email": "user@basicuser.com", 
-            "support_entitlement": False,
-            "plan": "Basic",
-            "created_date": "2024-01-10"
-        }
-    ]
+    customers = SAMPLE_CUSTOMERS
     
     with DaprClient() as client:
+        client.save_bulk_state(
+            "customer-state",
+            [StateItem(key=c["customer_id"], value=json.dumps(c)) for c in customers]
+        )
+        record_keys(client, "customer-state", [c["customer_id"] for c in customers])
         for customer in customers:
-            client.save_state(
-                "customer-state",
-                customer["customer_id"],
-                json.dumps(customer)
-            )
             logging.info(f"Created customer: {customer['customer_id']} - {customer['name']}")
+        notify_cache_invalidation(client, "customer-state", [c["customer_id"] for c in customers])
 
 def setup_sample_systems():
     """Set up sample system information"""
-    systems = [
-        {
-            "customer_id": "CUST001",
-            "environment": "Production",
-            "dapr_version": "1.12.0",
-            "kubernetes_version": "1.28.2",
-            "cloud_provider": "Azure",
-            "region": "East US",
-            "applications": [
-                {"name": "order-service", "version": "2.1.0"},
-                {"name": "payment-service", "version": "1.8.3"},
-                {"name": "inventory-service", "version": "3.0.1"}
-            ],
-            "components": [
-                {"type": "state", "name": "redis-state", "version": "v1"},
-                {"type": "pubsub", "name": "azure-servicebus", "version": "v1"},
-                {"type": "bindings", "name": "azure-storage", "version": "v1"}
-            ]
-        },
-        {
-            "customer_id": "CUST002",
-            "environment": "Staging", 
-            "dapr_version": "1.11.5",
-            "kubernetes_version": "1.27.1",
-            "cloud_provider": "AWS",
-            "region": "us-west-2",
-            "applications": [
-                {"name": "api-gateway", "version": "1.5.2"},
-                {"name": "user-service", "version": "2.0.0"}
-            ],
-            "components": [
-                {"type": "state", "name": "dynamodb-state", "version": "v1"},
-                {"type": "pubsub", "name": "aws-sns-sqs", "version": "v1"}
-            ]
-        },
-        {
-            "customer_id": "CUST003",
-            "environment": "Development",
-            "dapr_version": "1.10.0", 
-            "kubernetes_version": "1.26.0",
-            "cloud_provider": "Local",
-            "region": "localhost",
+    systems = SAMPLE_SYSTEMS
+    
+    with DaprClient() as client:
+        client.save_bulk_state(
+            "system-state",
+            [StateItem(key=s["customer_id"], value=json.dumps(s)) for s in systems]
+        )
+        record_keys(client, "system-state", [s["customer_id"] for s in systems])
+        for system in systems:
+            logging.info(f"Created system info for: {system['customer_id']} - {system['environment']}")
+        notify_cache_invalidation(client, "system-state", [s["customer_id"] for s in systems])
+
+# === Synthetic Data ===
+COMPANY_PREFIXES = ["Acme", "Globex", "Initech", "Umbrella", "Stark", "Wayne", "Tyrell", "Cyberdyne",
+                    "Hooli", "Vandelay", "Soylent", "Wonka", "Aperture", "Massive", "Nakatomi", "Oscorp"]
+COMPANY_SUFFIXES = ["Corporation", "Inc", "LLC", "Systems", "Labs", "Group", "Technologies", "Holdings"]
+PLANS = [("Enterprise", True, 0.2), ("Professional", True, 0.35), ("Basic", False, 0.45)]
+ENVIRONMENTS = ["Production", "Staging", "Development"]
+DAPR_VERSIONS = ["1.10.0", "1.11.5", "1.12.0", "1.13.2", "1.14.4", "1.15.1"]
+KUBERNETES_VERSIONS = ["1.26.0", "1.27.1", "1.28.2", "1.29.3", "1.30.1"]
+CLOUD_REGIONS = {
+    "Azure": ["East US", "West Europe", "Southeast Asia"],
+    "AWS": ["us-east-1", "us-west-2", "eu-central-1"],
+    "GCP": ["us-central1", "europe-west1", "asia-east1"],
+    "Local": ["localhost"],
+}
+APPLICATIONS = ["order-service", "payment-service", "inventory-service", "api-gateway", "user-service",
+                "notification-service", "search-service", "billing-service"]
+COMPONENTS = [("state", "redis-state"), ("state", "postgres-state"), ("state", "dynamodb-state"),
+              ("pubsub", "redis-pubsub"), ("pubsub", "kafka-pubsub"), ("pubsub", "azure-servicebus"),
+              ("bindings", "azure-storage"), ("bindings", "aws-s3"), ("secretstores", "vault")]
+
+def generate_records(count, seed=42, start=1):
+    """Yield `count` synthetic (customer, system) pairs; the same seed always yields the same data"""
+    rng = random.Random(seed)
+    plan_names, plan_weights = [p[0] for p in PLANS], [p[2] for p in PLANS]
+    entitlements = {p[0]: p[1] for p in PLANS}
+    for number in range(start, start + count):
+        customer_id = f"CUST{number:06d}"
+        name = f"{rng.choice(COMPANY_PREFIXES)} {rng.choice(COMPANY_SUFFIXES)} {number}"
+        plan = rng.choices(plan_names, plan_weights)[0]
+        cloud = rng.choice(list(CLOUD_REGIONS))
+        customer = {
+            "customer_id": customer_id,
+            "name": name,
+            "email": f"support+{number}@{name.split()[0].lower()}.example.com",
+            "support_entitlement": entitlements[plan],
+            "plan": plan,
+            "created_date": f"{rng.randint(2019, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        }
+        system = {
+            "customer_id": customer_id,
+            "environment": "Development" if cloud == "Local" else rng.choice(ENVIRONMENTS),
+            "dapr_version": rng.choice(DAPR_VERSIONS),
+            "kubernetes_version": rng.choice(KUBERNETES_VERSIONS),
+            "cloud_provider": cloud,
+            "region": rng.choice(CLOUD_REGIONS[cloud]),
             "applications": [
-                {"name": "test-app", "version": "0.1.0"}
+                {"name": app_name, "version": f"{rng.randint(0, 3)}.{rng.randint(0, 9)}.{rng.randint(0, 9)}"}
+                for app_name in rng.sample(APPLICATIONS, rng.randint(1, 4))
             ],
             "components": [
-                {"type": "state", "name": "redis-local", "version": "v1"}
+                {"type": component_type, "name": component_name, "version": "v1"}
+                for component_type, component_name in rng.sample(COMPONENTS, rng.randint(1, 4))
             ]
         }
-    ]
-    
+        yield customer, system
+
+def sample_records():
+    """The three hand-written sample customers as (customer, system) pairs"""
+    systems = {s["customer_id"]: s for s in SAMPLE_SYSTEMS}
+    for customer in SAMPLE_CUSTOMERS:
+        yield customer, systems[customer["customer_id"]]
+
+def read_ndjson(path):
+    """Yield (customer, system) pairs from an NDJSON file"""
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "customer" not in record or "system" not in record:
+                raise ValueError(f"{path}:{line_number}: expected an object with 'customer' and 'system'")
+            yield record["customer"], record["system"]
+
+def export_ndjson(records, f):
+    """Write records to an open NDJSON file while passing them through"""
+    for customer, system in records:
+        f.write(json.dumps({"customer": customer, "system": system}) + "\n")
+        yield customer, system
+
+def chunked(records, chunk_size):
+    iterator = iter(records)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+def save_chunk(pool, chunk):
+    """Write one chunk to both stores; returns (records, payload bytes)"""
+    customer_items = [StateItem(key=c["customer_id"], value=json.dumps(c)) for c, _ in chunk]
+    system_items = [StateItem(key=s["customer_id"], value=json.dumps(s)) for _, s in chunk]
+    with pool.client() as client:
+        client.save_bulk_state("customer-state", customer_items)
+        client.save_bulk_state("system-state", system_items)
+        # Key directories let GET /data page through stores without query support
+        record_keys(client, "customer-state", [item.key for item in customer_items])
+        record_keys(client, "system-state", [item.key for item in system_items])
+    return len(chunk), sum(len(item.value) for item in customer_items + system_items)
+
+def bulk_load(records, chunk_size=500, concurrency=8, sample_size=20, seed=42):
+    """Save records in chunks with bounded concurrency; returns stats and a random sample of written records"""
+    pool = DaprClientPool(size=concurrency)
+    pool.start(warm=concurrency)
+    rng = random.Random(seed)
+    sample = []
+    seen = 0
+    stats = {"records": 0, "chunks": 0, "bytes": 0}
+    start_time = time.perf_counter()
+    last_report = start_time
+
+    def collect(done):
+        nonlocal last_report
+        for future in done:
+            written, size = future.result()
+            stats["records"] += written
+            stats["chunks"] += 1
+            stats["bytes"] += size
+        now = time.perf_counter()
+        if now - last_report >= 5:
+            last_report = now
+            logging.info(f"  {stats['records']} records written ({stats['records'] / (now - start_time):.0f} records/s)")
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bulk-load") as executor:
+            in_flight = set()
+            for chunk in chunked(records, chunk_size):
+                # Reservoir sample so verification covers the whole dataset without holding it in memory
+                for record in chunk:
+                    seen += 1
+                    if len(sample) < sample_size:
+                        sample.append(record)
+                    elif (slot := rng.randrange(seen)) < sample_size:
+                        sample[slot] = record
+                # Keep at most `concurrency` chunks queued behind the running ones
+                if len(in_flight) >= concurrency * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                in_flight.add(executor.submit(save_chunk, pool, chunk))
+            collect(wait(in_flight).done)
+    finally:
+        pool.close()
+
+    stats["elapsed_seconds"] = time.perf_counter() - start_time
+    stats["records_per_second"] = stats["records"] / stats["elapsed_seconds"] if stats["elapsed_seconds"] else 0.0
+    return stats, sample
+
+def verify_sample(sample):
+    """Read the sampled records back and compare them with what was written"""
+    mismatches = 0
     with DaprClient() as client:
-        for system in systems:
-            client.save_state(
-                "system-state",
-                system["customer_id"],
-                json.dumps(system)
-            )
-            logging.info(f"Created system info for: {system['customer_id']} - {system['environment']}")
+        for store_name, index in (("customer-state", 0), ("system-state", 1)):
+            expected = {record[index]["customer_id"]: record[index] for record in sample}
+            items = client.get_bulk_state(store_name, list(expected), parallelism=8).items
+            for item in items:
+                if not item.data or json.loads(item.data) != expected[item.key]:
+                    mismatches += 1
+                    logging.warning(f"⚠️  {store_name}/{item.key} does not match the loaded record")
+    return mismatches
+
+def run_bulk(args):
+    if args.import_path:
+        records = read_ndjson(args.import_path)
+        source = args.import_path
+    elif args.generate:
+        records = generate_records(args.generate, seed=args.seed)
+        source = f"{args.generate} synthetic customers (seed {args.seed})"
+    else:
+        records = sample_records()
+        source = "sample customers"
+    logging.info(f"Loading {source}")
+
+    export_file = open(args.export_path, "w") if args.export_path else None
+    try:
+        if export_file:
+            records = export_ndjson(records, export_file)
+        if args.no_load:
+            exported = sum(1 for _ in records)
+            logging.info(f"✅ Exported {exported} records to {args.export_path}")
+            return
+        stats, sample = bulk_load(records, args.chunk_size, args.concurrency, args.verify_sample, args.seed)
+    finally:
+        if export_file:
+            export_file.close()
+
+    logging.info(
+        f"✅ Wrote {stats['records']} customers + systems in {stats['chunks']} chunk(s), "
+        f"{stats['bytes'] / 1e6:.1f} MB in {stats['elapsed_seconds']:.2f}s "
+        f"({stats['records_per_second']:.0f} records/s, {2 * stats['records_per_second']:.0f} state items/s)"
+    )
+    with DaprClient() as client:
+        # Drop every cached record rather than publishing 100k+ keys
+        notify_cache_invalidation(client, "customer-state", [])
+        notify_cache_invalidation(client, "system-state", [])
+
+    if sample:
+        logging.info(f"Verifying a random sample of {len(sample)} record(s)...")
+        mismatches = verify_sample(sample)
+        if mismatches:
+            logging.warning(f"⚠️  {mismatches} sampled record(s) failed verification")
+        else:
+            logging.info(f"✅ Sample verification successful ({', '.join(c['customer_id'] for c, _ in sample[:5])}...)")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load customer and system data into the Dapr state stores")
+    parser.add_argument("--generate", type=int, metavar="N", help="Generate N synthetic customers and systems")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for generated data and sampling")
+    parser.add_argument("--import", dest="import_path", metavar="PATH", help="Load records from an NDJSON file")
+    parser.add_argument("--export", dest="export_path", metavar="PATH", help="Also write the records to an NDJSON file")
+    parser.add_argument("--no-load", action="store_true", help="Only export, don't write to the state stores")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Records per save_bulk_state call")
+    parser.add_argument("--concurrency", type=int, default=8, help="Chunks written in parallel")
+    parser.add_argument("--verify-sample", type=int, default=20, help="Random records to read back after loading")
+    return parser.parse_args()
 
 if __name__ == "__main__":
+    args = parse_args()
     logging.info("Setting up sample data for Customer Support System...")
     
     try:
         # Test Dapr connection first
-        with DaprClient() as test_client:
-            logging.info("Dapr connection successful")
-        
-        logging.info("Creating sample customers...")
-        setup_sample_customers()
-        
-        logging.info("Creating sample system information...")
-        setup_sample_systems()
+        if not args.no_load:
+            with DaprClient() as test_client:
+                logging.info("Dapr connection successful")
         
-        # Verify data was created
-        logging.info("Verifying sample data...")
-        with DaprClient() as client:
-            # Test customer lookup
-            result = client.get_state("customer-state", "CUST001")
-            if result.data:
-                logging.info("✅ Customer data verification successful")
-            else:
-                logging.warning("⚠️  Customer data verification failed")
+        if args.generate or args.import_path or args.export_path:
+            run_bulk(args)
+        else:
+            logging.info("Creating sample customers...")
+            setup_sample_customers()
+            
+            logging.info("Creating sample system information...")
+            setup_sample_systems()
             
-            # Test system info lookup
-            result = client.get_state("system-state", "CUST001")
-            if result.data:
-                logging.info("✅ System data verification successful")
+            # Verify data was created
+            logging.info("Verifying sample data...")
+            if verify_sample(list(sample_records())):
+                logging.warning("⚠️  Sample data verification failed")
             else:
-                logging.warning("⚠️  System data verification failed")
+                logging.info("✅ Customer and system data verification successful")
         
         logging.info("✅ Sample data setup completed successfully!")
         logging.info("You can now run the customer support system with: dapr run -f .")
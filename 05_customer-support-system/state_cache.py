@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Read-through cache for rarely changing Dapr state (customer and system records)
+Entries are kept in LRU order with a TTL. An expired entry costs a full get_state
+(Dapr has no conditional read); when the returned ETag matches the cached one, the
+already decoded value is kept and its TTL extended, so only the JSON decode is
+saved. Writers invalidate entries explicitly, either in-process or by publishing
+to the `state-invalidations` topic. Each invalidation bumps a generation counter,
+and a read that was in flight when it happened doesn't cache what it read.
+"""
+
+import copy
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+INVALIDATION_TOPIC = "state-invalidations"
+
+
+class _Entry:
+    __slots__ = ("value", "etag", "expires_at")
+
+    def __init__(self, value: Any, etag: str, expires_at: float):
+        self.value = value
+        self.etag = etag
+        self.expires_at = expires_at
+
+
+class StateCache:
+    """Thread-safe LRU + TTL read-through cache for JSON values in Dapr state stores"""
+
+    def __init__(self, pool, max_entries: int = 1024, ttl: float = 60.0):
+        self.pool = pool
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by invalidate()/clear(): per key, per store, and for the whole cache
+        self._key_generations: Dict[Tuple[str, str], int] = {}
+        self._store_generations: Dict[str, int] = {}
+        self._epoch = 0
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "unchanged": 0,
+            "refreshed": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "stale_reads": 0,
+        }
+
+    def _count(self, name: str, amount: int = 1):
+        self._stats[name] += amount
+
+    def _generation(self, cache_key: Tuple[str, str]) -> Tuple[int, int, int]:
+        # Caller holds the lock
+        return self._epoch, self._store_generations.get(cache_key[0], 0), self._key_generations.get(cache_key, 0)
+
+    def get_json(self, store_name: str, key: str) -> Optional[Any]:
+        """Return the decoded JSON value for `key`, or None if the key doesn't exist"""
+        cache_key = (store_name, key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(cache_key)
+                self._count("hits")
+                return copy.deepcopy(entry.value)
+            generation = self._generation(cache_key)
+
+        with self.pool.client() as client:
+            result = client.get_state(store_name, key)
+
+        if not result.data:
+            # Missing records aren't cached so freshly loaded sample data is seen immediately
+            with self._lock:
+                self._entries.pop(cache_key, None)
+                self._count("misses")
+            return None
+
+        with self._lock:
+            if entry is not None and result.etag and entry.etag == result.etag:
+                # Expired but unchanged in the store: keep the decoded value, extend its TTL
+                self._count("unchanged")
+                if self._generation(cache_key) == generation:
+                    entry.expires_at = now + self.ttl
+                    self._entries[cache_key] = entry
+                    self._entries.move_to_end(cache_key)
+                return copy.deepcopy(entry.value)
+            self._count("refreshed" if entry is not None else "misses")
+
+        value = json.loads(result.data)
+        self._store(cache_key, value, result.etag, now, generation)
+        return copy.deepcopy(value)
+
+    def _store(self, cache_key: Tuple[str, str], value: Any, etag: str, now: float, generation: Tuple[int, int, int]):
+        with self._lock:
+            if self._generation(cache_key) != generation:
+                # Invalidated while the read was in flight: what it read may predate the write
+                self._count("stale_reads")
+                return
+            self._entries[cache_key] = _Entry(value, etag, now + self.ttl)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._count("evictions")
+
+    def invalidate(self, store_name: str, key: Optional[str] = None):
+        """Drop one key, or every key of a store when `key` is None"""
+        with self._lock:
+            if key is not None:
+                self._key_generations[(store_name, key)] = self._key_generations.get((store_name, key), 0) + 1
+                removed = 1 if self._entries.pop((store_name, key), None) is not None else 0
+            else:
+                self._store_generations[store_name] = self._store_generations.get(store_name, 0) + 1
+                stale = [k for k in self._entries if k[0] == store_name]
+                for k in stale:
+                    del self._entries[k]
+                removed = len(stale)
+            self._count("invalidations", removed)
+        if removed:
+            logging.info(f"Invalidated {removed} cached entr{'y' if removed == 1 else 'ies'} from {store_name}")
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._count("invalidations", len(self._entries))
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current size"""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"] + self._stats["unchanged"] + self._stats["refreshed"]
+            return {
+                **self._stats,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                # Only hits skip the store; unchanged re-reads still cost a get_state
+                "hit_ratio": self._stats["hits"] / lookups if lookups else 0.0,
+            }
+
+
+def publish_invalidation(client, store_name: str, keys, pubsub_name: str = "support-pubsub"):
+    """Tell running customer support instances to drop cached copies of `keys`"""
+    client.publish_event(
+        pubsub_name=pubsub_name,
+        topic_name=INVALIDATION_TOPIC,
+        data=json.dumps({"store_name": store_name, "keys": list(keys)}),
+        data_content_type="application/json",
+    )
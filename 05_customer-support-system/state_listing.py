@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Paged listing of Dapr state stores for the /data endpoint
+Pages come from the state query API (`query_state` with a page limit and token),
+so only one page per store is held in memory at a time. The query API needs a
+component that supports it. The Redis components shipped with this sample are
+plain Redis without `queryIndexes` (which would need Redis Stack), so locally
+every query fails.
+
+Dapr has no other way to enumerate keys: a bulk get needs the keys, and returns
+nothing for an empty list. Stores without query support are listed from a
+KeyDirectory instead, which their writers keep up to date: the store's keys in
+append-only pages of at most DIRECTORY_PAGE_SIZE keys (`key-directory-<store>-<page>`)
+in the internal-state store. A listing page reads one or two directory pages, then
+bulk-reads their values, so memory is bounded by the directory page size plus one
+page of items, whatever the store's size. The app records keys write-behind
+(DirectoryRecorder), so saving an analysis doesn't wait for the directory. Keys
+written without updating the directory (e.g. before it existed) aren't listed.
+Entries of deleted keys stay in the directory (listings skip them); this sample
+never deletes data, so it doesn't compact pages. The workflow engine's execution-state store
+has no directory, so listing it needs query support (GET /support/tickets lists
+tickets from the ticket index instead).
+
+Cursors for several stores are packed into one opaque string.
+"""
+
+import base64
+import json
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from dapr.clients.grpc._state import Concurrency, StateOptions
+
+from dapr_client_pool import is_etag_conflict
+
+# Public name -> state store component
+DATA_STORES = {
+    "customers": "customer-state",
+    "systems": "system-state",
+    "analysis": "analysis-state",
+    "tickets": "execution-state",
+}
+
+DIRECTORY_KEY_PREFIX = "key-directory"
+DIRECTORY_STORE = "internal-state"
+DIRECTORY_PAGE_SIZE = 1000
+# The app's own records (key directories, claim-check payloads, ticket index, LLM cache). They
+# live in internal-state; older versions wrote them to the data stores
+INTERNAL_KEY_PREFIXES = (DIRECTORY_KEY_PREFIX, "payload-", "ticket-index-", "llm-cache||")
+
+_DIRECTORY_TOKEN = "dir:"
+_unqueryable_stores = set()
+_unqueryable_lock = threading.Lock()
+
+
+def encode_cursor(tokens: Dict[str, str]) -> Optional[str]:
+    """Pack per-store page tokens into one URL-safe cursor; None when every store is exhausted"""
+    if not tokens:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(tokens, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Dict[str, str]:
+    """Unpack a cursor from encode_cursor; raises ValueError for anything else"""
+    if not cursor:
+        return {}
+    try:
+        tokens = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(tokens, dict) or not set(tokens) <= set(DATA_STORES):
+        raise ValueError("Invalid cursor")
+    return tokens
+
+
+def _decode(key: str, data: bytes) -> Dict[str, Any]:
+    try:
+        return {"key": key, "data": json.loads(data)}
+    except ValueError:
+        return {"key": key, "data": data.decode(errors="replace")}
+
+
+def _query_page(client, store_name: str, limit: int, token: str) -> Tuple[List[Dict[str, Any]], str]:
+    page = {"limit": limit}
+    if token:
+        page["token"] = token
+    response = client.query_state(store_name, json.dumps({"page": page}))
+    items = [_decode(item.key, item.value) for item in response.results
+             if item.value and not item.key.startswith(INTERNAL_KEY_PREFIXES)]
+    # Stores return a token even on the last page; a short page means there is nothing left
+    next_token = response.token if response.token and len(response.results) >= limit else ""
+    return items, next_token
+
+
+class KeyDirectory:
+    """Keys of one state store in append-only pages of at most `page_size` keys, kept by its writers"""
+
+    def __init__(self, store_name: str, directory_store: str = DIRECTORY_STORE,
+                 key_prefix: str = DIRECTORY_KEY_PREFIX, page_size: int = DIRECTORY_PAGE_SIZE):
+        self.store_name = store_name
+        self.directory_store = directory_store
+        self.key_prefix = f"{key_prefix}-{store_name}"
+        self.page_size = page_size
+        # First page that may still have room; a stale hint only costs reads of full pages
+        self._tail: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def key(self, page: int) -> str:
+        return f"{self.key_prefix}-{page}"
+
+    @property
+    def head_key(self) -> str:
+        return f"{self.key_prefix}-head"
+
+    def _read_page(self, client, page: int) -> Tuple[List[str], Optional[str]]:
+        current = client.get_state(self.directory_store, self.key(page))
+        return (json.loads(current.data)["keys"] if current.data else []), current.etag or None
+
+    def add(self, client, keys: Iterable[str], attempts: int = 32):
+        """Append keys that were just saved to the last page(s); ETag-guarded, retried on conflicts"""
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            page = self._tail
+        if page is None:
+            head = client.get_state(self.directory_store, self.head_key)
+            page = json.loads(head.data)["page"] if head.data else 0
+        first = page
+        while keys:
+            for attempt in range(attempts):
+                known, etag = self._read_page(client, page)
+                if len(known) >= self.page_size:
+                    break
+                present = set(known)
+                fresh = [key for key in keys if key not in present]
+                taken = fresh[:self.page_size - len(known)]
+                if taken:
+                    try:
+                        client.save_state(
+                            self.directory_store, self.key(page),
+                            json.dumps({"keys": known + taken}, separators=(",", ":")),
+                            etag=etag, options=StateOptions(concurrency=Concurrency.first_write)
+                        )
+                    except Exception as e:
+                        if not is_etag_conflict(e) or attempt == attempts - 1:
+                            raise
+                        time.sleep(random.uniform(0, 0.01 * (attempt + 1)))
+                        continue
+                keys = fresh[len(taken):]
+                break
+            if keys:
+                page += 1
+        with self._lock:
+            self._tail = max(self._tail or 0, page)
+        if page != first:
+            client.save_state(self.directory_store, self.head_key, json.dumps({"page": page}))
+
+    def page(self, client, limit: int, token: str = "") -> Tuple[List[str], str]:
+        """Up to `limit` keys in append order, and the token to continue after them ("" when done)"""
+        page, offset = 0, 0
+        if token:
+            page_text, _, offset_text = token[len(_DIRECTORY_TOKEN):].partition(":")
+            page, offset = int(page_text), int(offset_text or 0)
+        keys: List[str] = []
+        while len(keys) < limit:
+            page_keys, _ = self._read_page(client, page)
+            taken = page_keys[offset:offset + limit - len(keys)]
+            keys.extend(taken)
+            offset += len(taken)
+            if offset < len(page_keys):
+                break
+            if len(page_keys) < self.page_size:
+                # The last page, read to its end
+                return keys, ""
+            page, offset = page + 1, 0
+        return keys, f"{_DIRECTORY_TOKEN}{page}:{offset}"
+
+
+# Stores whose writers keep a key directory (the execution-state store is the workflow engine's)
+DIRECTORIES = {store: KeyDirectory(store) for store in ("customer-state", "system-state", "analysis-state")}
+
+
+def record_keys(client, store_name: str, keys: Iterable[str]) -> bool:
+    """Add freshly saved keys to the store's directory; False (logged) when that failed"""
+    directory = DIRECTORIES.get(store_name)
+    if directory is None:
+        return True
+    try:
+        directory.add(client, keys)
+        return True
+    except Exception as e:
+        logging.warning(f"Failed to update the key directory of {store_name}, new keys won't be listed: {e}")
+        return False
+
+
+class DirectoryRecorder:
+    """Buffers saved keys and records them in their directories write-behind, off the caller's path"""
+
+    def __init__(self, pool, flush_interval: float = 1.0):
+        self.pool = pool
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, Dict[str, None]] = {}
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._stats = {"added": 0, "flushes": 0, "write_errors": 0}
+
+    def start(self):
+        """Start the write-behind thread; safe to call more than once"""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="key-directory-writer", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """Stop the writer and flush what is still buffered"""
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join(timeout=10)
+        self.flush()
+
+    def add(self, store_name: str, keys: Iterable[str]):
+        """Buffer saved keys; they are recorded with the next flush"""
+        if store_name not in DIRECTORIES:
+            return
+        with self._cond:
+            pending = self._pending.setdefault(store_name, {})
+            for key in keys:
+                pending[key] = None
+                self._stats["added"] += 1
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Record every buffered key, one append per store"""
+        with self._flush_lock:
+            with self._cond:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            self._stats["flushes"] += 1
+            with self.pool.client() as client:
+                for store_name, keys in pending.items():
+                    if not record_keys(client, store_name, keys):
+                        self._stats["write_errors"] += 1
+                        with self._cond:
+                            self._pending.setdefault(store_name, {}).update(keys)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            return {**self._stats, "pending": sum(len(keys) for keys in self._pending.values())}
+
+
+def _directory_page(client, store_name: str, limit: int, token: str) -> Tuple[List[Dict[str, Any]], str]:
+    directory = DIRECTORIES.get(store_name)
+    if directory is None:
+        raise LookupError(f"State store {store_name} doesn't support state queries and has no key directory")
+    keys, next_token = directory.page(client, limit, token)
+    items = client.get_bulk_state(store_name, keys).items if keys else []
+    return [_decode(item.key, item.data) for item in items if item.data], next_token
+
+
+def fetch_page(pool, store_name: str, limit: int, token: str = "") -> Tuple[List[Dict[str, Any]], str]:
+    """Return one page of decoded {key, data} items and the token for the next page ("" when done)"""
+    with pool.client() as client:
+        if store_name not in _unqueryable_stores and not token.startswith(_DIRECTORY_TOKEN):
+            try:
+                return _query_page(client, store_name, limit, token)
+            except Exception as e:
+                if token:
+                    raise
+                logging.info(f"State store {store_name} doesn't support queries, listing its key directory instead: {e}")
+                with _unqueryable_lock:
+                    _unqueryable_stores.add(store_name)
+        return _directory_page(client, store_name, limit, token)
+
+
+def iter_store(pool, store_name: str, page_size: int, token: str = "") -> Iterator[Dict[str, Any]]:
+    """Yield every item of a store page by page, starting at `token`"""
+    while True:
+        items, token = fetch_page(pool, store_name, page_size, token)
+        yield from items
+        if not token:
+            return
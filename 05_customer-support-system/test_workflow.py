@@ -15,6 +15,25 @@ logging.basicConfig(level=logging.INFO)
 
 BASE_URL = "http://localhost:8000"
 
+def wait_for_stage(ticket_id, stages, timeout=120, after=0):
+    """Long-poll the status endpoint until one of `stages` (or a final stage) is reached"""
+    deadline = time.time() + timeout
+    status = {}
+    while time.time() < deadline:
+        wait = min(30, max(1, deadline - time.time()))
+        response = requests.get(
+            f"{BASE_URL}/support/status/{ticket_id}",
+            params={"wait": wait, "after": after},
+            timeout=wait + 10
+        )
+        status = response.json()
+        if "seq" in status and status["seq"] > after:
+            after = status["seq"]
+            print(f"   ⏳ Stage: {status['stage']}")
+        if status.get("stage") in stages or status.get("status") not in ("RUNNING", "PENDING", None):
+            break
+    return status, after
+
 def test_support_workflow():
     """Test the complete support workflow"""
     
@@ -47,11 +66,11 @@ def test_support_workflow():
     
     # Step 2: Wait for workflow processing
     print(f"\n2. Waiting for workflow processing...")
-    print("   ⏳ Triage agent analyzing customer and system info...")
-    time.sleep(3)
-    print("   ⏳ Expert agent querying knowledge base...")
-    time.sleep(3)
-    print("   ⏳ Solution analysis complete, waiting for approval...")
+    last_seq = 0
+    try:
+        _, last_seq = wait_for_stage(test_ticket['ticket_id'], {"awaiting_approval"})
+    except Exception as e:
+        print(f"   ❌ Error waiting for analysis: {e}")
     
     # Step 3: Check status
     print(f"\n3. Checking ticket status")
@@ -89,7 +108,10 @@ def test_support_workflow():
     
     # Step 5: Wait for final processing
     print(f"\n5. Waiting for customer notification generation...")
-    time.sleep(5)
+    try:
+        wait_for_stage(test_ticket['ticket_id'], {"notified", "notification_failed"}, after=last_seq)
+    except Exception as e:
+        print(f"   ❌ Error waiting for notification: {e}")
     
     # Step 6: Final status check
     print(f"\n6. Final status check")
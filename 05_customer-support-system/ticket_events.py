@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Per-ticket stage events for status streaming and long polling
+Activities publish stage transitions (triage started/done, analysis done, awaiting
+approval, notified, ...) to the `solution-notifications` topic; the app's subscription
+feeds them into a TicketEventHub. GET /support/stream/{ticket_id} and the long-poll
+form of GET /support/status/{ticket_id} wait on the hub instead of polling the
+workflow engine, so an idle watcher costs nothing until the ticket moves.
+
+Every replica runs its own hub. The support-pubsub component gives each app instance
+its own consumer group, so all of them receive every event, and a watcher sees a
+ticket's stages whichever replica runs its workflow.
+
+Events are numbered per ticket (`seq`), so clients resume with Last-Event-ID or
+`after=` without missing or repeating stages. Redelivered events are dropped by ID.
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+EVENTS_TOPIC = "solution-notifications"
+
+# Stages after which the workflow has nothing more to report
+FINAL_STAGES = {"notified", "triage_failed", "analysis_failed", "notification_failed", "completed", "failed"}
+# Stages published while a ticket waits for support team approval, and the ones that end the wait
+APPROVAL_WAIT_STAGES = {"awaiting_approval", "approval_reminder"}
+APPROVAL_END_STAGES = FINAL_STAGES | {"approval_timed_out"}
+
+
+class _Ticket:
+    __slots__ = ("events", "event_ids", "waiters")
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.event_ids: Set[str] = set()
+        self.waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = set()
+
+
+class TicketEventHub:
+    """Thread-safe, bounded history of stage events per ticket with async waiters"""
+
+    def __init__(self, max_tickets: int = 10000, max_events_per_ticket: int = 64):
+        self.max_tickets = max_tickets
+        self.max_events_per_ticket = max_events_per_ticket
+        self._tickets: "OrderedDict[str, _Ticket]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"events": 0, "duplicates": 0, "waits": 0, "evicted_tickets": 0}
+
+    def _ticket(self, ticket_id: str) -> _Ticket:
+        ticket = self._tickets.get(ticket_id)
+        if ticket is None:
+            ticket = self._tickets[ticket_id] = _Ticket()
+            # Evict the least recently used tickets; tickets someone is waiting on stay
+            excess = len(self._tickets) - self.max_tickets
+            if excess > 0:
+                for old_id, old in list(itertools.islice(self._tickets.items(), excess)):
+                    if not old.waiters:
+                        del self._tickets[old_id]
+                        self._stats["evicted_tickets"] += 1
+        self._tickets.move_to_end(ticket_id)
+        return ticket
+
+    def publish(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Record a stage event and wake the ticket's waiters; returns None for duplicates"""
+        ticket_id = event.get("ticket_id")
+        stage = event.get("stage")
+        if not ticket_id or not stage:
+            return None
+        with self._lock:
+            ticket = self._ticket(ticket_id)
+            event_id = event.get("id")
+            if event_id and event_id in ticket.event_ids:
+                self._stats["duplicates"] += 1
+                return None
+            seq = ticket.events[-1]["seq"] + 1 if ticket.events else 1
+            recorded = {**event, "seq": seq, "final": bool(event.get("final")) or stage in FINAL_STAGES}
+            ticket.events.append(recorded)
+            if event_id:
+                ticket.event_ids.add(event_id)
+            if len(ticket.events) > self.max_events_per_ticket:
+                del ticket.events[0]
+            waiters, ticket.waiters = ticket.waiters, set()
+            self._stats["events"] += 1
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+        return recorded
+
+    def events(self, ticket_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        """Recorded events of a ticket with seq greater than `after`"""
+        with self._lock:
+            ticket = self._tickets.get(ticket_id)
+            return [event for event in ticket.events if event["seq"] > after] if ticket else []
+
+    def latest(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            ticket = self._tickets.get(ticket_id)
+            return ticket.events[-1] if ticket and ticket.events else None
+
+    async def wait(self, ticket_id: str, after: int = 0, timeout: float = 30.0) -> List[Dict[str, Any]]:
+        """Events after `after`, waiting up to `timeout` seconds for the next one if there are none yet"""
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                ticket = self._ticket(ticket_id)
+                events = [event for event in ticket.events if event["seq"] > after]
+                if events:
+                    return events
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                future = loop.create_future()
+                ticket.waiters.add((loop, future))
+                self._stats["waits"] += 1
+            try:
+                await asyncio.wait_for(future, remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._lock:
+                    ticket.waiters.discard((loop, future))
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "tickets": len(self._tickets),
+                "waiters": sum(len(ticket.waiters) for ticket in self._tickets.values()),
+            }
+
+
+class PendingApprovals:
+    """Tickets waiting for approval, derived from the stage events activities publish
+
+    A ticket is pending from its awaiting_approval event until approval_timed_out or a
+    final stage. Activities are not replayed, so the set does not grow with workflow
+    replays or continue_as_new, and every replica sees every event. A ticket whose
+    workflow was terminated or purged publishes nothing more; it drops out once no
+    event arrived for `max_silence` seconds (the longest gap between approval reminders).
+    """
+
+    def __init__(self, max_silence: float):
+        self.max_silence = max_silence
+        # ticket_id -> (timestamp of the newest event, still pending)
+        self._tickets: Dict[str, Tuple[float, bool]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"marked": 0, "cleared": 0, "expired": 0}
+        self._next_expiry = time.time() + max_silence
+
+    def _expire(self, now: float):
+        cutoff = now - self.max_silence
+        for ticket_id in [ticket_id for ticket_id, (timestamp, _) in self._tickets.items() if timestamp < cutoff]:
+            if self._tickets.pop(ticket_id)[1]:
+                self._stats["expired"] += 1
+        self._next_expiry = now + self.max_silence
+
+    def observe(self, event: Dict[str, Any]):
+        ticket_id = event.get("ticket_id")
+        stage = event.get("stage")
+        if not ticket_id:
+            return
+        if stage in APPROVAL_WAIT_STAGES:
+            pending = True
+        elif stage in APPROVAL_END_STAGES:
+            pending = False
+        else:
+            return
+        timestamp = float(event.get("timestamp") or time.time())
+        with self._lock:
+            known = self._tickets.get(ticket_id)
+            # Events can arrive out of order or redelivered; the newest one decides
+            if known is not None and known[0] > timestamp:
+                return
+            self._tickets[ticket_id] = (timestamp, pending)
+            self._stats["marked" if pending else "cleared"] += 1
+            now = time.time()
+            if now >= self._next_expiry:
+                self._expire(now)
+
+    def count(self) -> int:
+        """Pending tickets, dropping tickets silent for longer than max_silence"""
+        with self._lock:
+            self._expire(time.time())
+            return sum(1 for _, pending in self._tickets.values() if pending)
+
+    def metrics(self) -> Dict[str, Any]:
+        pending = self.count()
+        with self._lock:
+            return {**self._stats, "pending": pending}
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Secondary index of support ticket workflows for GET /support/tickets
+Every scheduled ticket is appended to the document of its creation-time bucket
+(`ticket-index-<bucket start>`) in a state store, so listing tickets by creation
+time reads a handful of bucket documents instead of scanning the workflow engine's
+execution-state store. Appends are buffered and written behind in batches: one
+ETag-guarded read-modify-write per bucket, retried on conflicts, so replicas
+writing the same bucket don't drop each other's entries. Buckets old enough that
+nobody appends to them any more are cached in memory.
+
+Runtime status isn't indexed because it changes while workflows run. Listings
+filtered by status resolve it through the workflow client; terminal statuses
+never change, so they are cached (TerminalStatusCache).
+"""
+
+import base64
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from dapr.clients.grpc._state import Concurrency, StateOptions
+
+from dapr_client_pool import is_etag_conflict
+
+TERMINAL_STATUSES = {"COMPLETED", "FAILED", "TERMINATED"}
+
+# (created_at, ticket_id)
+Entry = Tuple[float, str]
+
+DAY_SECONDS = 86400
+
+
+def encode_list_cursor(bucket: int, entry: Entry) -> str:
+    """Opaque cursor resuming strictly after `entry` (listings run newest first)"""
+    raw = json.dumps({"b": bucket, "t": entry[0], "id": entry[1]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_list_cursor(cursor: str) -> Tuple[int, Entry]:
+    """Unpack a cursor from encode_list_cursor; raises ValueError for anything else"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return int(data["b"]), (float(data["t"]), str(data["id"]))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class TerminalStatusCache:
+    """LRU of workflow statuses that can no longer change"""
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, ticket_id: str) -> Optional[str]:
+        with self._lock:
+            status = self._entries.get(ticket_id)
+            if status is not None:
+                self._entries.move_to_end(ticket_id)
+            return status
+
+    def remember(self, ticket_id: str, status: str):
+        if status not in TERMINAL_STATUSES:
+            return
+        with self._lock:
+            self._entries[ticket_id] = status
+            self._entries.move_to_end(ticket_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class TicketIndex:
+    """Ticket IDs by creation time in bucket documents, appended write-behind"""
+
+    def __init__(self, pool, store_name: str = "internal-state", key_prefix: str = "ticket-index",
+                 bucket_seconds: int = 300, flush_interval: float = 0.5, lookback_seconds: float = 7 * 86400,
+                 max_cached_buckets: int = 4096, read_chunk: int = 64):
+        self.pool = pool
+        self.store_name = store_name
+        self.key_prefix = key_prefix
+        self.bucket_seconds = bucket_seconds
+        self.flush_interval = flush_interval
+        self.lookback_seconds = lookback_seconds
+        self.max_cached_buckets = max_cached_buckets
+        self.read_chunk = read_chunk
+        self._pending: Dict[int, Dict[str, float]] = {}
+        self._closed: "OrderedDict[int, List[Entry]]" = OrderedDict()
+        self._closed_days: "OrderedDict[int, List[int]]" = OrderedDict()
+        # Buckets this instance has registered in their day's directory
+        self._registered: set = set()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._stats = {
+            "added": 0,
+            "flushes": 0,
+            "buckets_written": 0,
+            "write_conflicts": 0,
+            "write_errors": 0,
+            "bucket_reads": 0,
+            "bucket_cache_hits": 0,
+            "day_reads": 0,
+        }
+
+    def bucket_of(self, timestamp: float) -> int:
+        return int(timestamp // self.bucket_seconds) * self.bucket_seconds
+
+    def key(self, bucket: int) -> str:
+        return f"{self.key_prefix}-{bucket}"
+
+    @staticmethod
+    def day_of(bucket: int) -> int:
+        return bucket // DAY_SECONDS * DAY_SECONDS
+
+    def day_key(self, day: int) -> str:
+        return f"{self.key_prefix}-day-{day}"
+
+    # === Writing ===
+    def start(self):
+        """Start the write-behind thread; safe to call more than once"""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="ticket-index-writer", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """Stop the writer and flush what is still buffered"""
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join(timeout=10)
+        self.flush()
+
+    def add(self, ticket_id: str, created_at: Optional[float] = None):
+        """Buffer a new ticket; it is written with the next flush"""
+        created_at = round(created_at if created_at is not None else time.time(), 3)
+        with self._cond:
+            self._pending.setdefault(self.bucket_of(created_at), {})[ticket_id] = created_at
+            self._stats["added"] += 1
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+            # Let a burst of adds (e.g. a batch intake) accumulate into one write per bucket
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Write every buffered entry, one read-modify-write per bucket"""
+        with self._flush_lock:
+            with self._cond:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            self._stats["flushes"] += 1
+            for bucket, entries in pending.items():
+                try:
+                    self._write_bucket(bucket, entries)
+                except Exception as e:
+                    self._stats["write_errors"] += 1
+                    logging.error(f"Failed to write ticket index bucket {bucket}, will retry: {e}")
+                    with self._cond:
+                        merged = self._pending.setdefault(bucket, {})
+                        for ticket_id, created_at in entries.items():
+                            merged.setdefault(ticket_id, created_at)
+
+    def _write_bucket(self, bucket: int, entries: Dict[str, float]):
+        with self.pool.client() as client:
+            if bucket not in self._registered:
+                # Listings find buckets through their day's directory, so register the bucket first
+                day = self.day_of(bucket)
+
+                def register(document):
+                    document = document or {"day": day, "buckets": []}
+                    if bucket in document["buckets"]:
+                        return None
+                    document["buckets"] = sorted(document["buckets"] + [bucket])
+                    return document
+
+                self._read_modify_write(client, self.day_key(day), register)
+                if len(self._registered) >= self.max_cached_buckets:
+                    self._registered.clear()
+                self._registered.add(bucket)
+
+            def append(document):
+                document = document or {"bucket": bucket, "entries": []}
+                known = {ticket_id for _, ticket_id in document["entries"]}
+                new = [[created_at, ticket_id] for ticket_id, created_at in entries.items() if ticket_id not in known]
+                if not new:
+                    return None
+                document["entries"].extend(new)
+                return document
+
+            self._read_modify_write(client, self.key(bucket), append)
+        self._stats["buckets_written"] += 1
+        self._forget(bucket)
+
+    def _read_modify_write(self, client, key: str, update: Callable[[Optional[dict]], Optional[dict]],
+                           attempts: int = 8):
+        """Apply `update` to a document and save it with its ETag, retrying on conflicts
+
+        `update` gets the current document (None when there is none) and returns the new
+        one, or None when there is nothing to write.
+        """
+        for attempt in range(attempts):
+            current = client.get_state(self.store_name, key)
+            document = update(json.loads(current.data) if current.data else None)
+            if document is None:
+                return
+            try:
+                # First-write concurrency: the save fails if another writer updated the document meanwhile
+                client.save_state(
+                    self.store_name, key, json.dumps(document, separators=(",", ":")),
+                    etag=current.etag or None, options=StateOptions(concurrency=Concurrency.first_write)
+                )
+                return
+            except Exception as e:
+                if not is_etag_conflict(e) or attempt == attempts - 1:
+                    raise
+                self._stats["write_conflicts"] += 1
+                time.sleep(0.01 * (attempt + 1))
+
+    # === Reading ===
+    def _forget(self, bucket: int):
+        with self._cond:
+            self._closed.pop(bucket, None)
+
+    def _is_closed(self, bucket: int, seconds: Optional[int] = None) -> bool:
+        # No replica appends to a bucket (or day) once its period plus a generous flush delay has passed
+        period = seconds if seconds is not None else self.bucket_seconds
+        return bucket + period + max(60.0, 10 * self.flush_interval) < time.time()
+
+    def _load_days(self, days: Sequence[int]) -> Dict[int, List[int]]:
+        """Registered buckets of each day, newest first, from the cache or one bulk read"""
+        loaded: Dict[int, List[int]] = {}
+        missing = []
+        with self._cond:
+            for day in days:
+                buckets = self._closed_days.get(day)
+                if buckets is not None:
+                    self._closed_days.move_to_end(day)
+                    loaded[day] = buckets
+                else:
+                    missing.append(day)
+        if missing:
+            with self.pool.client() as client:
+                response = client.get_bulk_state(self.store_name, [self.day_key(day) for day in missing])
+            self._stats["day_reads"] += len(missing)
+            documents = {item.key: item.data for item in response.items}
+            with self._cond:
+                for day in missing:
+                    data = documents.get(self.day_key(day))
+                    buckets = set(json.loads(data)["buckets"]) if data else set()
+                    # Buckets with entries not flushed yet are listed too
+                    buckets.update(bucket for bucket in self._pending if self.day_of(bucket) == day)
+                    loaded[day] = sorted(buckets, reverse=True)
+                    if self._is_closed(day, DAY_SECONDS):
+                        self._closed_days[day] = loaded[day]
+                        while len(self._closed_days) > self.max_cached_buckets:
+                            self._closed_days.popitem(last=False)
+        return loaded
+
+    def _existing_buckets(self, first: int, last: int) -> Iterator[int]:
+        """Buckets from `first` down to `last` that hold entries, newest first"""
+        day = self.day_of(first)
+        while day >= self.day_of(last):
+            days = [day - i * DAY_SECONDS for i in range(self.read_chunk) if day - i * DAY_SECONDS >= self.day_of(last)]
+            loaded = self._load_days(days)
+            for current in days:
+                yield from (bucket for bucket in loaded[current] if last <= bucket <= first)
+            day = days[-1] - DAY_SECONDS
+
+    def _load_buckets(self, buckets: Sequence[int]) -> Dict[int, List[Entry]]:
+        """Entries of each bucket, newest first, from the cache or one bulk read"""
+        loaded: Dict[int, List[Entry]] = {}
+        missing = []
+        with self._cond:
+            for bucket in buckets:
+                entries = self._closed.get(bucket)
+                if entries is not None:
+                    self._closed.move_to_end(bucket)
+                    loaded[bucket] = entries
+                    self._stats["bucket_cache_hits"] += 1
+                else:
+                    missing.append(bucket)
+        if missing:
+            with self.pool.client() as client:
+                response = client.get_bulk_state(self.store_name, [self.key(bucket) for bucket in missing])
+            self._stats["bucket_reads"] += len(missing)
+            documents = {item.key: item.data for item in response.items}
+            with self._cond:
+                for bucket in missing:
+                    data = documents.get(self.key(bucket))
+                    entries = [(float(t), str(i)) for t, i in json.loads(data)["entries"]] if data else []
+                    # Entries not flushed yet are listed too, so a ticket shows up right after it is created
+                    for ticket_id, created_at in self._pending.get(bucket, {}).items():
+                        entries.append((created_at, ticket_id))
+                    entries = sorted(set(entries), reverse=True)
+                    loaded[bucket] = entries
+                    if self._is_closed(bucket):
+                        self._closed[bucket] = entries
+                        while len(self._closed) > self.max_cached_buckets:
+                            self._closed.popitem(last=False)
+        return loaded
+
+    def iter_entries(self, created_after: Optional[float] = None, created_before: Optional[float] = None,
+                     cursor: Optional[str] = None) -> Iterator[Tuple[int, Entry]]:
+        """Yield (bucket, entry) newest first within the time range, resuming after `cursor`"""
+        now = time.time()
+        newest = created_before if created_before is not None else now
+        oldest = created_after if created_after is not None else now - self.lookback_seconds
+        resume_bucket, resume_after = decode_list_cursor(cursor) if cursor else (None, None)
+        first = resume_bucket if resume_bucket is not None else self.bucket_of(newest)
+        buckets = self._existing_buckets(first, self.bucket_of(oldest))
+        while True:
+            chunk = list(itertools.islice(buckets, self.read_chunk))
+            if not chunk:
+                return
+            loaded = self._load_buckets(chunk)
+            for current in chunk:
+                for entry in loaded[current]:
+                    if resume_after is not None and current == resume_bucket and entry >= resume_after:
+                        continue
+                    if entry[0] >= newest or entry[0] < oldest:
+                        continue
+                    yield current, entry
+
+    def list(self, limit: int, created_after: Optional[float] = None, created_before: Optional[float] = None,
+             cursor: Optional[str] = None, statuses: Optional[set] = None,
+             resolve: Optional[Callable[[List[str]], Dict[str, Dict[str, Any]]]] = None,
+             max_scan: int = 1000) -> Dict[str, Any]:
+        """One page of tickets, newest first; with `statuses`, entries are resolved in chunks and filtered
+
+        A filtered page stops after `max_scan` index entries even if it isn't full, and its
+        cursor continues from there.
+        """
+        tickets: List[Dict[str, Any]] = []
+        scanned = 0
+        position = None
+        exhausted = False
+        entries = self.iter_entries(created_after, created_before, cursor)
+        while len(tickets) < limit and scanned < max_scan:
+            size = min(max(limit, 50) if statuses else limit - len(tickets), max_scan - scanned)
+            chunk = list(itertools.islice(entries, size))
+            resolved = resolve([ticket_id for _, (_, ticket_id) in chunk]) if resolve and chunk else {}
+            for bucket, (created_at, ticket_id) in chunk:
+                scanned += 1
+                position = (bucket, (created_at, ticket_id))
+                item = {"ticket_id": ticket_id, "instance_id": f"support-{ticket_id}", "created_at": created_at}
+                item.update(resolved.get(ticket_id, {}))
+                if statuses and item.get("status") not in statuses:
+                    continue
+                tickets.append(item)
+                if len(tickets) >= limit:
+                    break
+            if len(chunk) < size:
+                # The index ran out; exhausted unless the page filled up before the chunk's end
+                exhausted = not chunk or position == (chunk[-1][0], chunk[-1][1])
+                break
+        return {
+            "tickets": tickets,
+            "count": len(tickets),
+            "scanned": scanned,
+            "next_cursor": encode_list_cursor(*position) if position and not exhausted else None,
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self._stats,
+                "pending": sum(len(entries) for entries in self._pending.values()),
+                "cached_buckets": len(self._closed),
+            }
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Lightweight per-ticket tracing for the Customer Support System
+Records spans for the workflow, its activities, agent tool calls, LLM calls (with
+token counts) and Dapr state/pubsub calls. The ticket ID is the trace ID and is
+carried in a context variable, so spans opened in tools, chat clients and pooled
+Dapr clients attach to the activity that triggered them. Context variables don't
+follow work onto other threads or event loops on their own; agent_runtime copies
+the caller's context into agent runs and offloaded tools.
+
+Finished spans are kept in memory for the most recent tickets (served by
+GET /support/trace/{ticket_id}) and optionally exported as JSON lines to a file
+and/or the log, so traces are available offline without a collector. Listeners
+(e.g. the Prometheus metrics) see every finished span, also when spans are not
+stored.
+"""
+
+import functools
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Dapr client methods recorded as spans, with the arguments worth keeping as attributes
+TRACED_DAPR_METHODS = {
+    "get_state": ("store_name", "key"),
+    "get_bulk_state": ("store_name",),
+    "save_state": ("store_name", "key"),
+    "save_bulk_state": ("store_name",),
+    "delete_state": ("store_name", "key"),
+    "query_state": ("store_name",),
+    "publish_event": ("pubsub_name", "topic_name"),
+}
+
+
+# Span IDs: a counter from a random start is unique per process and much cheaper than uuid4
+_span_ids = itertools.count(random.getrandbits(63))
+
+
+class Span:
+    __slots__ = ("ticket_id", "span_id", "parent_id", "name", "kind", "start", "end", "attributes", "status")
+
+    def __init__(self, ticket_id: str, name: str, kind: str, parent_id: Optional[str] = None,
+                 span_id: Optional[str] = None, start: Optional[float] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.ticket_id = ticket_id
+        self.span_id = span_id or f"{next(_span_ids):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = start if start is not None else time.time()
+        self.end: Optional[float] = None
+        self.attributes = attributes or {}
+        self.status = "ok"
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ticket_id": self.ticket_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start,
+            "end": self.end,
+            "duration_ms": round((self.end - self.start) * 1000, 3) if self.end is not None else None,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def _timestamp(value) -> float:
+    return value.replace(tzinfo=value.tzinfo or timezone.utc).timestamp() if isinstance(value, datetime) else float(value)
+
+
+def workflow_span_id(ticket_id: str) -> str:
+    """Deterministic ID of a ticket's root span, so activities can attach to it across replays"""
+    return f"{ticket_id}/workflow"
+
+
+class Tracer:
+    """Collects spans per ticket in LRU order and hands finished ones to the exporters and listeners
+
+    With store=False spans are still recorded and passed to the listeners, but not kept
+    for GET /support/trace or exported. If every listener names the span kinds it reads,
+    spans of other kinds (agent runs, Dapr calls) are then not recorded at all.
+    """
+
+    def __init__(self, enabled: bool = True, max_tickets: int = 1000, file_path: Optional[str] = None,
+                 console: bool = False, store: bool = True):
+        self.enabled = enabled
+        self.store = store
+        self.max_tickets = max_tickets
+        self.file_path = file_path if store else None
+        self.console = console and store
+        self._tickets: "OrderedDict[str, Dict[str, Span]]" = OrderedDict()
+        # Spans opened with start_span() and not finished yet, e.g. running workflows
+        self._open: Dict[Tuple[str, str], Span] = {}
+        self._listeners: List[Callable[[Span], None]] = []
+        # Span kinds the listeners read; None while any listener wants every kind
+        self._listener_kinds: Optional[set] = set()
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+
+    def add_listener(self, listener: Callable[[Span], None], kinds: Optional[Iterable[str]] = None):
+        """Call `listener` with every finished span (of `kinds`, when given)"""
+        self._listeners.append(listener)
+        if kinds is None:
+            self._listener_kinds = None
+        elif self._listener_kinds is not None:
+            self._listener_kinds.update(kinds)
+
+    def _skipped(self, kind: str) -> bool:
+        """Spans nobody reads: not stored, and of a kind no listener wants"""
+        return not self.store and self._listener_kinds is not None and kind not in self._listener_kinds
+
+    # === Recording ===
+    def span(self, name: str, kind: str = "internal", ticket_id: Optional[str] = None,
+             parent_id: Optional[str] = None, **attributes) -> "_SpanScope":
+        """Record the `with` block as a span of `ticket_id` (or of the enclosing span's ticket)
+
+        Outside any ticket the block runs untraced and the yielded span is None.
+        """
+        parent = _current_span.get()
+        ticket_id = ticket_id or (parent.ticket_id if parent else None)
+        if not self.enabled or not ticket_id or self._skipped(kind):
+            return _UNTRACED
+        if parent_id is None and parent is not None and parent.ticket_id == ticket_id:
+            parent_id = parent.span_id
+        span = Span(ticket_id, name, kind, parent_id, attributes=attributes)
+        self._add(span)
+        return _SpanScope(self, span)
+
+    def start_span(self, ticket_id: str, name: str, kind: str = "internal", span_id: Optional[str] = None,
+                   parent_id: Optional[str] = None, start=None, **attributes) -> Optional[Span]:
+        """Open a span that is finished later with end_span(), e.g. across workflow replays"""
+        if not self.enabled or self._skipped(kind):
+            return None
+        with self._lock:
+            existing = self._open.get((ticket_id, span_id)) if span_id else None
+            if existing is not None:
+                return existing
+            span = Span(ticket_id, name, kind, parent_id, span_id,
+                        _timestamp(start) if start is not None else None, attributes)
+            self._open[(ticket_id, span.span_id)] = span
+        self._add(span)
+        return span
+
+    def end_span(self, ticket_id: str, span_id: str, end=None, status: str = "ok", **attributes):
+        """Finish a span opened with start_span(); unknown spans are ignored"""
+        if not self.enabled:
+            return
+        with self._lock:
+            span = self._open.get((ticket_id, span_id))
+        if span is None or span.end is not None:
+            return
+        span.status = status
+        span.set(**attributes)
+        self.finish(span, _timestamp(end) if end is not None else None)
+
+    def release(self, ticket_id: str, span_id: str):
+        """Stop holding an open span without finishing it, e.g. while its workflow is parked on a timer
+
+        A later start_span() with the same ID (and start) opens it again, so end_span() still works.
+        """
+        with self._lock:
+            self._open.pop((ticket_id, span_id), None)
+
+    def record(self, ticket_id: str, name: str, kind: str, start, end, parent_id: Optional[str] = None, **attributes):
+        """Record an already finished span, e.g. a wait measured in workflow time"""
+        span = self.start_span(ticket_id, name, kind, parent_id=parent_id, start=start, **attributes)
+        if span is not None:
+            self.finish(span, _timestamp(end))
+
+    def finish(self, span: Span, end: Optional[float] = None):
+        span.end = end if end is not None else time.time()
+        key = (span.ticket_id, span.span_id)
+        if key in self._open:
+            with self._lock:
+                self._open.pop(key, None)
+        self._export(span)
+        for listener in self._listeners:
+            try:
+                listener(span)
+            except Exception as e:
+                logger.warning(f"Span listener failed: {e}")
+
+    def open_span_count(self, kind: str) -> int:
+        """Spans of `kind` opened with start_span() and not finished yet"""
+        with self._lock:
+            return sum(1 for span in self._open.values() if span.kind == kind)
+
+    def _add(self, span: Span):
+        if not self.store:
+            return
+        with self._lock:
+            spans = self._tickets.get(span.ticket_id)
+            if spans is None:
+                spans = self._tickets[span.ticket_id] = {}
+            self._tickets.move_to_end(span.ticket_id)
+            spans[span.span_id] = span
+            while len(self._tickets) > self.max_tickets:
+                self._tickets.popitem(last=False)
+
+    def _export(self, span: Span):
+        if not (self.file_path or self.console):
+            return
+        line = json.dumps(span.to_dict(), default=str)
+        if self.console:
+            logger.info(f"span {line}")
+        if self.file_path:
+            with self._file_lock, open(self.file_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    # === Instrumentation helpers ===
+    def traced(self, kind: str, name: Optional[str] = None):
+        """Decorator recording every call of a function as a span of the current ticket"""
+        def decorate(func: Callable) -> Callable:
+            span_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or _current_span.get() is None:
+                    return func(*args, **kwargs)
+                # Arguments are only kept for stored traces
+                attributes = {"arguments": _summarize(kwargs)} if self.store else {}
+                with self.span(span_name, kind, **attributes) as span:
+                    result = func(*args, **kwargs)
+                    if span is not None and isinstance(result, dict) and "error" in result:
+                        span.status = "error"
+                        span.set(error=str(result["error"]))
+                    return result
+            return wrapper
+        return decorate
+
+    def traced_activity(self, ticket_from_instance: Callable[[str], str]):
+        """Decorator for workflow activities: one span per execution, child of the ticket's workflow span"""
+        def decorate(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(ctx, *args, **kwargs):
+                instance_id = getattr(ctx, "workflow_id", None) or getattr(ctx, "instance_id", None)
+                if not self.enabled or not instance_id:
+                    return func(ctx, *args, **kwargs)
+                ticket_id = ticket_from_instance(instance_id)
+                with self.span(func.__name__, "activity", ticket_id=ticket_id,
+                               parent_id=workflow_span_id(ticket_id)) as span:
+                    result = func(ctx, *args, **kwargs)
+                    if span is not None and isinstance(result, dict) and "error" in result:
+                        span.status = "error"
+                        span.set(error=str(result["error"]))
+                    return result
+            return wrapper
+        return decorate
+
+    def trace_chat_client(self, llm):
+        """Record llm.generate() calls as LLM spans with model and token counts; returns the same client"""
+        if not self.enabled or getattr(llm, "_tracer", None) is self:
+            return llm
+        generate = llm.generate
+
+        def traced_generate(*args, **kwargs):
+            if _current_span.get() is None:
+                return generate(*args, **kwargs)
+            model = (kwargs.get("model") or kwargs.get("llm_component")
+                     or getattr(llm, "model", None) or getattr(llm, "_llm_component", None))
+            with self.span("llm.generate", "llm", model=model, client=type(llm).__name__) as span:
+                response = generate(*args, **kwargs)
+                if span is None:
+                    return response
+                metadata = getattr(response, "metadata", None) or {}
+                usage = metadata.get("usage") or {}
+                span.set(
+                    prompt_tokens=usage.get("prompt_tokens"),
+                    completion_tokens=usage.get("completion_tokens"),
+                    total_tokens=usage.get("total_tokens"),
+                    # Prompt tokens the provider served from its prefix cache
+                    cached_tokens=(usage.get("prompt_tokens_details") or {}).get("cached_tokens"),
+                    cache=metadata.get("cache"),
+                )
+                return response
+
+        object.__setattr__(llm, "generate", traced_generate)
+        object.__setattr__(llm, "_tracer", self)
+        return llm
+
+    def trace_dapr_client(self, client):
+        """Proxy recording state and pubsub calls of a DaprClient as spans of the current ticket"""
+        return _TracedDaprClient(client, self) if self.enabled and self.store else client
+
+    # === Reading ===
+    def spans(self, ticket_id: str) -> List[Dict[str, Any]]:
+        """Every span of a ticket, from memory or, after a restart, from the trace file"""
+        with self._lock:
+            spans = list(self._tickets.get(ticket_id, {}).values())
+        if spans:
+            return [span.to_dict() for span in spans]
+        return self._spans_from_file(ticket_id)
+
+    def _spans_from_file(self, ticket_id: str) -> List[Dict[str, Any]]:
+        if not self.file_path:
+            return []
+        found: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self.file_path, encoding="utf-8") as f:
+                for line in f:
+                    if ticket_id in line:
+                        span = json.loads(line)
+                        if span.get("ticket_id") == ticket_id:
+                            found[span["span_id"]] = span
+        except FileNotFoundError:
+            pass
+        return list(found.values())
+
+    def tree(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        """Spans of a ticket nested by parent, with durations; None if nothing was recorded"""
+        spans = self.spans(ticket_id)
+        if not spans:
+            return None
+        now = time.time()
+        nodes = {}
+        for span in sorted(spans, key=lambda s: s["start"]):
+            node = dict(span, children=[])
+            if node["end"] is None:
+                node["in_progress"] = True
+                node["duration_ms"] = round((now - node["start"]) * 1000, 3)
+            nodes[node["span_id"]] = node
+        roots = []
+        for node in nodes.values():
+            parent = nodes.get(node["parent_id"]) if node["parent_id"] else None
+            (parent["children"] if parent else roots).append(node)
+        start = min(node["start"] for node in nodes.values())
+        end = max(node["end"] or now for node in nodes.values())
+        return {
+            "ticket_id": ticket_id,
+            "span_count": len(nodes),
+            "start": start,
+            "duration_ms": round((end - start) * 1000, 3),
+            "spans": roots,
+        }
+
+
+class _SpanScope:
+    """The `with` block of Tracer.span(); a plain class, cheaper per span than a generator context manager"""
+    __slots__ = ("tracer", "span", "token")
+
+    def __init__(self, tracer: Optional[Tracer], span: Optional[Span]):
+        self.tracer = tracer
+        self.span = span
+        self.token = None
+
+    def __enter__(self) -> Optional[Span]:
+        if self.span is not None:
+            self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        span = self.span
+        if span is None:
+            return False
+        if exc is not None:
+            span.status = "error"
+            span.set(error=str(exc))
+        _current_span.reset(self.token)
+        self.tracer.finish(span)
+        return False
+
+
+_UNTRACED = _SpanScope(None, None)
+
+
+class _TracedDaprClient:
+    """Forwards to a DaprClient, timing the methods in TRACED_DAPR_METHODS"""
+
+    def __init__(self, client, tracer: Tracer):
+        self._client = client
+        self._tracer = tracer
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._client, name)
+        argument_names = TRACED_DAPR_METHODS.get(name)
+        if argument_names is None or not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def traced(*args, **kwargs):
+            if _current_span.get() is None:
+                return attribute(*args, **kwargs)
+            attributes = dict(zip(argument_names, args))
+            attributes.update({key: kwargs[key] for key in argument_names if key in kwargs})
+            with self._tracer.span(f"dapr.{name}", "dapr", **attributes):
+                return attribute(*args, **kwargs)
+        return traced
+
+
+def _summarize(arguments: Dict[str, Any], limit: int = 200) -> Dict[str, Any]:
+    """Tool arguments as span attributes, with long values truncated"""
+    summary = {}
+    for key, value in arguments.items():
+        text = value if isinstance(value, str) else json.dumps(value, default=str)
+        summary[key] = text if len(text) <= limit else text[:limit] + "..."
+    return summary
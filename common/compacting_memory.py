@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Token-budgeted conversation memory for long agent sessions, shared by samples 01-04
+ConversationDaprStateMemory keeps a session's whole history under one key: every
+added message re-reads and rewrites it, and agents that build prompts from memory
+resend all of it on every turn. CompactingDaprStateMemory keeps a rolling window
+of recent messages instead, plus a running summary of everything older:
+
+  <session>:window   unsummarized messages, oldest first
+  <session>:summary  {"summary": ..., "messages": <messages folded in so far>}
+
+When the window outgrows its share of the token budget, the oldest whole turns
+(a user message up to the next one, so tool calls stay with their results) are
+folded into the summary by a cheap model, e.g. the `openai-mini` Conversation API
+component. Summarizing runs in the background and the window is trimmed once it
+finishes. Loads and writes stay proportional to the window, whatever the session's
+length. Without a summarizer, evicted turns are dropped (a plain rolling window).
+
+Token counts are estimates (~4 characters per token), like the LLM response cache's.
+"""
+
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from dapr.clients.grpc._state import StateItem
+from dapr_agents.memory import ConversationDaprStateMemory
+from dapr_agents.types import BaseMessage
+from pydantic import Field, PrivateAttr
+
+from common.llm_cache import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# (previous summary, messages to fold in, token limit) -> new summary
+Summarizer = Callable[[str, List[Dict[str, Any]], int], str]
+
+SUMMARY_PROMPT = (
+    "You maintain the running summary of a conversation between a user and an assistant. "
+    "Update the summary with the new messages below. Keep facts, names, numbers, user "
+    "preferences, decisions and open requests; drop greetings and repetition. Answer with "
+    "the updated summary only, at most {words} words."
+)
+
+_JSON = {"contentType": "application/json"}
+
+# Shared by every session: a few threads are plenty for occasional summaries
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _background(fn, *args):
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="memory-compaction")
+    return _executor.submit(fn, *args)
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    """Estimated prompt tokens of one message, including tool call arguments"""
+    content = message.get("content")
+    if content is not None and not isinstance(content, str):
+        content = json.dumps(content, default=str)
+    tokens = 4 + estimate_tokens(content or "")
+    for call in message.get("tool_calls") or []:
+        function = call.get("function", {}) if isinstance(call, dict) else {}
+        tokens += estimate_tokens(f"{function.get('name', '')}{function.get('arguments', '')}")
+    return tokens
+
+
+def render_transcript(messages: List[Dict[str, Any]], max_tool_chars: int = 500) -> str:
+    """Messages as `role: text` lines for the summarizer; long tool results are cut"""
+    lines = []
+    for message in messages:
+        role = message.get("role", "unknown")
+        content = message.get("content") or ""
+        if not isinstance(content, str):
+            content = json.dumps(content, default=str)
+        if role == "tool" and len(content) > max_tool_chars:
+            content = content[:max_tool_chars] + " ..."
+        for call in message.get("tool_calls") or []:
+            function = call.get("function", {}) if isinstance(call, dict) else {}
+            content += f" [called {function.get('name')}({function.get('arguments', '')})]"
+        lines.append(f"{role}: {content.strip()}")
+    return "\n".join(lines)
+
+
+def conversation_summarizer(component: str = "openai-mini", temperature: float = 0.0) -> Summarizer:
+    """Summarizer backed by a Dapr Conversation API component"""
+    from dapr.clients import DaprClient
+    from dapr.clients.grpc.conversation import (
+        ConversationInputAlpha2, ConversationMessage, ConversationMessageContent,
+        ConversationMessageOfSystem, ConversationMessageOfUser,
+    )
+
+    def summarize(previous: str, messages: List[Dict[str, Any]], max_tokens: int) -> str:
+        text = (f"Current summary:\n{previous or '(none)'}\n\n"
+                f"New messages:\n{render_transcript(messages)}")
+        inputs = [ConversationInputAlpha2(messages=[
+            ConversationMessage(of_system=ConversationMessageOfSystem(
+                content=[ConversationMessageContent(text=SUMMARY_PROMPT.format(words=max(20, max_tokens * 3 // 4)))])),
+            ConversationMessage(of_user=ConversationMessageOfUser(
+                content=[ConversationMessageContent(text=text)])),
+        ])]
+        with DaprClient() as client:
+            response = client.converse_alpha2(name=component, inputs=inputs, temperature=temperature)
+        return response.outputs[0].choices[0].message.content or ""
+
+    return summarize
+
+
+class CompactingDaprStateMemory(ConversationDaprStateMemory):
+    """ConversationDaprStateMemory bounded by a token budget: recent window plus running summary"""
+
+    token_budget: int = Field(default=4000, description="Tokens of summary plus window returned by get_messages")
+    summary_tokens: Optional[int] = Field(default=None, description="Summary length limit (default: a quarter of the budget)")
+    low_watermark: float = Field(default=0.5, description="Share of the window budget left after a compaction")
+    summarizer: Optional[Summarizer] = Field(default=None, description="Folds evicted turns into the summary; None drops them")
+    background: bool = Field(default=True, description="Summarize on a background thread instead of inside add_message")
+
+    _summary: str = PrivateAttr(default="")
+    _summarized: int = PrivateAttr(default=0)
+    _window: List[Dict[str, Any]] = PrivateAttr(default_factory=list)
+    _loaded: bool = PrivateAttr(default=False)
+    _compacting: bool = PrivateAttr(default=False)
+    _pending_future: Any = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default_factory=threading.RLock)
+    _save_lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _stats: Dict[str, int] = PrivateAttr(default_factory=lambda: {
+        "compactions": 0, "summarized_messages": 0, "dropped_messages": 0, "summary_errors": 0, "saves": 0,
+    })
+
+    @property
+    def summary_limit(self) -> int:
+        return self.summary_tokens if self.summary_tokens is not None else self.token_budget // 4
+
+    @property
+    def window_budget(self) -> int:
+        return max(1, self.token_budget - self.summary_limit)
+
+    def _key(self, part: str) -> str:
+        return f"{self.session_id}:{part}"
+
+    # === Storage ===
+    def _load(self):
+        if self._loaded:
+            return
+        keys = [self._key("summary"), self._key("window"), str(self.session_id)]
+        items = {item.key: item.data for item in self.dapr_store.get_bulk_state(keys) if item.data}
+        with self._lock:
+            if self._loaded:
+                return
+            if keys[0] in items:
+                summary = json.loads(items[keys[0]])
+                self._summary, self._summarized = summary.get("summary", ""), summary.get("messages", 0)
+            if keys[1] in items:
+                self._window = json.loads(items[keys[1]])
+            elif keys[2] in items:
+                # Session written by ConversationDaprStateMemory: compacted on the next add
+                self._window = json.loads(items[keys[2]])
+                logger.info(f"Migrating {len(self._window)} message(s) of session {self.session_id}")
+            self._loaded = True
+
+    def _save(self, summary: bool = False):
+        # Snapshots are taken and written in order, so a slow older save never overwrites a newer one
+        with self._save_lock:
+            with self._lock:
+                values = {"window": self._window}
+                if summary:
+                    values["summary"] = {"summary": self._summary, "messages": self._summarized}
+                states = [StateItem(key=self._key(part), value=json.dumps(value), metadata=_JSON)
+                          for part, value in values.items()]
+                self._stats["saves"] += 1
+            self.dapr_store.save_bulk_state(states)
+
+    # === MemoryBase ===
+    def add_message(self, message: Union[Dict[str, Any], BaseMessage]) -> None:
+        self.add_messages([message])
+
+    def add_messages(self, messages: List[Union[Dict[str, Any], BaseMessage]]) -> None:
+        """Append to the window with one write; starts a compaction when it outgrows its budget"""
+        self._load()
+        now = datetime.now().isoformat() + "Z"
+        with self._lock:
+            for message in messages:
+                message = dict(self._convert_to_dict(message))
+                message.update({"sessionId": self.session_id, "createdAt": now})
+                self._window.append(message)
+            compact = self._should_compact()
+            if compact:
+                self._compacting = True
+        self._save()
+        if compact:
+            if self.background and self.summarizer is not None:
+                self._pending_future = _background(self._compact)
+            else:
+                self._compact()
+
+    def get_messages(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The running summary (as a system message) followed by the window
+
+        `limit` keeps only the newest messages, starting at a user message so tool
+        results are never separated from their calls.
+        """
+        self._load()
+        with self._lock:
+            window = list(self._window)
+            summary = self._summary
+        if limit is not None and len(window) > limit:
+            start = len(window) - limit
+            start = next((i for i in range(start, len(window)) if window[i].get("role") == "user"), start)
+            window = window[start:]
+        if not summary:
+            return window
+        return [{"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}] + window
+
+    def reset_memory(self) -> None:
+        self.wait()
+        for key in (self._key("summary"), self._key("window"), str(self.session_id)):
+            self.dapr_store.delete_state(key)
+        with self._lock:
+            self._summary, self._summarized, self._window = "", 0, []
+        logger.info(f"Memory reset for session {self.session_id} completed.")
+
+    # === Compaction ===
+    def _window_tokens(self, messages: Optional[List[Dict[str, Any]]] = None) -> int:
+        return sum(message_tokens(m) for m in (self._window if messages is None else messages))
+
+    def _should_compact(self) -> bool:
+        return not self._compacting and self._window_tokens() > self.window_budget
+
+    def _cut(self) -> int:
+        """Messages to evict: whole turns from the front until the rest fits the low watermark
+
+        The newest turn always stays, even when it alone is over budget.
+        """
+        target = self.window_budget * self.low_watermark
+        remaining = self._window_tokens()
+        start = 0
+        for boundary in (i for i, m in enumerate(self._window) if i > 0 and m.get("role") == "user"):
+            remaining -= self._window_tokens(self._window[start:boundary])
+            start = boundary
+            if remaining <= target:
+                break
+        return start
+
+    def _compact(self):
+        try:
+            with self._lock:
+                cut = self._cut()
+                evicted = self._window[:cut]
+                summary = self._summary
+            if not evicted:
+                return
+            outcome = "dropped_messages"
+            if self.summarizer is not None:
+                try:
+                    summary = self._fit(self.summarizer(summary, evicted, self.summary_limit))
+                    outcome = "summarized_messages"
+                except Exception as e:
+                    with self._lock:
+                        self._stats["summary_errors"] += 1
+                        # Keep the turns for the next attempt, unless the window is far over budget
+                        retry = self._window_tokens() <= 2 * self.window_budget
+                    if retry:
+                        logger.warning(f"Summarizing session {self.session_id} failed, will retry: {e}")
+                        return
+                    logger.warning(f"Summarizing session {self.session_id} failed, dropping {cut} message(s): {e}")
+            with self._lock:
+                # Only appends happened meanwhile, so the evicted messages are still the first `cut`
+                del self._window[:cut]
+                self._summary = summary
+                self._summarized += cut
+                self._stats["compactions"] += 1
+                self._stats[outcome] += cut
+            self._save(summary=True)
+        except Exception as e:
+            logger.error(f"Compacting session {self.session_id} failed: {e}")
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def _fit(self, summary: str) -> str:
+        """Cut a summary that came back longer than asked for at a word boundary"""
+        summary = summary.strip()
+        limit = self.summary_limit * 4
+        return summary if len(summary) <= limit else summary[:limit].rsplit(" ", 1)[0] + " ..."
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until a background compaction in progress has finished"""
+        future = self._pending_future
+        if future is not None:
+            future.result(timeout=timeout)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "window_messages": len(self._window),
+                "window_tokens": self._window_tokens(),
+                "summary_tokens": estimate_tokens(self._summary),
+                "summarized_total": self._summarized,
+                "token_budget": self.token_budget,
+            }
+
+
+def conversation_memory_from_env(store_name: str = "statestore", session_id: Optional[str] = None):
+    """Session memory configured by MEMORY_* environment variables
+
+    MEMORY_TOKEN_BUDGET=0 falls back to the unbounded ConversationDaprStateMemory.
+    """
+    budget = int(os.getenv("MEMORY_TOKEN_BUDGET", "4000"))
+    if budget <= 0:
+        return ConversationDaprStateMemory(store_name=store_name, session_id=session_id)
+    component = os.getenv("MEMORY_SUMMARY_COMPONENT", "openai-mini")
+    summary_tokens = os.getenv("MEMORY_SUMMARY_TOKENS")
+    return CompactingDaprStateMemory(
+        store_name=store_name,
+        session_id=session_id,
+        token_budget=budget,
+        summary_tokens=int(summary_tokens) if summary_tokens else None,
+        summarizer=conversation_summarizer(component) if component else None,
+        background=os.getenv("MEMORY_SUMMARY_BACKGROUND", "true").lower() == "true",
+    )
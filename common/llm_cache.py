@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Application-level response cache for LLM calls, shared by all samples
+Sits in front of ChatClientBase.generate() (OpenAIChatClient, DaprChatClient)
+and raw DaprClient.converse_alpha2() calls.
+
+Two tiers:
+  exact     key = hash of the normalized messages (whitespace collapsed, tool call
+            IDs dropped), model / component, temperature, tool names and
+            response format
+  semantic  optional; among entries with the same model, temperature, system
+            prompt and tools, reuse the most similar conversation above a cosine
+            threshold. Only plain-text answers are reused, and only when every
+            identifier-like token (anything containing a digit, e.g. CUST001 or
+            1.12.0) matches exactly.
+
+Entries are kept in LRU order in memory and written behind to a Dapr state
+store, so a restarted process starts warm. Hit rate and tokens saved are
+tracked per cache.
+"""
+
+import copy
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9._-]*")
+
+
+def normalize_text(text: Any) -> str:
+    if text is None:
+        return ""
+    if not isinstance(text, str):
+        text = json.dumps(text, sort_keys=True, default=str)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _hash(material: Any) -> str:
+    return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _identifiers(text: str) -> List[str]:
+    return sorted({token for token in _TOKEN.findall(text.lower()) if any(c.isdigit() for c in token)})
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for providers that don't report usage (or report zero)"""
+    return max(1, len(text) // 4) if text else 0
+
+
+class _Entry:
+    __slots__ = ("kind", "payload", "prompt_tokens", "completion_tokens", "group", "identifiers", "embedding")
+
+    def __init__(self, kind, payload, prompt_tokens, completion_tokens, group=None, identifiers=None, embedding=None):
+        self.kind = kind
+        self.payload = payload
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.group = group
+        self.identifiers = identifiers
+        self.embedding = embedding
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "payload": self.payload,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "group": self.group,
+            "identifiers": self.identifiers,
+            "embedding": self.embedding.tolist() if self.embedding is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "_Entry":
+        embedding = data.get("embedding")
+        return cls(
+            data["kind"], data["payload"], data.get("prompt_tokens", 0), data.get("completion_tokens", 0),
+            data.get("group"), data.get("identifiers"),
+            np.asarray(embedding, dtype=np.float32) if embedding is not None else None,
+        )
+
+
+class LLMResponseCache:
+    """LRU cache of LLM responses with an optional similarity tier, persisted to a Dapr state store"""
+
+    def __init__(self, store_name: Optional[str] = None, max_entries: int = 1000,
+                 similarity_threshold: Optional[float] = None, max_temperature: float = 1.0,
+                 embedding_dim: int = 256, key_prefix: str = "llm-cache"):
+        self.store_name = store_name
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.max_temperature = max_temperature
+        self.embedding_dim = embedding_dim
+        self.key_prefix = key_prefix
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._stats = {
+            "lookups": 0,
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "evictions": 0,
+            "prompt_tokens_saved": 0,
+            "completion_tokens_saved": 0,
+        }
+
+    # === Keys ===
+    def bypass(self, temperature: Optional[float], stream: bool = False) -> bool:
+        """Streaming and high-temperature (deliberately random) calls are never cached"""
+        if stream or (temperature is not None and float(temperature) >= self.max_temperature):
+            with self._lock:
+                self._stats["bypassed"] += 1
+            return True
+        return False
+
+    def embed(self, text: str) -> np.ndarray:
+        """Signed feature hashing of unigrams and bigrams, L2-normalized"""
+        tokens = _TOKEN.findall(text.lower())
+        vector = np.zeros(self.embedding_dim, dtype=np.float32)
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            h = zlib.crc32(feature.encode())
+            vector[h % self.embedding_dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    # === Lookup / store ===
+    def get(self, key: str, group: Optional[str] = None, text: Optional[str] = None) -> Optional[Tuple[str, Any]]:
+        """Return (tier, payload) for a cached response, or None on a miss"""
+        with self._lock:
+            self._stats["lookups"] += 1
+            tier = "exact"
+            if key not in self._entries and self.similarity_threshold and group and text:
+                key, tier = self._similar(group, text), "semantic"
+            entry = self._entries.get(key) if key else None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats[f"{tier}_hits"] += 1
+            self._stats["prompt_tokens_saved"] += entry.prompt_tokens
+            self._stats["completion_tokens_saved"] += entry.completion_tokens
+            return tier, copy.deepcopy(entry.payload)
+
+    def _similar(self, group: str, text: str) -> Optional[str]:
+        identifiers = _identifiers(text)
+        candidates = [
+            (key, entry) for key, entry in self._entries.items()
+            if entry.group == group and entry.embedding is not None and entry.identifiers == identifiers
+        ]
+        if not candidates:
+            return None
+        similarities = np.stack([entry.embedding for _, entry in candidates]) @ self.embed(text)
+        best = int(np.argmax(similarities))
+        return candidates[best][0] if similarities[best] >= self.similarity_threshold else None
+
+    def put(self, key: str, kind: str, payload: Any, prompt_tokens: int, completion_tokens: int,
+            group: Optional[str] = None, text: Optional[str] = None):
+        """Cache a response; `group` and `text` make it eligible for similarity hits"""
+        semantic = bool(self.similarity_threshold and group and text)
+        entry = _Entry(
+            kind, payload, prompt_tokens, completion_tokens,
+            group if semantic else None,
+            _identifiers(text) if semantic else None,
+            self.embed(text) if semantic else None,
+        )
+        evicted = []
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+                self._stats["evictions"] += 1
+        if self.store_name:
+            self._enqueue(("save", key, entry), *[("delete", old_key, None) for old_key in evicted])
+
+    def metrics(self) -> Dict[str, Any]:
+        """Hit rate and token savings since start"""
+        with self._lock:
+            hits = self._stats["exact_hits"] + self._stats["semantic_hits"]
+            return {
+                **self._stats,
+                "hit_rate": hits / self._stats["lookups"] if self._stats["lookups"] else 0.0,
+                "tokens_saved": self._stats["prompt_tokens_saved"] + self._stats["completion_tokens_saved"],
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "similarity_threshold": self.similarity_threshold,
+                "store_name": self.store_name,
+            }
+
+    # === Persistence ===
+    def _state_key(self, key: str) -> str:
+        return f"{self.key_prefix}||{key}"
+
+    def _index_key(self) -> str:
+        return f"{self.key_prefix}||index"
+
+    def load(self):
+        """Warm the cache from the state store (most recently used entries last)"""
+        if not self.store_name:
+            return
+        from dapr.clients import DaprClient
+        try:
+            with DaprClient() as client:
+                index = client.get_state(self.store_name, self._index_key())
+                keys = json.loads(index.data)[-self.max_entries:] if index.data else []
+                items = client.get_bulk_state(self.store_name, [self._state_key(k) for k in keys], parallelism=4).items if keys else []
+            loaded = {item.key: item.data for item in items if item.data}
+            with self._lock:
+                for key in keys:
+                    data = loaded.get(self._state_key(key))
+                    if data:
+                        self._entries[key] = _Entry.from_dict(json.loads(data))
+            logger.info(f"LLM response cache loaded {len(self._entries)} entr{'y' if len(self._entries) == 1 else 'ies'} from {self.store_name}")
+        except Exception as e:
+            logger.warning(f"LLM response cache starting cold, could not load from {self.store_name}: {e}")
+
+    def _enqueue(self, *operations):
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_behind, name="llm-cache-writer", daemon=True)
+                    self._writer.start()
+        for operation in operations:
+            self._writes.put(operation)
+
+    def _write_behind(self):
+        from dapr.clients import DaprClient
+        from dapr.clients.grpc._state import StateItem
+        client = None
+        while True:
+            batch = [self._writes.get()]
+            while not self._writes.empty():
+                batch.append(self._writes.get_nowait())
+            if any(operation is None for operation in batch):
+                batch = [operation for operation in batch if operation is not None]
+                stop = True
+            else:
+                stop = False
+            try:
+                if batch:
+                    client = client or DaprClient()
+                    saves = [StateItem(key=self._state_key(key), value=json.dumps(entry.to_dict()))
+                             for action, key, entry in batch if action == "save"]
+                    with self._lock:
+                        index = list(self._entries)
+                    saves.append(StateItem(key=self._index_key(), value=json.dumps(index)))
+                    client.save_bulk_state(self.store_name, saves)
+                    for action, key, _ in batch:
+                        if action == "delete":
+                            client.delete_state(self.store_name, self._state_key(key))
+            except Exception as e:
+                logger.warning(f"LLM response cache could not persist {len(batch)} change(s): {e}")
+                if client is not None:
+                    client.close()
+                    client = None
+            if stop:
+                if client is not None:
+                    client.close()
+                return
+
+    def close(self, timeout: float = 5.0):
+        """Flush pending writes"""
+        if self._writer is not None:
+            self._writes.put(None)
+            self._writer.join(timeout=timeout)
+            self._writer = None
+
+
+# === Chat clients ===
+def _message_key(message: Dict[str, Any]) -> Dict[str, Any]:
+    # Tool call IDs are random per call, so they are left out of the key
+    key = {"role": message.get("role"), "content": normalize_text(message.get("content"))}
+    if message.get("name"):
+        key["name"] = message["name"]
+    if message.get("tool_calls"):
+        key["tool_calls"] = [
+            {"name": call.get("function", {}).get("name"), "arguments": normalize_text(call.get("function", {}).get("arguments"))}
+            for call in message["tool_calls"]
+        ]
+    return key
+
+
+def _tool_names(tools) -> List[str]:
+    names = []
+    for tool in tools or []:
+        if isinstance(tool, dict):
+            names.append(tool.get("function", {}).get("name") or tool.get("name"))
+        else:
+            names.append(getattr(tool, "name", type(tool).__name__))
+    return names
+
+
+def _usage(response, messages: List[Dict[str, Any]], completion: str) -> Tuple[int, int]:
+    usage = (getattr(response, "metadata", None) or {}).get("usage") or {}
+    try:
+        prompt_tokens, completion_tokens = int(usage.get("prompt_tokens", -1)), int(usage.get("completion_tokens", -1))
+    except (TypeError, ValueError):
+        prompt_tokens = completion_tokens = -1
+    if prompt_tokens <= 0 or completion_tokens <= 0:
+        prompt_tokens = sum(estimate_tokens(normalize_text(m.get("content"))) for m in messages)
+        completion_tokens = estimate_tokens(completion)
+    return prompt_tokens, completion_tokens
+
+
+def cache_chat_client(llm, cache: Optional[LLMResponseCache]):
+    """Route llm.generate() through `cache`; returns the same client instance"""
+    if cache is None or getattr(llm, "_llm_cache", None) is cache:
+        return llm
+    from dapr_agents.llm.utils import RequestHandler
+    from dapr_agents.types import LLMChatResponse
+
+    generate = llm.generate
+
+    def cached_generate(messages=None, *, input_data=None, tools=None, response_format=None, **kwargs):
+        temperature = kwargs.get("temperature")
+        if input_data is not None or messages is None or cache.bypass(temperature, kwargs.get("stream", False)):
+            return generate(messages=messages, input_data=input_data, tools=tools, response_format=response_format, **kwargs)
+
+        normalized = [_message_key(m) for m in RequestHandler.normalize_chat_messages(copy.deepcopy(messages))]
+        model = kwargs.get("model") or kwargs.get("llm_component") or getattr(llm, "model", None) or getattr(llm, "_llm_component", None)
+        scope = {
+            "client": type(llm).__name__,
+            "model": model,
+            "temperature": temperature,
+            "tools": _tool_names(tools),
+            "response_format": _hash(response_format.model_json_schema()) if response_format is not None else None,
+        }
+        key = _hash({**scope, "messages": normalized})
+        group = _hash({**scope, "system": [m for m in normalized if m["role"] == "system"]})
+        text = "\n".join(m["content"] for m in normalized if m["role"] != "system")
+
+        hit = cache.get(key, group, text)
+        if hit is not None:
+            tier, payload = hit
+            logger.info(f"LLM response cache {tier} hit ({model})")
+            if response_format is not None:
+                return response_format.model_validate(payload)
+            response = LLMChatResponse.model_validate(payload)
+            response.metadata = {**response.metadata, "cache": tier}
+            return response
+
+        response = generate(messages=messages, tools=tools, response_format=response_format, **kwargs)
+        if response_format is not None and hasattr(response, "model_dump"):
+            payload = response.model_dump(mode="json")
+            prompt_tokens, completion_tokens = _usage(None, normalized, json.dumps(payload))
+            cache.put(key, "structured", payload, prompt_tokens, completion_tokens, group, text)
+        elif isinstance(response, LLMChatResponse):
+            message = response.get_message()
+            content = (message.content if message else "") or ""
+            prompt_tokens, completion_tokens = _usage(response, normalized, content)
+            # Tool-call plans are only reused for exact prompts, never for merely similar ones
+            similar_ok = message is not None and not message.has_tool_calls()
+            cache.put(key, "chat", response.model_dump(mode="json"), prompt_tokens, completion_tokens,
+                      group if similar_ok else None, text if similar_ok else None)
+        return response
+
+    object.__setattr__(llm, "generate", cached_generate)
+    object.__setattr__(llm, "_llm_cache", cache)
+    return llm
+
+
+def cached_converse_alpha2(cache: Optional[LLMResponseCache], client, *, name: str, inputs, temperature=None,
+                           metadata: Optional[Dict[str, str]] = None, **kwargs):
+    """DaprClient.converse_alpha2() with responses served from `cache` when possible"""
+    if cache is None or kwargs.get("tools") or cache.bypass(temperature):
+        return client.converse_alpha2(name=name, inputs=inputs, temperature=temperature, metadata=metadata, **kwargs)
+    from dapr.clients.grpc.conversation import (
+        ConversationResponseAlpha2, ConversationResultAlpha2, ConversationResultAlpha2Choices,
+        ConversationResultAlpha2Message,
+    )
+
+    messages = []
+    for conversation_input in inputs:
+        for message in conversation_input.messages:
+            for role in ("of_system", "of_user", "of_assistant", "of_developer", "of_tool"):
+                part = getattr(message, role, None)
+                if part is not None:
+                    content = " ".join(c.text for c in getattr(part, "content", []) or [])
+                    messages.append({"role": role[3:], "content": normalize_text(content)})
+    scope = {"component": name, "model": (metadata or {}).get("model"), "temperature": temperature}
+    key = _hash({**scope, "messages": messages})
+    group = _hash({**scope, "system": [m for m in messages if m["role"] in ("system", "developer")]})
+    text = "\n".join(m["content"] for m in messages if m["role"] not in ("system", "developer"))
+
+    hit = cache.get(key, group, text)
+    if hit is not None:
+        tier, payload = hit
+        logger.info(f"LLM response cache {tier} hit ({name})")
+        return ConversationResponseAlpha2(
+            context_id=payload.get("context_id"),
+            outputs=[
+                ConversationResultAlpha2(choices=[
+                    ConversationResultAlpha2Choices(
+                        finish_reason=choice["finish_reason"], index=choice["index"],
+                        message=ConversationResultAlpha2Message(content=choice["message"]["content"]),
+                    )
+                    for choice in output["choices"]
+                ])
+                for output in payload["outputs"]
+            ],
+        )
+
+    response = client.converse_alpha2(name=name, inputs=inputs, temperature=temperature, metadata=metadata, **kwargs)
+    choices = [choice for output in response.outputs for choice in output.choices]
+    if choices and not any(choice.message.tool_calls for choice in choices):
+        content = " ".join(choice.message.content or "" for choice in choices)
+        cache.put(key, "conversation", dataclasses.asdict(response), *_usage(None, messages, content), group, text)
+    return response
+
+
+def llm_cache_from_env(default_store: Optional[str] = None) -> Optional[LLMResponseCache]:
+    """Build the cache from LLM_CACHE_* environment variables; None when LLM_CACHE_ENABLED=false"""
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    threshold = os.getenv("LLM_CACHE_SIMILARITY_THRESHOLD")
+    return LLMResponseCache(
+        store_name=os.getenv("LLM_CACHE_STORE", default_store or "") or None,
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000")),
+        similarity_threshold=float(threshold) if threshold else None,
+        max_temperature=float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "1.0")),
+    )
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Process-wide gateway for LLM calls, shared by all samples
+Every LLM call of the process (agent chat clients, Conversation API calls) waits for
+admission here before it reaches the provider:
+
+  rate limits   token buckets for requests and tokens per minute, sized to the
+                provider's quota, so a burst is spread out instead of rejected; token
+                estimates are corrected with the usage the response reports
+  concurrency   an adaptive limit on calls in flight (AIMD): +1 per limit's worth
+                of successful calls, halved on a 429 / RESOURCE_EXHAUSTED or when a
+                call takes longer than the latency target; other failures leave it
+                unchanged
+  lanes         waiting calls are admitted by lane priority (`high` before `normal`
+                before `low`), and `low` may only fill part of the limit, so customer
+                notifications don't queue behind long expert analyses; a call's
+                priority rises the longer it waits, so `low` isn't starved either
+  retries       throttling, timeouts, 5xx and UNAVAILABLE are retried with full-jitter
+                exponential backoff (or the provider's Retry-After), up to max_retries
+
+Errors that aren't retryable, and the last error once retries are used up, are raised
+unchanged. Waits, retries, throttling and the current limit are tracked per lane.
+"""
+
+import collections
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from common.llm_cache import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Lane priorities (lower is admitted first) and the share of the concurrency limit each may fill
+LANES = {"high": 0, "normal": 1, "low": 2}
+LANE_SHARE = {"high": 1.0, "normal": 1.0, "low": 0.75}
+# Seconds of waiting that raise a call's priority by one lane
+AGING_SECONDS = 10.0
+# Factor applied to the concurrency limit on throttling or a slow call
+DECREASE_FACTOR = 0.5
+# Bursts allowed by the rate limits, in seconds of quota: providers enforce per-minute
+# quotas over shorter intervals, so a full minute's worth at once would still be rejected
+BURST_SECONDS = 1.0
+# Completion tokens assumed when admitting a call, before its usage is known
+DEFAULT_COMPLETION_TOKENS = 300
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_GRPC_CODES = {"RESOURCE_EXHAUSTED", "UNAVAILABLE", "DEADLINE_EXCEEDED", "ABORTED"}
+
+
+class TokenBucket:
+    """`rate` units per second, bursts of up to `capacity`; rate 0 means unlimited
+
+    Not thread-safe on its own: the gateway calls it under its lock.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now: float):
+        if self.rate:
+            self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (amounts above the capacity wait for a full bucket)"""
+        if not self.rate:
+            return 0.0
+        missing = min(amount, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount: float):
+        """Take (or, for a negative amount, give back) units; the level may go below zero"""
+        if self.rate:
+            self.level = min(self.capacity, self.level - amount)
+
+
+def _error_chain(error: BaseException):
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def classify_error(error: BaseException) -> Optional[str]:
+    """`throttled`, `retryable`, or None for errors a retry won't fix
+
+    Looks through wrapped errors (OpenAIChatClient re-raises provider errors as ValueError)
+    for an HTTP status code, a gRPC status code, or a timeout / connection error.
+    """
+    for cause in _error_chain(error):
+        status = getattr(cause, "status_code", None) or getattr(getattr(cause, "response", None), "status_code", None)
+        if isinstance(status, int):
+            if status == 429:
+                return "throttled"
+            return "retryable" if status in RETRYABLE_STATUS else None
+        code = getattr(cause, "code", None)
+        if callable(code):
+            try:
+                name = getattr(code(), "name", None)
+            except Exception:
+                name = None
+            if name == "RESOURCE_EXHAUSTED":
+                return "throttled"
+            if name:
+                return "retryable" if name in RETRYABLE_GRPC_CODES else None
+        if isinstance(cause, (TimeoutError, ConnectionError)) or type(cause).__name__ in (
+            "APITimeoutError", "APIConnectionError", "Timeout", "ConnectTimeout", "ReadTimeout",
+        ):
+            return "retryable"
+    return None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked to wait (Retry-After header or a retry_after attribute)"""
+    for cause in _error_chain(error):
+        value = getattr(cause, "retry_after", None)
+        headers = getattr(getattr(cause, "response", None), "headers", None)
+        if value is None and headers is not None:
+            value = headers.get("retry-after")
+        try:
+            if value is not None:
+                return max(0.0, float(value))
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+class _Waiter:
+    __slots__ = ("lane", "priority", "since")
+
+    def __init__(self, lane: str):
+        self.lane = lane
+        self.priority = LANES[lane]
+        self.since = time.monotonic()
+
+
+class LLMGateway:
+    """Admission control, adaptive concurrency and retries for every LLM call of the process"""
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 max_concurrency: int = 16, min_concurrency: int = 1, initial_concurrency: Optional[int] = None,
+                 latency_target: float = 0.0, max_retries: int = 4, retry_base: float = 0.5,
+                 retry_max: float = 20.0):
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.latency_target = latency_target
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.requests = TokenBucket(requests_per_minute / 60, requests_per_minute / 60 * BURST_SECONDS)
+        self.tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute / 60 * BURST_SECONDS)
+        self._limit = float(initial_concurrency or self.max_concurrency)
+        self._in_flight = 0
+        self._waiting: list = []
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._waits: Dict[str, collections.deque] = {}
+        self._decreases = 0
+
+    # === Admission ===
+    def _slots(self, lane: str) -> int:
+        return max(1, math.floor(self._limit * LANE_SHARE[lane]))
+
+    def _next(self, now: float) -> Optional[_Waiter]:
+        """The waiter admitted next: best aged priority among lanes with a free slot"""
+        eligible = [w for w in self._waiting if self._in_flight < self._slots(w.lane)]
+        if not eligible:
+            return None
+        return min(eligible, key=lambda w: (w.priority - (now - w.since) / AGING_SECONDS, w.since))
+
+    def _admit(self, lane: str, tokens: int) -> float:
+        """Block until the call may start; returns the seconds it waited"""
+        waiter = _Waiter(lane)
+        with self._cond:
+            self._waiting.append(waiter)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.requests.refill(now)
+                    self.tokens.refill(now)
+                    timeout = None
+                    if self._next(now) is waiter:
+                        timeout = max(self.requests.delay(1), self.tokens.delay(tokens))
+                        if timeout <= 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            self._in_flight += 1
+                            return now - waiter.since
+                    elif len(self._waiting) > 1:
+                        # Priorities age, so re-evaluate now and then even without a release
+                        timeout = AGING_SECONDS / 10
+                    self._cond.wait(timeout)
+            finally:
+                self._waiting.remove(waiter)
+                self._cond.notify_all()
+
+    def _release(self, seconds: float, outcome: str, tokens_used: int = 0):
+        """Free a slot; `outcome` is "ok", "throttled" or "failed" (a failure leaves the limit as it is)"""
+        with self._cond:
+            self._in_flight -= 1
+            self.tokens.take(tokens_used)
+            now = time.monotonic()
+            slow = self.latency_target and seconds > self.latency_target
+            if outcome == "throttled" or slow:
+                # One decrease per round trip, however many calls in flight saw the same overload
+                if now - self._last_decrease > max(seconds, 0.1):
+                    self._limit = max(self.min_concurrency, self._limit * DECREASE_FACTOR)
+                    self._last_decrease = now
+                    self._decreases += 1
+            elif outcome == "ok":
+                self._limit = min(self.max_concurrency, self._limit + 1 / self._limit)
+            self._cond.notify_all()
+
+    def _count(self, lane: str, **amounts):
+        with self._cond:
+            stats = self._stats.setdefault(lane, {
+                "attempts": 0, "retries": 0, "throttled": 0, "failed": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0,
+            })
+            for name, amount in amounts.items():
+                if name == "wait":
+                    stats["wait_seconds"] += amount
+                    stats["max_wait_seconds"] = max(stats["max_wait_seconds"], amount)
+                    self._waits.setdefault(lane, collections.deque(maxlen=1000)).append(amount)
+                else:
+                    stats[name] += amount
+
+    # === Calls ===
+    def call(self, lane: str, fn: Callable[[], Any], prompt_tokens: int = 0,
+             usage: Optional[Callable[[Any], int]] = None):
+        """Run `fn()` once admitted in `lane`, retrying throttled and transient failures
+
+        `usage(result)` returns the tokens the call actually used, to correct the
+        estimate (prompt_tokens plus DEFAULT_COMPLETION_TOKENS) taken from the token bucket.
+        """
+        if lane not in LANES:
+            raise ValueError(f"Unknown LLM gateway lane: {lane}")
+        estimate = prompt_tokens + DEFAULT_COMPLETION_TOKENS
+        attempt = 0
+        while True:
+            waited = self._admit(lane, estimate)
+            self._count(lane, attempts=1, wait=waited)
+            start = time.monotonic()
+            try:
+                result = fn()
+            except Exception as e:
+                kind = classify_error(e)
+                self._release(time.monotonic() - start, "throttled" if kind == "throttled" else "failed")
+                if kind == "throttled":
+                    self._count(lane, throttled=1)
+                if kind is None or attempt >= self.max_retries:
+                    self._count(lane, failed=1)
+                    raise
+                attempt += 1
+                # Full jitter: spread the retries of a burst instead of sending them back together
+                delay = retry_after(e)
+                if delay is None:
+                    delay = random.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempt))
+                logger.warning(f"LLM call in lane {lane} failed ({kind}: {e}); retry {attempt} in {delay:.2f}s")
+                self._count(lane, retries=1)
+                time.sleep(delay)
+                continue
+            used = 0
+            if usage is not None:
+                try:
+                    used = usage(result) or 0
+                except Exception:
+                    used = 0
+            self._release(time.monotonic() - start, "ok", tokens_used=used - estimate if used else 0)
+            return result
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            lanes = {}
+            for lane, stats in self._stats.items():
+                waits = sorted(self._waits.get(lane, ()))
+                lanes[lane] = {
+                    **stats,
+                    "p95_wait_seconds": waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0,
+                }
+            return {
+                "concurrency_limit": round(self._limit, 2),
+                "in_flight": self._in_flight,
+                "waiting": len(self._waiting),
+                "limit_decreases": self._decreases,
+                "requests_per_minute": self.requests.rate * 60,
+                "tokens_per_minute": self.tokens.rate * 60,
+                "lanes": lanes,
+            }
+
+
+def _chat_tokens(response) -> int:
+    usage = (getattr(response, "metadata", None) or {}).get("usage") or {}
+    return int(usage.get("total_tokens") or 0)
+
+
+def gateway_chat_client(llm, gateway: Optional[LLMGateway], lane: str):
+    """Send llm.generate() calls through `gateway` in `lane`; returns the same client instance
+
+    Apply it first, under any cache, tracing or routing wrappers, so cache hits don't wait
+    for admission. The OpenAI SDK's own retries are turned off: the gateway retries.
+    """
+    if gateway is None or getattr(llm, "_llm_gateway", None) is gateway:
+        return llm
+    client = getattr(llm, "_client", None)
+    if hasattr(client, "with_options"):
+        # OpenAIChatClient keeps its openai.OpenAI client in _client, behind a read-only property
+        llm._client = client.with_options(max_retries=0)
+    generate = llm.generate
+
+    def gated_generate(*args, **kwargs):
+        if kwargs.get("stream"):
+            return generate(*args, **kwargs)
+        messages = kwargs.get("messages", args[0] if args else None)
+        prompt_tokens = estimate_tokens(json.dumps(messages, default=str)) if messages else 0
+        return gateway.call(lane, lambda: generate(*args, **kwargs), prompt_tokens, usage=_chat_tokens)
+
+    object.__setattr__(llm, "generate", gated_generate)
+    object.__setattr__(llm, "_llm_gateway", gateway)
+    return llm
+
+
+class _GatedDaprClient:
+    """DaprClient proxy whose converse_alpha2() calls go through the gateway"""
+
+    def __init__(self, client, gateway: LLMGateway, lane: str):
+        self._client = client
+        self._gateway = gateway
+        self._lane = lane
+
+    def converse_alpha2(self, *args, **kwargs):
+        inputs = kwargs.get("inputs") or []
+        text = " ".join(
+            content.text
+            for conversation_input in inputs
+            for message in getattr(conversation_input, "messages", [])
+            for role in ("of_system", "of_user", "of_assistant", "of_developer", "of_tool")
+            for content in getattr(getattr(message, role, None), "content", None) or []
+        )
+        return self._gateway.call(self._lane, lambda: self._client.converse_alpha2(*args, **kwargs),
+                                  estimate_tokens(text))
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def gateway_dapr_client(client, gateway: Optional[LLMGateway], lane: str):
+    """`client` with its Conversation API calls sent through `gateway` in `lane`"""
+    return _GatedDaprClient(client, gateway, lane) if gateway is not None else client
+
+
+def llm_gateway_from_env() -> Optional[LLMGateway]:
+    """Build the gateway from LLM_GATEWAY_* environment variables; None when LLM_GATEWAY_ENABLED=false"""
+    if os.getenv("LLM_GATEWAY_ENABLED", "true").lower() != "true":
+        return None
+    return LLMGateway(
+        requests_per_minute=float(os.getenv("LLM_GATEWAY_REQUESTS_PER_MINUTE", "0")),
+        tokens_per_minute=float(os.getenv("LLM_GATEWAY_TOKENS_PER_MINUTE", "0")),
+        max_concurrency=int(os.getenv("LLM_GATEWAY_MAX_CONCURRENCY", "16")),
+        min_concurrency=int(os.getenv("LLM_GATEWAY_MIN_CONCURRENCY", "1")),
+        latency_target=float(os.getenv("LLM_GATEWAY_LATENCY_TARGET_MS", "0")) / 1000,
+        max_retries=int(os.getenv("LLM_GATEWAY_MAX_RETRIES", "4")),
+        retry_base=float(os.getenv("LLM_GATEWAY_RETRY_BASE_MS", "500")) / 1000,
+        retry_max=float(os.getenv("LLM_GATEWAY_RETRY_MAX_MS", "20000")) / 1000,
+    )
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Model tiering for LLM calls, shared by all samples
+Routes each call to the cheapest model tier that fits it:
+
+  task class   an agent's kind of work picks its starting tier: `lookup` (tool calls
+               and structured extraction) and `draft` (short customer-facing text)
+               start on the smallest tier, `analysis` on the largest
+  budgets      per-call cost and latency budgets move a call down to cheaper tiers
+               until their estimates fit; latency estimates follow observed calls
+  prompt size  a prompt longer than a tier's max_prompt_tokens moves up a tier
+
+An agent's min_tier and max_tier bound the choice. When a final answer (not a
+tool-call turn) fails the agent's validator, or a structured output fails to parse,
+the same call is repeated on the next larger tier.
+
+Each tier names an OpenAI model and a Dapr Conversation API component, so one router
+serves OpenAIChatClient (`model=`), DaprChatClient (`llm_component=`) and raw
+converse_alpha2 calls. Calls, fallbacks, tokens and estimated cost are tracked per
+agent and tier.
+"""
+
+import dataclasses
+import inspect
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from common.llm_cache import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Starting tier of each task class, as an index into the tiers (smallest first)
+TASK_TIERS = {"lookup": 0, "draft": 0, "analysis": -1}
+# Weight of the latest observed call in a tier's latency estimate
+LATENCY_EWMA = 0.2
+# Completion tokens assumed for cost estimates before an agent's first call
+DEFAULT_COMPLETION_TOKENS = 300
+
+
+@dataclasses.dataclass
+class ModelTier:
+    """One model size: an OpenAI model and the Conversation API component serving it"""
+    name: str
+    model: str
+    component: str
+    prompt_cost: float  # USD per 1M prompt tokens
+    completion_cost: float  # USD per 1M completion tokens
+    latency: float  # expected seconds per call until calls are observed
+    max_prompt_tokens: Optional[int] = None  # longer prompts go to the next tier
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (prompt_tokens * self.prompt_cost + completion_tokens * self.completion_cost) / 1_000_000
+
+
+@dataclasses.dataclass
+class RoutePolicy:
+    """How one agent's calls are routed"""
+    task: str = "analysis"
+    min_tier: Optional[str] = None
+    max_tier: Optional[str] = None
+    max_cost: Optional[float] = None  # USD per call
+    max_latency: Optional[float] = None  # seconds per call
+    fallback: bool = True
+    # Checks a final text answer; False retries the call on the next larger tier
+    validator: Optional[Callable[[str], bool]] = None
+
+
+DEFAULT_TIERS = [
+    ModelTier("small", "gpt-4o-mini", "openai-mini", prompt_cost=0.15, completion_cost=0.60, latency=0.8,
+              max_prompt_tokens=8000),
+    ModelTier("large", "gpt-4o", "openai", prompt_cost=2.50, completion_cost=10.00, latency=2.0),
+]
+
+
+class ModelRouter:
+    """Picks a model tier per call and escalates calls whose answers fail validation"""
+
+    def __init__(self, tiers: List[ModelTier], policies: Optional[Dict[str, RoutePolicy]] = None):
+        if not tiers:
+            raise ValueError("At least one model tier is required")
+        self.tiers = list(tiers)
+        self.policies = dict(policies or {})
+        self._index = {tier.name: i for i, tier in enumerate(self.tiers)}
+        for agent, policy in self.policies.items():
+            for name in (policy.min_tier, policy.max_tier):
+                if name is not None and name not in self._index:
+                    raise ValueError(f"Unknown model tier for {agent}: {name}")
+        self._latency = {tier.name: tier.latency for tier in self.tiers}
+        self._completion: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._routes: Dict[str, Dict[str, int]] = {}
+
+    def policy(self, agent: str) -> RoutePolicy:
+        return self.policies.get(agent) or RoutePolicy()
+
+    def _bounds(self, policy: RoutePolicy) -> Tuple[int, int]:
+        low = self._index[policy.min_tier] if policy.min_tier else 0
+        high = self._index[policy.max_tier] if policy.max_tier else len(self.tiers) - 1
+        return low, max(low, high)
+
+    def choose(self, agent: str, prompt_tokens: int) -> ModelTier:
+        """Tier for a call of `agent` with a prompt of `prompt_tokens`"""
+        policy = self.policy(agent)
+        low, high = self._bounds(policy)
+        index = TASK_TIERS.get(policy.task, -1) % len(self.tiers)
+        reason = "task"
+        with self._lock:
+            completion_tokens = int(self._completion.get(agent, DEFAULT_COMPLETION_TOKENS))
+            latency = dict(self._latency)
+        while index > low and (
+            (policy.max_cost is not None and self.tiers[index].cost(prompt_tokens, completion_tokens) > policy.max_cost)
+            or (policy.max_latency is not None and latency[self.tiers[index].name] > policy.max_latency)
+        ):
+            index -= 1
+            reason = "budget"
+        while index < high and (self.tiers[index].max_prompt_tokens or prompt_tokens) < prompt_tokens:
+            index += 1
+            reason = "prompt_size"
+        index = min(max(index, low), high)
+        with self._lock:
+            routes = self._routes.setdefault(agent, {})
+            routes[reason] = routes.get(reason, 0) + 1
+        return self.tiers[index]
+
+    def larger(self, agent: str, tier: ModelTier) -> Optional[ModelTier]:
+        """The next tier up for `agent`, or None when it may not go higher"""
+        index = self._index[tier.name] + 1
+        return self.tiers[index] if index <= self._bounds(self.policy(agent))[1] else None
+
+    def record(self, agent: str, tier: ModelTier, seconds: float, prompt_tokens: int, completion_tokens: int,
+               cached: bool = False, fallback: bool = False):
+        with self._lock:
+            stats = self._stats.setdefault((agent, tier.name), {
+                "calls": 0, "cached": 0, "fallbacks": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0,
+            })
+            stats["calls"] += 1
+            stats["fallbacks"] += int(fallback)
+            if cached:
+                # Served from the response cache: no tokens billed and no model latency to learn from
+                stats["cached"] += 1
+                return
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+            stats["cost_usd"] += tier.cost(prompt_tokens, completion_tokens)
+            self._latency[tier.name] += LATENCY_EWMA * (seconds - self._latency[tier.name])
+            previous = self._completion.get(agent, completion_tokens)
+            self._completion[agent] = previous + LATENCY_EWMA * (completion_tokens - previous)
+
+    def run(self, agent: str, prompt_tokens: int, call: Callable[[ModelTier], Any],
+            answer: Callable[[Any], Optional[str]], usage: Callable[[Any], Tuple[int, int, bool]],
+            validator: Optional[Callable[[str], bool]] = None, invalid_errors: Tuple[type, ...] = ()):
+        """`call(tier)` on the routed tier, repeated on larger tiers while its answer is invalid
+
+        `answer` extracts the text to validate (None skips validation, e.g. for tool-call
+        turns), `usage` returns (prompt tokens, completion tokens, served from cache), and
+        exceptions in `invalid_errors` count as invalid answers.
+        """
+        policy = self.policy(agent)
+        validator = validator or policy.validator
+        tier = self.choose(agent, prompt_tokens)
+        fallback = False
+        while True:
+            bigger = self.larger(agent, tier) if policy.fallback else None
+            start = time.perf_counter()
+            try:
+                response = call(tier)
+            except invalid_errors as e:
+                if bigger is None:
+                    raise
+                self.record(agent, tier, time.perf_counter() - start, prompt_tokens, 0, fallback=fallback)
+                logger.info(f"{agent}: {tier.name} answer failed to parse ({e}), retrying on {bigger.name}")
+                tier, fallback = bigger, True
+                continue
+            used_prompt, used_completion, cached = usage(response)
+            self.record(agent, tier, time.perf_counter() - start, used_prompt or prompt_tokens, used_completion,
+                        cached=cached, fallback=fallback)
+            text = answer(response)
+            if bigger is None or validator is None or text is None or validator(text):
+                return response
+            logger.info(f"{agent}: {tier.name} answer failed validation, retrying on {bigger.name}")
+            tier, fallback = bigger, True
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            agents: Dict[str, Any] = {}
+            for (agent, tier), stats in self._stats.items():
+                entry = agents.setdefault(agent, {"tiers": {}, "routes": dict(self._routes.get(agent, {}))})
+                entry["tiers"][tier] = {**stats, "cost_usd": round(stats["cost_usd"], 6)}
+            return {
+                "tiers": {tier.name: {"model": tier.model, "component": tier.component,
+                                      "latency_estimate_s": round(self._latency[tier.name], 3)} for tier in self.tiers},
+                "agents": agents,
+            }
+
+
+def _field(message, name: str):
+    return message.get(name) if isinstance(message, dict) else getattr(message, name, None)
+
+
+def _prompt_tokens(messages) -> int:
+    items = messages if isinstance(messages, (list, tuple)) else [messages]
+    return sum(estimate_tokens(item if isinstance(item, str) else str(_field(item, "content") or "")) for item in items)
+
+
+def _chat_answer(response) -> Optional[str]:
+    """Text of a final chat answer; None for tool-call turns and structured outputs"""
+    if not hasattr(response, "get_message"):
+        return None
+    message = response.get_message()
+    if message is None or message.has_tool_calls():
+        return None
+    return message.content or ""
+
+
+def _chat_usage(response) -> Tuple[int, int, bool]:
+    metadata = getattr(response, "metadata", None) or {}
+    usage = metadata.get("usage") or {}
+    return int(usage.get("prompt_tokens") or 0), int(usage.get("completion_tokens") or 0), bool(metadata.get("cache"))
+
+
+def route_chat_client(llm, router: Optional["ModelRouter"], agent: str):
+    """Route llm.generate() calls of `agent` through `router`; returns the same client instance
+
+    Apply it last, over any cache or tracing wrappers, so they see the chosen model.
+    """
+    if router is None or getattr(llm, "_model_router", None) is router:
+        return llm
+    generate = llm.generate
+    # OpenAIChatClient takes a model, DaprChatClient a Conversation API component; ask the
+    # class, since cache and tracing wrappers replace generate with a (*args, **kwargs) one
+    by_model = "model" in inspect.signature(type(llm).generate).parameters
+
+    def routed_generate(messages=None, *, input_data=None, response_format=None, **kwargs):
+        if input_data is not None or messages is None or kwargs.get("stream") or kwargs.get("model") \
+                or kwargs.get("llm_component"):
+            return generate(messages=messages, input_data=input_data, response_format=response_format, **kwargs)
+        prompt_tokens = _prompt_tokens(messages)
+
+        def call(tier: ModelTier):
+            target = {"model": tier.model} if by_model else {"llm_component": tier.component}
+            return generate(messages=messages, response_format=response_format, **kwargs, **target)
+
+        return router.run(
+            agent, prompt_tokens, call,
+            answer=_chat_answer if response_format is None else (lambda response: None),
+            usage=_chat_usage,
+            # Structured outputs are validated by the client itself
+            invalid_errors=(ValueError,) if response_format is not None else (),
+        )
+
+    object.__setattr__(llm, "generate", routed_generate)
+    object.__setattr__(llm, "_model_router", router)
+    return llm
+
+
+def tiers_from_env() -> List[ModelTier]:
+    """DEFAULT_TIERS with models, components and the small tier's prompt limit from LLM_TIER_* variables"""
+    tiers = []
+    for tier in DEFAULT_TIERS:
+        prefix = f"LLM_TIER_{tier.name.upper()}_"
+        max_prompt_tokens = os.getenv(prefix + "MAX_PROMPT_TOKENS")
+        tiers.append(dataclasses.replace(
+            tier,
+            model=os.getenv(prefix + "MODEL", tier.model),
+            component=os.getenv(prefix + "COMPONENT", tier.component),
+            max_prompt_tokens=int(max_prompt_tokens) if max_prompt_tokens else tier.max_prompt_tokens,
+        ))
+    return tiers
+
+
+def policy_from_env(agent: str, default: RoutePolicy) -> RoutePolicy:
+    """`default` with overrides from LLM_ROUTE_<AGENT>_* variables"""
+    prefix = f"LLM_ROUTE_{agent.upper()}_"
+    max_cost = os.getenv(prefix + "MAX_COST")
+    max_latency = os.getenv(prefix + "MAX_LATENCY_MS")
+    return dataclasses.replace(
+        default,
+        task=os.getenv(prefix + "TASK", default.task),
+        min_tier=os.getenv(prefix + "MIN_TIER", default.min_tier or "") or None,
+        max_tier=os.getenv(prefix + "MAX_TIER", default.max_tier or "") or None,
+        max_cost=float(max_cost) if max_cost else default.max_cost,
+        max_latency=float(max_latency) / 1000 if max_latency else default.max_latency,
+        fallback=os.getenv(prefix + "FALLBACK", str(default.fallback)).lower() == "true",
+    )
+
+
+def model_router_from_env(policies: Dict[str, RoutePolicy]) -> Optional[ModelRouter]:
+    """Build the router from LLM_ROUTING_* / LLM_TIER_* / LLM_ROUTE_* variables; None when LLM_ROUTING_ENABLED=false"""
+    if os.getenv("LLM_ROUTING_ENABLED", "true").lower() != "true":
+        return None
+    return ModelRouter(tiers_from_env(), {agent: policy_from_env(agent, policy) for agent, policy in policies.items()})
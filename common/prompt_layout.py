@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Prompt layout with a stable, cacheable prefix, shared by all agents
+Providers cache the prompt prefixes they have recently processed: OpenAI reuses a
+prefix of 1024 tokens or more, in 128-token steps, prefills it without recomputing
+it and bills it at half price. Only a byte-identical prefix hits. The default agent
+prompt starts with today's date. It is followed by the conversation memory of
+earlier runs, then by the request, and the requests put per-ticket data ahead of
+their fixed task steps. So two tickets rarely share more than the first few lines.
+
+A PromptLayout sends everything fixed first, in a fixed order, and the variable
+data last:
+
+    system  name, role, goal, instructions, task steps    same for every call
+    tools   the agent's tool schemas, in a fixed order     same for every call
+    user    the call's fields, one per line                changes per call
+
+Turns within one run (tool results, follow-up calls) extend this prompt, so they hit
+the prefix of the turn before them as well. Per-request agents (a ticket's triage)
+don't get the memory of earlier runs: each call stands on its own fields.
+Conversational agents keep it with `history=True`, between the prefix and the new
+message, where it only grows at the end. Dict and list fields are rendered as sorted, compact
+JSON, so equal data always renders to equal text; text is passed through as is.
+
+Cached prompt tokens are read from each response's usage
+(`prompt_tokens_details.cached_tokens`) and counted per agent.
+"""
+
+import json
+import threading
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Union
+
+from common.llm_cache import estimate_tokens
+
+# Shortest prefix OpenAI caches, in tokens
+MIN_CACHED_PREFIX_TOKENS = 1024
+
+
+def cached_prompt_tokens(usage: Optional[Mapping[str, Any]]) -> int:
+    """Prompt tokens a response's usage reports as served from the provider's prefix cache"""
+    if not usage:
+        return 0
+    details = usage.get("prompt_tokens_details") or {}
+    return int(details.get("cached_tokens") or usage.get("cached_tokens") or 0)
+
+
+def render_field(value: Any) -> str:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return "" if value is None else str(value)
+
+
+class PromptLayout:
+    """Fixed system prefix of one agent plus the per-call fields that follow it"""
+
+    def __init__(self, name: str, role: str, goal: str, instructions: Iterable[str] = (),
+                 steps: Iterable[str] = ()):
+        self.name = name
+        sections = [f"## Name\nYour name is {name}.", f"## Role\nYour role is {role}.", f"## Goal\n{goal}."]
+        instructions = list(instructions)
+        if instructions:
+            sections.append("## Instructions\n" + "\n".join(f"- {line}" for line in instructions))
+        steps = list(steps)
+        if steps:
+            sections.append("## Task\nFor every request:\n" + "\n".join(f"{i}. {step}" for i, step in enumerate(steps, 1)))
+        self.prefix = "\n\n".join(sections)
+        self.prefix_tokens = estimate_tokens(self.prefix)
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0, "cache_hits": 0}
+
+    @classmethod
+    def for_agent(cls, agent, steps: Iterable[str] = ()) -> "PromptLayout":
+        """Layout built from an agent's name, role, goal and instructions"""
+        return cls(agent.name, agent.role, agent.goal, agent.instructions or (), steps)
+
+    def user(self, fields: Mapping[str, Any]) -> str:
+        """The variable part: one `Name: value` line per field, in the given order"""
+        return "\n".join(f"{name}: {render_field(value)}" for name, value in fields.items())
+
+    def messages(self, user: str, history: Iterable[Dict[str, Any]] = ()) -> List[Dict[str, Any]]:
+        return [{"role": "system", "content": self.prefix}, *history, {"role": "user", "content": user}]
+
+    def record(self, usage: Optional[Mapping[str, Any]]):
+        if not usage:
+            return
+        cached = cached_prompt_tokens(usage)
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["prompt_tokens"] += int(usage.get("prompt_tokens") or 0)
+            self._stats["cached_prompt_tokens"] += cached
+            self._stats["cache_hits"] += int(cached > 0)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            prompt = self._stats["prompt_tokens"]
+            return {
+                **self._stats,
+                "prefix_tokens": self.prefix_tokens,
+                "cacheable": self.prefix_tokens >= MIN_CACHED_PREFIX_TOKENS,
+                "cached_share": round(self._stats["cached_prompt_tokens"] / prompt, 4) if prompt else 0.0,
+            }
+
+
+def use_prompt_layout(agent, layout: Optional[PromptLayout], history: bool = False):
+    """Build the agent's messages from `layout` and count its cached prompt tokens; returns the agent
+
+    String inputs become the layout's system prefix, the agent's memory when `history`
+    is set, and a user message; dict inputs still go through the agent's prompt
+    template. `None` restores the agent's own prompt.
+    Apply it after the agent's llm is set, since it wraps llm.generate.
+    """
+    if layout is None:
+        agent.__dict__.pop("construct_messages", None)
+        return agent
+    construct = type(agent).construct_messages.__get__(agent)
+
+    def construct_messages(input_data: Union[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if isinstance(input_data, str):
+            return layout.messages(input_data, agent.get_chat_history() if history else ())
+        return construct(input_data)
+
+    object.__setattr__(agent, "construct_messages", construct_messages)
+
+    llm = agent.llm
+    if getattr(llm, "_prompt_layout", None) is not layout:
+        generate = llm.generate
+
+        def recorded_generate(*args, **kwargs):
+            response = generate(*args, **kwargs)
+            if not kwargs.get("stream"):
+                layout.record((getattr(response, "metadata", None) or {}).get("usage"))
+            return response
+
+        object.__setattr__(llm, "generate", recorded_generate)
+        object.__setattr__(llm, "_prompt_layout", layout)
+    return agent